@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 02:38
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_agent_leads(apps, schema_editor):
+    Agent = apps.get_model('agents', 'Agent')
+    Lead = apps.get_model('leads', 'Lead')
+    counts = Lead.objects.filter(agent__isnull=False).order_by().values('agent').annotate(
+        leads=Count('id'), converted=Count('id', filter=Q(category__name='Converted'))
+    )
+    for row in counts:
+        Agent.objects.filter(pk=row['agent']).update(lead_count=row['leads'], converted_lead_count=row['converted'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_initial'),
+        ('leads', '0003_lead_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='converted_lead_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='last_assigned',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='lead_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_agent_leads, migrations.RunPython.noop),
+    ]
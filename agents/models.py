@@ -9,6 +9,18 @@ User = get_user_model()
 class Agent(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     organization = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    lead_count = models.IntegerField(default=0)
+    converted_lead_count = models.IntegerField(default=0)
+    last_assigned = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.user.email
+
+    @property
+    def open_lead_count(self):
+        return self.lead_count - self.converted_lead_count
+
+    @property
+    def conversion_rate(self):
+        # Smoothed so that new agents are neither starved nor flooded.
+        return (self.converted_lead_count + 1) / (self.lead_count + 2)
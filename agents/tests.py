@@ -1,3 +1,8 @@
-from django.test import TestCase
+from django.shortcuts import reverse
 
-# Create your tests here.
+from leads.tests.test_queries import QueryBudgetTestCase
+
+
+class AgentQueryBudgetTest(QueryBudgetTestCase):
+    def test_agent_list(self):
+        self.assertQueryBudget(lambda: reverse('agents:agent-list'), 1)
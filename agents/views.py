@@ -1,10 +1,10 @@
 from django.views import generic
 from django.urls import reverse_lazy
-from django.core.mail import send_mail
 
 from .models import Agent
 from .forms import AgentForm
 from .mixins import OrganizerAndLoginRequiredMixin
+from notifications.outbox import enqueue_mail
 
 # Create your views here.
 
@@ -14,7 +14,7 @@ class AgentListView(OrganizerAndLoginRequiredMixin, generic.ListView):
     context_object_name = 'agents'
 
     def get_queryset(self):
-        return Agent.objects.filter(organization=self.request.user.userprofile)
+        return Agent.objects.filter(organization=self.request.user.userprofile).select_related('user')
 
 
 class AgentCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
@@ -31,7 +31,7 @@ class AgentCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
         user.is_organizer = False
         user.save()
         Agent.objects.create(user=user, organization=self.request.user.userprofile)
-        send_mail(
+        enqueue_mail(
             subject='You are invited to be an agent',
             message=f'You were added as an agent on the django crm. Please come and login to start working.',
             from_email='test@test.com',
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import LeadRollup, RollupWatermark
+
+
+class LeadRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'organization', 'dimension', 'agent', 'category', 'created', 'assigned', 'converted')
+    list_filter = ('dimension',)
+
+
+admin.site.register(LeadRollup, LeadRollupAdmin)
+admin.site.register(RollupWatermark)
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django import forms
+from django.utils import timezone
+
+from .models import LeadRollup
+
+
+class RollupRangeForm(forms.Form):
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    dimension = forms.ChoiceField(choices=LeadRollup.DIMENSION_CHOICES, required=False)
+
+    def clean(self):
+        cleaned_data = super(RollupRangeForm, self).clean()
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start') or end - timedelta(days=30)
+        if start > end:
+            raise forms.ValidationError('The start date must be before the end date')
+        cleaned_data.update({
+            'start': start,
+            'end': end,
+            'dimension': cleaned_data.get('dimension') or LeadRollup.ORGANIZATION
+        })
+        return cleaned_data
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from analytics.rollups import build_rollups
+from leads.models import Lead
+
+
+class Command(BaseCommand):
+    help = 'Build the daily lead rollups incrementally, starting from the last watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--full', action='store_true', help='Rebuild every rollup from the first lead')
+
+    def handle(self, *args, **options):
+        since = options.get('since')
+        if options['full']:
+            since = Lead.objects.order_by('date_added').values_list('date_added', flat=True).first()
+            if since is None:
+                return 'There are no leads to roll up'
+        until = options.get('until')
+        if since and until and since > until:
+            raise CommandError('--since must be before --until')
+        since, until = build_rollups(since=since, until=until)
+        return f'The lead rollups from {since} to {until} have been rebuilt'
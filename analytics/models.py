@@ -0,0 +1,42 @@
+from django.db import models
+
+from agents.models import Agent
+from leads.models import Category, UserProfile
+
+
+class LeadRollup(models.Model):
+    ORGANIZATION = 'organization'
+    AGENT = 'agent'
+    CATEGORY = 'category'
+    DIMENSION_CHOICES = (
+        (ORGANIZATION, 'Organization'),
+        (AGENT, 'Agent'),
+        (CATEGORY, 'Category'),
+    )
+
+    organization = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    day = models.DateField()
+    dimension = models.CharField(max_length=12, choices=DIMENSION_CHOICES)
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    created = models.PositiveIntegerField(default=0)
+    assigned = models.PositiveIntegerField(default=0)
+    converted = models.PositiveIntegerField(default=0)
+    median_time_to_convert = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'dimension', 'day']),
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f'{self.organization} {self.dimension} rollup on {self.day}'
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    day = models.DateField()
+
+    def __str__(self):
+        return f'{self.name} built up to {self.day}'
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from statistics import median
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from leads.models import Lead
+from .models import LeadRollup, RollupWatermark
+
+WATERMARK_NAME = 'lead_rollups'
+
+DIMENSIONS = {
+    LeadRollup.ORGANIZATION: None,
+    LeadRollup.AGENT: 'agent',
+    LeadRollup.CATEGORY: 'category',
+}
+
+
+def _key(dimension, row, field, day):
+    organization_id = row['organization']
+    value = row[field] if field else None
+    return dimension, organization_id, day, value
+
+
+def compute_rollups(start, end):
+    """
+    Aggregate the leads created or converted between ``start`` and ``end`` (inclusive) into rollup rows.
+    """
+    counters = defaultdict(lambda: {'created': 0, 'assigned': 0, 'converted': 0, 'durations': []})
+    added = Lead.objects.filter(date_added__range=(start, end)).order_by()
+    converted = Lead.objects.filter(converted_date__date__range=(start, end)).order_by()
+
+    for dimension, field in DIMENSIONS.items():
+        group_by = ['organization', 'date_added'] + ([field] if field else [])
+        for row in added.values(*group_by).annotate(
+                created=Count('id'), assigned=Count('id', filter=Q(agent__isnull=False))):
+            if field and row[field] is None:
+                continue
+            counter = counters[_key(dimension, row, field, row['date_added'])]
+            counter['created'] = row['created']
+            counter['assigned'] = row['assigned']
+
+    fields = ['organization', 'agent', 'category', 'date_added', 'converted_date']
+    for row in converted.annotate(converted_day=TruncDate('converted_date')).values(*fields, 'converted_day').iterator():
+        duration = row['converted_date'] - timezone.make_aware(datetime.combine(row['date_added'], time.min))
+        for dimension, field in DIMENSIONS.items():
+            if field and row[field] is None:
+                continue
+            counter = counters[_key(dimension, row, field, row['converted_day'])]
+            counter['converted'] += 1
+            counter['durations'].append(max(duration, timedelta(0)))
+
+    for (dimension, organization_id, day, value), counter in counters.items():
+        durations = counter.pop('durations')
+        yield LeadRollup(
+            organization_id=organization_id,
+            day=day,
+            dimension=dimension,
+            agent_id=value if dimension == LeadRollup.AGENT else None,
+            category_id=value if dimension == LeadRollup.CATEGORY else None,
+            median_time_to_convert=median(durations) if durations else None,
+            **counter
+        )
+
+
+def build_rollups(since=None, until=None, batch_size=1000):
+    """
+    Rebuild the rollups from ``since`` (defaults to the last watermark) up to ``until`` (defaults to today).
+
+    The last day covered by the previous run is rebuilt as well since it was probably still receiving leads.
+    Returns the first and last day that were rebuilt.
+    """
+    until = until or timezone.localdate()
+    if since is None:
+        watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+        if watermark is not None:
+            since = watermark.day
+        else:
+            first_lead = Lead.objects.order_by('date_added').values_list('date_added', flat=True).first()
+            since = first_lead or until
+
+    with transaction.atomic():
+        LeadRollup.objects.filter(day__range=(since, until)).delete()
+        rollups = []
+        for rollup in compute_rollups(since, until):
+            rollups.append(rollup)
+            if len(rollups) >= batch_size:
+                LeadRollup.objects.bulk_create(rollups)
+                rollups = []
+        LeadRollup.objects.bulk_create(rollups)
+        RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'day': until})
+    return since, until
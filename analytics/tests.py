@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from agents.models import Agent
+from analytics.models import LeadRollup, RollupWatermark
+from leads.models import Category, Lead, User
+
+
+class LeadRollupTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        organization = self.organizer.userprofile
+        agent_user = User.objects.create_user('agent', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=agent_user, organization=organization)
+        self.converted = Category.objects.create(name='Converted', organization=organization)
+        self.today = timezone.localdate()
+        for days, agent in ((2, self.agent), (4, None)):
+            lead = Lead.objects.create(first_name='John', last_name='Doe', organization=organization, agent=agent,
+                                       category=self.converted)
+            Lead.objects.filter(pk=lead.pk).update(
+                date_added=self.today - timedelta(days=5),
+                converted_date=timezone.make_aware(datetime.combine(self.today - timedelta(days=5 - days),
+                                                                    datetime.min.time()))
+            )
+        Lead.objects.create(first_name='Jane', last_name='Roe', organization=organization, agent=self.agent)
+
+    def test_builds_rollups_per_dimension(self):
+        call_command('build_lead_rollups', full=True, stdout=StringIO())
+        day = self.today - timedelta(days=5)
+        organization_rollup = LeadRollup.objects.get(dimension=LeadRollup.ORGANIZATION, day=day)
+        self.assertEqual((organization_rollup.created, organization_rollup.assigned), (2, 1))
+        agent_rollups = LeadRollup.objects.filter(dimension=LeadRollup.AGENT, agent=self.agent)
+        self.assertEqual(sum(rollup.created for rollup in agent_rollups), 2)
+        converted = LeadRollup.objects.filter(dimension=LeadRollup.ORGANIZATION, converted__gt=0).order_by('day')
+        self.assertEqual([rollup.median_time_to_convert for rollup in converted],
+                         [timedelta(days=2), timedelta(days=4)])
+        self.assertEqual(RollupWatermark.objects.get().day, self.today)
+
+    def test_incremental_build_only_rebuilds_recent_days(self):
+        call_command('build_lead_rollups', full=True, stdout=StringIO())
+        old = LeadRollup.objects.get(dimension=LeadRollup.ORGANIZATION, day=self.today - timedelta(days=5))
+        Lead.objects.create(first_name='Jim', last_name='Poe', organization=self.organizer.userprofile)
+        call_command('build_lead_rollups', stdout=StringIO())
+        self.assertTrue(LeadRollup.objects.filter(pk=old.pk).exists())
+        self.assertEqual(LeadRollup.objects.get(dimension=LeadRollup.ORGANIZATION, day=self.today).created, 2)
+
+    def test_view_reads_rollups(self):
+        call_command('build_lead_rollups', full=True, stdout=StringIO())
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('analytics:lead-rollups'), {'dimension': 'agent', 'format': 'json'})
+        self.assertEqual(sum(row['created'] for row in response.json()['results']), 2)
+        response = self.client.get(reverse('analytics:lead-rollups'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['totals']['created'], 3)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_view_is_cached_per_session(self):
+        call_command('build_lead_rollups', full=True, stdout=StringIO())
+        self.client.force_login(self.organizer)
+        url = reverse('analytics:lead-rollups') + '?format=json'
+        content = self.client.get(url).content
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, content)
+
+        self.client.logout()
+        self.client.force_login(self.organizer)
+        with self.assertNumQueries(2):
+            self.client.get(url)
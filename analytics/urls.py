@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import LeadRollupView
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('', LeadRollupView.as_view(), name='lead-rollups'),
+]
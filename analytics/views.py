@@ -0,0 +1,63 @@
+from django.http.response import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import generic
+
+from agents.mixins import OrganizerAndLoginRequiredMixin
+from django_crm.cache import cache_per_user
+from .forms import RollupRangeForm
+from .models import LeadRollup
+
+
+# Rollups are rebuilt by a periodic command, so the page can be served from the cache in between.
+@method_decorator(cache_per_user(key_prefix='lead-rollups'), name='dispatch')
+class LeadRollupView(OrganizerAndLoginRequiredMixin, generic.TemplateView):
+    template_name = 'analytics/lead_rollups.html'
+
+    def get_form(self):
+        form = RollupRangeForm(self.request.GET)
+        if not form.is_valid():
+            form = RollupRangeForm({})
+            form.is_valid()
+        return form
+
+    def get_rollups(self, form):
+        data = form.cleaned_data
+        return LeadRollup.objects.filter(
+            organization=self.request.user.userprofile,
+            dimension=data['dimension'],
+            day__range=(data['start'], data['end'])
+        ).select_related('agent__user', 'category').order_by('day', 'agent', 'category')
+
+    def get_context_data(self, **kwargs):
+        context = super(LeadRollupView, self).get_context_data(**kwargs)
+        form = self.get_form()
+        rollups = list(self.get_rollups(form))
+        max_created = max([rollup.created for rollup in rollups] + [1])
+        for rollup in rollups:
+            rollup.label = rollup.agent or rollup.category or ''
+            rollup.bar_width = round(100 * rollup.created / max_created)
+        context.update({
+            'form': form,
+            'rollups': rollups,
+            'totals': {
+                field: sum(getattr(rollup, field) for rollup in rollups)
+                for field in ('created', 'assigned', 'converted')
+            }
+        })
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super(LeadRollupView, self).render_to_response(context, **response_kwargs)
+        return JsonResponse({
+            'dimension': context['form'].cleaned_data['dimension'],
+            'results': [{
+                'day': rollup.day,
+                'label': str(rollup.label),
+                'created': rollup.created,
+                'assigned': rollup.assigned,
+                'converted': rollup.converted,
+                'median_time_to_convert': rollup.median_time_to_convert.total_seconds()
+                if rollup.median_time_to_convert is not None else None,
+            } for rollup in context['rollups']]
+        })
@@ -2,6 +2,7 @@
 ASGI config for django_crm project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Served through it, the read-heavy views are the asynchronous ones of ``leads.async_views``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -12,5 +13,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_crm.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
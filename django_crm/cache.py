@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+
+
+def get_view_cache_key(request, key_prefix):
+    # The session key changes on every login, so nothing cached survives a logout.
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'view:{key_prefix}:{request.user.pk}:{request.session.session_key}:{path}'
+
+
+def get_organization_version_key(organization_id):
+    return f'organization-version:{organization_id}'
+
+
+def get_organization_version(organization_id):
+    """
+    Return the version of the data of an organization, which is part of the key of everything cached for it.
+    """
+    key = get_organization_version_key(organization_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so that a version evicted from the cache never matches older entries again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_organization_version(organization_id):
+    if organization_id is None:
+        return
+    key = get_organization_version_key(organization_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _cached_view(get_key, timeout):
+    def decorator(view_func):
+        def get_cached(request):
+            if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+                return None, None
+            key = get_key(request)
+            return key, cache.get(key) if key is not None else None
+
+        def store(request, key, response):
+            if key is None or response.status_code != 200 or response.streaming or len(get_messages(request)):
+                return response
+
+            def set_cached(response):
+                if not response.cookies:
+                    cache.set(key, response, timeout)
+                return response
+
+            if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                response.add_post_render_callback(set_cached)
+            else:
+                set_cached(response)
+            return response
+
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                key, response = await sync_to_async(get_cached)(request)
+                if response is not None:
+                    return response
+                response = await view_func(request, *args, **kwargs)
+                return await sync_to_async(store)(request, key, response)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, response = get_cached(request)
+            if response is not None:
+                return response
+            return store(request, key, view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def cache_per_user(timeout=None, key_prefix='default'):
+    """
+    Cache the successful GET responses of a view for each authenticated user.
+
+    Unlike ``cache_page`` the key includes the user and its session, so it can be used on pages showing
+    organization data. Pages carrying flash messages or setting cookies are never cached.
+    """
+    return _cached_view(
+        lambda request: get_view_cache_key(request, key_prefix),
+        settings.VIEW_CACHE_TIMEOUT if timeout is None else timeout
+    )
+
+
+def cache_per_organization(timeout=None, key_prefix='default'):
+    """
+    Like ``cache_per_user``, but the entries are also keyed by the version of the organization of the user, so
+    they are replaced as soon as its data changes and can be kept much longer. Nothing is cached unless
+    ``SHARED_CACHE`` is set.
+    """
+    def get_key(request):
+        organization = getattr(request, 'organization', None)
+        # A version bumped in the cache of one process would leave the others serving stale pages.
+        if organization is None or not settings.SHARED_CACHE:
+            return None
+        version = get_organization_version(organization.pk)
+        return get_view_cache_key(request, f'{key_prefix}:{organization.pk}:{version}')
+
+    return _cached_view(get_key, settings.ORGANIZATION_CACHE_TIMEOUT if timeout is None else timeout)
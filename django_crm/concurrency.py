@@ -0,0 +1,61 @@
+import asyncio
+from functools import partial, update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def _in_worker_thread(func):
+    def run():
+        try:
+            return func()
+        finally:
+            # Worker threads are outside the request cycle, nothing else closes their connections.
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*funcs):
+    """
+    Run independent blocking callables, usually ORM queries, and return their results in order.
+
+    With ``ASYNC_PARALLEL_QUERIES`` each one runs on a thread of its own, with its own database connection, so their
+    round trips overlap. They are outside any transaction of the request, which is fine for the reads they are used
+    for. Otherwise they run one after the other on the thread serving synchronous code, which is what tests need to
+    see the data of their transaction.
+    """
+    if not settings.ASYNC_PARALLEL_QUERIES:
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(sync_to_async(_in_worker_thread(func), thread_sensitive=False)() for func in funcs))
+
+
+async def run_query(func, *args, **kwargs):
+    result, = await gather_queries(partial(func, *args, **kwargs))
+    return result
+
+
+class AsyncViewMixin:
+    """
+    Let a class-based view define ``async def get``.
+
+    Django 3.2 only awaits views that are coroutine functions, and the permission mixins return plain responses
+    from ``dispatch`` before the handler is reached.
+    """
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super(AsyncViewMixin, cls).as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        # Keeps view_class, view_initkwargs and the flags set by decorators such as csrf_exempt.
+        update_wrapper(async_view, view)
+        return async_view
+
+    async def dispatch(self, request, *args, **kwargs):
+        response = super(AsyncViewMixin, self).dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_organization_version
+
+
+def organization_cache(request):
+    """
+    Expose the cache version of the organization of the user, to key the ``{% cache %}`` fragments showing its data.
+    Their timeout is 0, which caches nothing, unless ``SHARED_CACHE`` is set.
+    """
+    organization = getattr(request, 'organization', None)
+    if organization is None:
+        return {}
+    return {
+        'organization_cache_version': SimpleLazyObject(lambda: get_organization_version(organization.pk)),
+        'organization_cache_timeout': settings.ORGANIZATION_CACHE_TIMEOUT if settings.SHARED_CACHE else 0,
+    }
@@ -0,0 +1,12 @@
+# ASGI deployment profile: gunicorn -c django_crm/gunicorn_asgi.py
+#
+# Uvicorn workers serve django_crm.asgi, which routes the read-heavy views to their asynchronous versions. The
+# synchronous views and middleware of a worker share a single thread, so scale with processes rather than threads.
+import multiprocessing
+import os
+
+wsgi_app = 'django_crm.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+keepalive = 5
@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+from django.views import generic
+
+logger = logging.getLogger(__name__)
+
+# Name, help and upper bounds of the buckets of every histogram, observed once per request and view.
+HISTOGRAMS = {
+    'crm_request_duration_seconds': (
+        'Time spent serving requests.', (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    ),
+    'crm_request_sql_duration_seconds': (
+        'Time spent running SQL queries per request.', (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+    ),
+    'crm_request_sql_queries': (
+        'SQL queries run per request.', (0, 1, 2, 5, 10, 20, 50, 100, 200)
+    ),
+    'crm_request_template_duration_seconds': (
+        'Time spent rendering templates per request.', (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+    ),
+}
+COUNTERS = {
+    'crm_responses_total': 'Responses sent, by view and status code.',
+    'crm_slow_queries_total': 'SQL queries slower than SLOW_QUERY_MS, by view.',
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = getattr(match.func, 'view_class', match.func)
+    return getattr(func, '__name__', func.__class__.__name__)
+
+
+class RequestMetrics:
+    """
+    What a request spent in SQL and templates. Queries of the async views may run on other threads.
+    """
+    def __init__(self, request):
+        self.request = request
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.slow_queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self.lock:
+            self.queries += 1
+            self.sql_time += duration
+        if duration * 1000 >= settings.SLOW_QUERY_MS:
+            with self.lock:
+                self.slow_queries += 1
+            logger.warning('Slow query in %s (%.1fms): %s', get_view_name(self.request), duration * 1000,
+                           sql[:1000])
+
+    def get_server_timing(self, total):
+        return (f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries", '
+                f'templates;dur={self.template_time * 1000:.1f}, total;dur={total * 1000:.1f}')
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection):
+    # First in the list: connection.execute_wrapper() pops the last wrapper when its block ends, which must remain
+    # its own even when the connection was created inside the block.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@receiver(connection_created)
+def install_query_recorder_on_connect(sender, connection, **kwargs):
+    # Covers the connections of the threads running the queries of async views.
+    install_query_recorder(connection)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Templates rendered while another one is, by a template tag or a form, are part of its time.
+        if metrics is None or metrics.rendering:
+            return self.template.render(context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - start
+            metrics.rendering = False
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, timing the templates rendered during a request for ``RequestTimingMiddleware``.
+    """
+    def from_string(self, template_code):
+        return TimedTemplate(super(InstrumentedDjangoTemplates, self).from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super(InstrumentedDjangoTemplates, self).get_template(template_name))
+
+
+class MetricsRegistry:
+    """
+    Histograms and counters of this process.
+
+    With ``METRICS_DIR`` every process writes them to a file of its own every ``METRICS_FLUSH_SECONDS``, and the
+    metrics endpoint adds up the files of all the processes, like the multiprocess mode of prometheus_client. Files
+    of stopped processes keep counting, empty the directory when the server restarts.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.flushed = time.monotonic()
+
+    def observe(self, name, view, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            counts = self.histograms.setdefault((name, view), [0] * (len(buckets) + 2))
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe_request(self, view, status_code, total, metrics):
+        self.observe('crm_request_duration_seconds', view, total)
+        self.observe('crm_request_sql_duration_seconds', view, metrics.sql_time)
+        self.observe('crm_request_sql_queries', view, metrics.queries)
+        self.observe('crm_request_template_duration_seconds', view, metrics.template_time)
+        self.increment('crm_responses_total', {'view': view, 'status': str(status_code)})
+        if metrics.slow_queries:
+            self.increment('crm_slow_queries_total', {'view': view}, metrics.slow_queries)
+        if settings.METRICS_DIR and time.monotonic() - self.flushed >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': [[name, view, counts] for (name, view), counts in self.histograms.items()],
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+            }
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f.name, os.path.join(directory, f'{socket.gethostname()}-{os.getpid()}.json'))
+
+    def collect(self):
+        """
+        Return the histograms and counters of every process, added up.
+        """
+        if not settings.METRICS_DIR:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for entry in os.scandir(settings.METRICS_DIR):
+                if entry.name.endswith('.json'):
+                    with open(entry.path) as f:
+                        snapshots.append(json.load(f))
+        histograms, counters = {}, {}
+        for snapshot in snapshots:
+            for name, view, counts in snapshot['histograms']:
+                total = histograms.setdefault((name, view), [0] * len(counts))
+                for i, count in enumerate(counts):
+                    total[i] += count
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+
+registry = MetricsRegistry()
+
+
+def format_labels(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in labels.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+def render_metrics(histograms, counters):
+    """
+    Format metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, view), counts in sorted(histograms.items()):
+            if metric != name:
+                continue
+            labels = format_labels({'view': view})
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {counts[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{{{format_labels(dict(labels))}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestTimingMiddleware:
+    """
+    Measure the SQL queries, SQL time, template time and total time of every request.
+
+    They are sent in a ``Server-Timing`` header, which browsers show in their network panel, and observed in the
+    histograms of the metrics endpoint. Requests slower than ``SLOW_REQUEST_MS`` and queries slower than
+    ``SLOW_QUERY_MS`` are logged with the name of their view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for connection in connections.all():
+            install_query_recorder(connection)
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - metrics.started
+        view = get_view_name(request)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.get_server_timing(total)
+        registry.observe_request(view, response.status_code, total, metrics)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning('Slow request %s %s in %s (%.1fms, %d queries in %.1fms, templates %.1fms)',
+                           request.method, request.path, view, total * 1000, metrics.queries,
+                           metrics.sql_time * 1000, metrics.template_time * 1000)
+        return response
+
+
+class MetricsView(generic.View):
+    """
+    Serve the request metrics to Prometheus, given the ``METRICS_TOKEN`` as a bearer token or from ``INTERNAL_IPS``.
+    """
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        allowed = (constant_time_compare(authorization, f'Bearer {token}') if token
+                   else request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS)
+        if not allowed:
+            return HttpResponseForbidden()
+        return HttpResponse(render_metrics(*registry.collect()), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import deque
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+
+class HealthCheckMixin:
+    """
+    Check that a persistent connection still works before the first query of each request, like the
+    ``CONN_HEALTH_CHECKS`` setting of later Django versions.
+
+    A connection dropped by the server, a failover or pgbouncer while the worker was idle is then replaced instead
+    of failing the request.
+    """
+    def __init__(self, *args, **kwargs):
+        super(HealthCheckMixin, self).__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+
+    def connect(self):
+        super(HealthCheckMixin, self).connect()
+        self.health_check_done = not self.needs_health_check()
+
+    def needs_health_check(self):
+        # A new connection has just proven it works.
+        return False
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or self.health_check_done:
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super(HealthCheckMixin, self)._cursor(name)
+
+    def close_if_unusable_or_obsolete(self):
+        super(HealthCheckMixin, self).close_if_unusable_or_obsolete()
+        # Called when a request starts and ends, the connection kept is checked again on its next use.
+        if self.health_check_enabled:
+            self.health_check_done = False
+
+
+class ConnectionPool:
+    """
+    Idle connections of one database in this process, shared by its threads.
+
+    Threads are never kept waiting: when no idle connection is left they open a new one, and connections coming
+    back to a full pool are closed. At most ``size`` connections are thus kept open between requests.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.idle = deque()
+        self.lock = threading.Lock()
+
+    def take(self):
+        # The most recently used connection is the least likely to have been dropped.
+        with self.lock:
+            while self.idle:
+                connection, isolation_level = self.idle.pop()
+                if not connection.closed:
+                    return connection, isolation_level
+        return None, None
+
+    def give(self, connection, isolation_level):
+        # Only connections outside any transaction are reused, a broken one reports an unknown status.
+        if not connection.closed and connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE:
+            with self.lock:
+                if len(self.idle) < self.size:
+                    self.idle.append((connection, isolation_level))
+                    return
+        connection.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection, isolation_level in idle:
+            connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, size):
+    # Keyed by process as well: a forked worker must never use the sockets of its parent.
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size)
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = [pool for (pid, alias), pool in _pools.items() if pid == os.getpid()]
+    for pool in pools:
+        pool.close()
+
+
+# Gunicorn forks its workers and the lead importer its validation processes. Closing the idle connections first
+# keeps a child from terminating, when it exits, the server sessions its parent still uses.
+os.register_at_fork(before=close_pools)
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    """
+    The PostgreSQL backend with health checks and, when ``POOL_SIZE`` is set, a connection pool local to the process.
+
+    With the pool, closing a connection at the end of a request hands it back instead: another thread of the process
+    picks it up without connecting again, even with ``CONN_MAX_AGE`` at 0. Connections are checked before their first
+    query after coming out of the pool. Nothing but the transaction status is carried between requests, which keeps
+    the pool usable behind pgbouncer in transaction pooling mode.
+    """
+    def __init__(self, *args, **kwargs):
+        super(DatabaseWrapper, self).__init__(*args, **kwargs)
+        self.pool_size = self.settings_dict.get('POOL_SIZE') or 0
+        self.reused_connection = False
+
+    def get_pool(self):
+        return get_pool(self.alias, self.pool_size) if self.pool_size else None
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool()
+        connection, isolation_level = pool.take() if pool is not None else (None, None)
+        self.reused_connection = connection is not None
+        if connection is None:
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+        self.isolation_level = isolation_level
+        return connection
+
+    def needs_health_check(self):
+        return self.reused_connection
+
+    def close_if_health_check_failed(self):
+        checked = self.connection is not None and not self.health_check_done
+        super(DatabaseWrapper, self).close_if_health_check_failed()
+        if checked and self.connection is None and self.pool_size:
+            # The server went away, so did the other idle connections.
+            self.get_pool().close()
+
+    def _close(self):
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super(DatabaseWrapper, self)._close()
+        with self.wrap_database_errors:
+            pool.give(self.connection, self.isolation_level)
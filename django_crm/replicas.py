@@ -0,0 +1,101 @@
+import asyncio
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Set when the browser wrote recently and has to read its own writes from the primary.
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_read_database = ContextVar('read_database', default=None)
+
+
+def get_read_replica(request):
+    """
+    Return the alias of the replica the read-only request should read from, ``None`` to stay on the primary.
+    """
+    if not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def read_from_replicas(view_func):
+    """
+    Send the queries of a read-only view, template rendering included, to a replica picked for the request.
+
+    Only wrap views that never write: ``ReplicaRouter`` sends every write to the primary, but a read following it
+    in the same request could miss it on a lagging replica.
+    """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = get_read_replica(request)
+            if alias is None or _read_database.get() is not None:
+                return await view_func(request, *args, **kwargs)
+            token = _read_database.set(alias)
+            try:
+                response = await view_func(request, *args, **kwargs)
+                if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                    await sync_to_async(response.render)()
+                return response
+            finally:
+                _read_database.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = get_read_replica(request)
+        if alias is None or _read_database.get() is not None:
+            return view_func(request, *args, **kwargs)
+        token = _read_database.set(alias)
+        try:
+            response = view_func(request, *args, **kwargs)
+            # Coroutines of async handlers are awaited by the wrapper of their async view.
+            if callable(getattr(response, 'render', None)) and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _read_database.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Read from the replica chosen by ``read_from_replicas`` while such a view runs, and from the primary otherwise.
+    """
+    def db_for_read(self, model, **hints):
+        # Reads inside a transaction, such as a metrics reconciliation, must see what it wrote.
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return _read_database.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        # Without a router, instances read from a replica would be saved back to it.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaPinMiddleware:
+    """
+    Have a browser read from the primary for ``REPLICA_PIN_SECONDS`` after any request that may have written, so
+    it sees its own changes even when the replicas lag behind.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
@@ -26,14 +26,19 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 
-from leads.views import LandingPage, SignUpView, DashboardView
+from django_crm.instrumentation import MetricsView
+from leads import async_views, views
+from leads.views import LandingPage, SignUpView
+
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', LandingPage.as_view(), name='landing-page'),
-    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('dashboard/', read_views.DashboardView.as_view(), name='dashboard'),
     path('leads/', include('leads.urls', namespace='leads')),
     path('agents/', include('agents.urls', namespace='agents')),
+    path('analytics/', include('analytics.urls', namespace='analytics')),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('signup/', SignUpView.as_view(), name='signup'),
@@ -41,6 +46,7 @@ urlpatterns = [
     path('password-reset-done/', PasswordResetDoneView.as_view(), name='password_reset_done'),
     path('password-reset-confirm/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('password-reset-complete/', PasswordResetCompleteView.as_view(), name='password_reset_complete'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
 if settings.DEBUG:
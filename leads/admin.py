@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.contrib.postgres.search import SearchQuery
 from .models import User, Lead, UserProfile, Category, FollowUp
+from .search import SEARCH_CONFIG, uses_search_vector
 
 
 class LeadAdmin(admin.ModelAdmin):
@@ -7,6 +9,12 @@ class LeadAdmin(admin.ModelAdmin):
     list_filter = ('category',)
     search_fields = ('first_name', 'last_name', 'email')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed search vector instead of scanning every row with ILIKE.
+        if not search_term or not uses_search_vector():
+            return super(LeadAdmin, self).get_search_results(request, queryset, search_term)
+        return queryset.filter(search_vector=SearchQuery(search_term, config=SEARCH_CONFIG)), False
+
 
 admin.site.register(Lead, LeadAdmin)
 
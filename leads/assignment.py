@@ -0,0 +1,184 @@
+import heapq
+from abc import ABC, abstractmethod
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from agents.models import Agent
+from .metrics import CONVERTED_CATEGORY_NAME
+from .models import Lead
+
+
+def record_agent_leads(agent_id, leads=0, converted_leads=0):
+    if agent_id is None or not (leads or converted_leads):
+        return
+    Agent.objects.filter(pk=agent_id).update(
+        lead_count=F('lead_count') + leads,
+        converted_lead_count=F('converted_lead_count') + converted_leads
+    )
+
+
+def recount_agent_leads(organization):
+    """
+    Recompute the lead counters of the agents of an organization with one grouped query.
+    """
+    counts = {
+        row['agent']: row for row in Lead.objects.filter(organization=organization, agent__isnull=False)
+        .order_by().values('agent')
+        .annotate(leads=Count('id'), converted=Count('id', filter=Q(category__name=CONVERTED_CATEGORY_NAME)))
+    }
+    agents = list(Agent.objects.filter(organization=organization))
+    for agent in agents:
+        row = counts.get(agent.pk, {})
+        agent.lead_count = row.get('leads', 0)
+        agent.converted_lead_count = row.get('converted', 0)
+    Agent.objects.bulk_update(agents, ['lead_count', 'converted_lead_count'])
+
+
+class AssignmentStrategy(ABC):
+    """
+    Pick agents for new leads.
+
+    Batches pick from counters loaded once, so that every decision is made in memory. A single lead is handed to
+    the first agent in ``ordering``, the same choice made by the database with one query.
+    """
+    ordering = ()
+
+    def __init__(self, agents):
+        self.agents = list(agents)
+
+    @classmethod
+    def next_agent(cls, agents):
+        # Agents being handed a lead by another request are skipped rather than waited for.
+        return agents.order_by(*cls.ordering).select_for_update(skip_locked=True).first()
+
+    @abstractmethod
+    def choose(self):
+        """
+        Return the agent to hand the next lead to, ``None`` when there is none.
+        """
+
+    def assigned(self, agent):
+        agent.lead_count += 1
+        agent.last_assigned = timezone.now()
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    ordering = (F('last_assigned').asc(nulls_first=True), 'pk')
+
+    def __init__(self, agents):
+        super(RoundRobinStrategy, self).__init__(agents)
+        self.queue = deque(sorted(
+            self.agents, key=lambda agent: (agent.last_assigned is not None, agent.last_assigned, agent.pk)
+        ))
+
+    def choose(self):
+        if not self.queue:
+            return None
+        self.queue.rotate(-1)
+        return self.queue[-1]
+
+
+class LeastLoadedStrategy(AssignmentStrategy):
+    ordering = (F('lead_count') - F('converted_lead_count'), 'pk')
+
+    def __init__(self, agents):
+        super(LeastLoadedStrategy, self).__init__(agents)
+        self.heap = [(self.get_load(agent), agent.pk, agent) for agent in self.agents]
+        heapq.heapify(self.heap)
+
+    def get_load(self, agent):
+        return agent.open_lead_count
+
+    def choose(self):
+        return self.heap[0][2] if self.heap else None
+
+    def assigned(self, agent):
+        super(LeastLoadedStrategy, self).assigned(agent)
+        heapq.heapreplace(self.heap, (self.get_load(agent), agent.pk, agent))
+
+
+class WeightedConversionStrategy(LeastLoadedStrategy):
+    """
+    Hand out leads in proportion to the agents' conversion rates.
+    """
+    # get_load with the conversion rate inverted: (open + 1) * (leads + 2) / (converted + 1).
+    ordering = (ExpressionWrapper(
+        Cast(F('lead_count') - F('converted_lead_count') + 1, FloatField()) * Cast(F('lead_count') + 2, FloatField())
+        / Cast(F('converted_lead_count') + 1, FloatField()),
+        output_field=FloatField()
+    ), 'pk')
+
+    def get_load(self, agent):
+        return (agent.open_lead_count + 1) / agent.conversion_rate
+
+
+STRATEGIES = {
+    'round_robin': RoundRobinStrategy,
+    'least_loaded': LeastLoadedStrategy,
+    'weighted': WeightedConversionStrategy,
+}
+
+
+class LeadDistributor:
+    def __init__(self, organization, strategy):
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Unknown assignment strategy {strategy!r}, choose one of {", ".join(STRATEGIES)}')
+        self.organization = organization
+        self.strategy_class = STRATEGIES[strategy]
+
+    @cached_property
+    def strategy(self):
+        return self.strategy_class(Agent.objects.filter(organization=self.organization).order_by('pk'))
+
+    def assign(self, lead):
+        """
+        Set the agent of an unsaved lead. The lead counters are updated by the lead save signal.
+
+        Reads and updates a single agent row. Save the lead in the same transaction: the agent stays locked until
+        its counters include the lead.
+        """
+        with transaction.atomic():
+            agent = self.strategy_class.next_agent(Agent.objects.filter(organization=self.organization))
+            if agent is not None:
+                lead.agent = agent
+                Agent.objects.filter(pk=agent.pk).update(last_assigned=timezone.now())
+        return agent
+
+    def distribute(self, queryset, batch_size=1000):
+        """
+        Assign every lead of ``queryset`` with one ``UPDATE`` per agent and batch.
+        """
+        assigned = 0
+        ids = queryset.filter(organization=self.organization, agent__isnull=True).order_by('date_added', 'pk') \
+            .values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) >= batch_size:
+                assigned += self.distribute_batch(batch)
+                batch = []
+        if batch:
+            assigned += self.distribute_batch(batch)
+        return assigned
+
+    def distribute_batch(self, ids):
+        from .bulk import bulk_assign
+
+        by_agent = {}
+        for pk in ids:
+            agent = self.strategy.choose()
+            if agent is None:
+                return 0
+            by_agent.setdefault(agent, []).append(pk)
+            self.strategy.assigned(agent)
+        assigned = 0
+        with transaction.atomic():
+            for agent, agent_ids in by_agent.items():
+                # Leads assigned meanwhile by someone else are left alone and not counted.
+                assigned += bulk_assign(Lead.objects.filter(pk__in=agent_ids, agent__isnull=True), agent)
+        return assigned
@@ -0,0 +1,65 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from django.views import generic
+
+from agents.mixins import OrganizerAndLoginRequiredMixin
+from django_crm.cache import cache_per_organization
+from django_crm.concurrency import AsyncViewMixin, gather_queries, run_query
+from django_crm.replicas import read_from_replicas
+from . import views
+from .metrics import get_dashboard_metrics, get_recent_metrics, get_total_leads
+
+
+# Routed instead of the views of the same name when ASYNC_VIEWS is set. Independent queries run concurrently, which
+# only pays off when served by an ASGI server, see django_crm/gunicorn_asgi.py. They are wrapped by read_from_replicas
+# again: the wrapper of the synchronous view returns before the coroutine of the handler is awaited.
+
+
+# Not a subclass of views.DashboardView, whose dispatch is wrapped by the synchronous cache decorator.
+@method_decorator([cache_per_organization(key_prefix='dashboard'), read_from_replicas], name='dispatch')
+class DashboardView(AsyncViewMixin, OrganizerAndLoginRequiredMixin, generic.TemplateView):
+    template_name = views.DashboardView.template_name
+
+    async def get(self, request, *args, **kwargs):
+        organization = request.organization
+        total_leads, recent = await gather_queries(partial(get_total_leads, organization),
+                                                   partial(get_recent_metrics, organization))
+        if total_leads is None:
+            metrics = await run_query(get_dashboard_metrics, organization)
+        else:
+            metrics = {'total_lead_count': total_leads, **recent}
+        return self.render_to_response(self.get_context_data(**metrics))
+
+
+@method_decorator(read_from_replicas, name='dispatch')
+class LeadListView(AsyncViewMixin, views.LeadListView):
+    async def get(self, request, *args, **kwargs):
+        # Validating the filters looks up the chosen category and agent.
+        await sync_to_async(self.get_filter_form)()
+        queries = [self.get_queryset]
+        if request.user.is_organizer:
+            queries.append(self.get_unassigned_leads)
+        self.object_list, *unassigned_leads = await gather_queries(*queries)
+        context = await sync_to_async(self.get_context_data)(
+            unassigned_leads=unassigned_leads[0] if unassigned_leads else None
+        )
+        return self.render_to_response(context)
+
+
+@method_decorator(read_from_replicas, name='dispatch')
+class LeadDetailView(AsyncViewMixin, views.LeadDetailView):
+    async def get(self, request, *args, **kwargs):
+        # The follow-ups are fetched alongside the lead and only shown once the lead is known to be visible.
+        self.object, followups = await gather_queries(
+            self.get_object, partial(self.get_followups, kwargs.get(self.pk_url_kwarg))
+        )
+        context = await sync_to_async(self.get_context_data)(object=self.object, followups=followups)
+        return self.render_to_response(context)
+
+
+@method_decorator(read_from_replicas, name='dispatch')
+class LeadJsonView(AsyncViewMixin, views.LeadJsonView):
+    async def get(self, request, *args, **kwargs):
+        return await run_query(super(LeadJsonView, self).get, request, *args, **kwargs)
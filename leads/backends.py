@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Load the user of a session together with its profile, agent and agent organization in one query, and keep
+    them in the cache so that authenticated requests usually run no query at all to resolve who is calling.
+
+    Cached users are dropped by the ``User``, ``UserProfile`` and ``Agent`` signals. Only the cache of the process
+    running them would be, so a deactivated user is loaded again on every request unless ``SHARED_CACHE`` is set.
+    """
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key) if settings.SHARED_CACHE else None
+        if user is None:
+            try:
+                user = User.objects.select_related('userprofile', 'agent__organization').get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+            if settings.SHARED_CACHE:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
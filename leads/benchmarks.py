@@ -0,0 +1,189 @@
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import import_module
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from agents.models import Agent
+from .models import Category, FollowUp, FollowUpUpload, Lead
+
+URL_MODULES = ('leads.urls', 'agents.urls')
+
+# Object whose primary key fills the ``pk`` of each URL, with the lookups keeping it inside the organization and
+# among the leads of the agent.
+SAMPLE_OBJECTS = {
+    'leads:lead-detail': (Lead, 'organization', 'agent'),
+    'leads:lead-update': (Lead, 'organization', 'agent'),
+    'leads:lead-delete': (Lead, 'organization', 'agent'),
+    'leads:assign-agent': (Lead, 'organization', 'agent'),
+    'leads:lead-followup-create': (Lead, 'organization', 'agent'),
+    'leads:lead-category-update': (Lead, 'organization', 'agent'),
+    'leads:category-detail': (Category, 'organization', None),
+    'leads:category-update': (Category, 'organization', None),
+    'leads:category-delete': (Category, 'organization', None),
+    'leads:lead-followup-update': (FollowUp, 'lead__organization', 'lead__agent'),
+    'leads:lead-followup-delete': (FollowUp, 'lead__organization', 'lead__agent'),
+    'leads:followup-file': (FollowUp, 'lead__organization', 'lead__agent'),
+    'leads:followup-upload-chunk': (FollowUpUpload, 'followup__lead__organization', 'followup__lead__agent'),
+    'agents:agent-detail': (Agent, 'organization', None),
+    'agents:agent-update': (Agent, 'organization', None),
+    'agents:agent-delete': (Agent, 'organization', None),
+}
+
+
+def percentile(values, p):
+    # Nearest rank on sorted values.
+    index = max(int(round(p / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        'min': latencies[0] * 1000,
+        'p50': percentile(latencies, 50) * 1000,
+        'p90': percentile(latencies, 90) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': latencies[-1] * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+    }
+
+
+def iter_urls():
+    """
+    Yield the ``namespace:name`` and pattern of every URL of the leads and agents applications.
+    """
+    for module_name in URL_MODULES:
+        module = import_module(module_name)
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{module.app_name}:{pattern.name}', pattern
+
+
+def get_path(name, pattern, organization, agent=None):
+    """
+    Return the path of a URL for an organization or one of its agents, ``None`` when there is no object to show.
+    """
+    if not pattern.pattern.converters:
+        return reverse(name)
+    if name not in SAMPLE_OBJECTS:
+        return None
+    model, organization_lookup, agent_lookup = SAMPLE_OBJECTS[name]
+    objects = model.objects.filter(**{organization_lookup: organization})
+    if agent is not None and agent_lookup is not None:
+        objects = objects.filter(**{agent_lookup: agent})
+    if name == 'leads:followup-file':
+        objects = objects.exclude(file='')
+    pk = objects.order_by('-pk').values_list('pk', flat=True).first()
+    return reverse(name, kwargs={'pk': pk}) if pk is not None else None
+
+
+def read_response(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, path, iterations, clear_cache=False):
+    read_response(client.get(path))
+    latencies = []
+    query_counts = []
+    for _ in range(iterations):
+        if clear_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = read_response(client.get(path))
+            latencies.append(time.perf_counter() - start)
+        query_counts.append(len(queries))
+    # Traced separately, tracing allocations slows requests down several times.
+    if clear_cache:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        read_response(client.get(path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'latency_ms': summarize(latencies),
+        'queries': max(query_counts),
+        'memory_peak_kb': peak / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(users, iterations=20, clear_cache=False, names=None):
+    """
+    Request every GET page of the leads and agents applications as each user and return the report.
+
+    Each page is requested once to warm up, ``iterations`` times to time it and count its queries, and once more
+    to trace its peak memory.
+    """
+    results = []
+    # The test client always asks for the testserver host.
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            agent = None if user.is_organizer else user.agent
+            organization = user.userprofile if user.is_organizer else agent.organization
+            for name, pattern in iter_urls():
+                if names and name not in names:
+                    continue
+                result = {'url': name, 'user': user.username, 'role': 'organizer' if user.is_organizer else 'agent'}
+                if not hasattr(pattern.callback.view_class, 'get'):
+                    results.append({**result, 'skipped': 'no GET handler'})
+                    continue
+                path = get_path(name, pattern, organization, agent)
+                if path is None:
+                    results.append({**result, 'skipped': 'no object to request'})
+                    continue
+                results.append({**result, 'path': path, **measure(client, path, iterations, clear_cache)})
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'leads': Lead.objects.count(),
+            'iterations': iterations,
+            'clear_cache': clear_cache,
+        },
+        'results': results,
+    }
+
+
+def compare_reports(baseline, report):
+    """
+    Yield ``(url, role, metric, before, after)`` for the measures of both reports.
+    """
+    before = {(result['url'], result['role']): result for result in baseline['results'] if 'skipped' not in result}
+    for result in report['results']:
+        old = before.get((result['url'], result['role']))
+        if old is None or 'skipped' in result:
+            continue
+        yield result['url'], result['role'], 'p50 ms', old['latency_ms']['p50'], result['latency_ms']['p50']
+        yield result['url'], result['role'], 'p99 ms', old['latency_ms']['p99'], result['latency_ms']['p99']
+        yield result['url'], result['role'], 'queries', old['queries'], result['queries']
+        yield result['url'], result['role'], 'memory kb', old['memory_peak_kb'], result['memory_peak_kb']
@@ -0,0 +1,124 @@
+import os
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from agents.models import Agent
+from django_crm.cache import bump_organization_version
+from . import metrics, search, thumbnails
+from .assignment import record_agent_leads
+from .models import Category, FollowUp, FollowUpUpload, Lead
+
+
+def _record_conversions(queryset, delta):
+    for row in queryset.order_by().values('organization', 'date_added').annotate(count=Count('id')):
+        metrics.record_leads(row['organization'], row['date_added'], converted_leads=delta * row['count'])
+    for row in queryset.filter(agent__isnull=False).order_by().values('agent').annotate(count=Count('id')):
+        record_agent_leads(row['agent'], converted_leads=delta * row['count'])
+
+
+def _bump_organization_versions(queryset):
+    # Queryset updates send no signal, so the cached pages of the organizations are invalidated here.
+    for organization_id in queryset.order_by().values_list('organization', flat=True).distinct():
+        bump_organization_version(organization_id)
+
+
+def _delete_files(part_paths, file_names, picture_names):
+    for path in part_paths:
+        if os.path.exists(path):
+            os.remove(path)
+    file_storage = FollowUp._meta.get_field('file').storage
+    for name in file_names:
+        file_storage.delete(name)
+    picture_storage = Lead._meta.get_field('profile_picture').storage
+    for name in picture_names:
+        picture_storage.delete(name)
+        thumbnails.delete_thumbnails(name, storage=picture_storage)
+
+
+def bulk_assign(queryset, agent):
+    """
+    Hand the leads of ``queryset`` to ``agent`` with a single ``UPDATE``, keeping the agent counters in step.
+    """
+    converted_name = metrics.CONVERTED_CATEGORY_NAME
+    with transaction.atomic():
+        moved = queryset.exclude(agent=agent) if agent is not None else queryset.filter(agent__isnull=False)
+        leads = converted = 0
+        for row in moved.order_by().values('agent').annotate(
+                leads=Count('id'), converted=Count('id', filter=Q(category__name=converted_name))):
+            record_agent_leads(row['agent'], leads=-row['leads'], converted_leads=-row['converted'])
+            leads += row['leads']
+            converted += row['converted']
+        if agent is not None:
+            record_agent_leads(agent.pk, leads=leads, converted_leads=converted)
+            Agent.objects.filter(pk=agent.pk).update(last_assigned=timezone.now())
+        _bump_organization_versions(queryset)
+        return queryset.update(agent=agent)
+
+
+def bulk_categorize(queryset, category):
+    """
+    Move the leads of ``queryset`` to ``category`` with a single ``UPDATE``.
+
+    Leads entering a Converted category get their ``converted_date`` set, while the ones that were already
+    converted keep theirs.
+    """
+    converted_name = metrics.CONVERTED_CATEGORY_NAME
+    with transaction.atomic():
+        _bump_organization_versions(queryset)
+        # Queryset updates send no signal, so the dashboard metrics are adjusted here.
+        if category.name == converted_name:
+            _record_conversions(queryset.exclude(category__name=converted_name), 1)
+            converted_categories = Category.objects.filter(name=converted_name).values('pk')
+            return queryset.update(category=category, converted_date=Case(
+                When(category__in=converted_categories, then=F('converted_date')),
+                default=Value(timezone.now())
+            ))
+        _record_conversions(queryset.filter(category__name=converted_name), -1)
+        return queryset.update(category=category)
+
+
+def bulk_delete(queryset):
+    """
+    Delete the leads of ``queryset`` with their follow-ups and uploads, one ``DELETE`` per table.
+
+    ``queryset.delete()`` would load every lead and follow-up to send their signals, the metrics and agent counters
+    are adjusted here instead from one grouped query. The stored files of the leads, follow-ups and unfinished uploads
+    are removed once the transaction commits.
+    """
+    converted_name = metrics.CONVERTED_CATEGORY_NAME
+    with transaction.atomic():
+        # The leads are selected once: deleting the follow-ups could change what the queryset matches.
+        ids = list(queryset.order_by().values_list('pk', flat=True))
+        if not ids:
+            return 0
+        leads = Lead.objects.filter(pk__in=ids)
+        organization_ids, agents = set(), {}
+        for row in leads.order_by().values('organization', 'date_added', 'agent').annotate(
+                leads=Count('id'), converted=Count('id', filter=Q(category__name=converted_name))):
+            metrics.record_leads(row['organization'], row['date_added'], new_leads=-row['leads'],
+                                 converted_leads=-row['converted'])
+            organization_ids.add(row['organization'])
+            if row['agent'] is not None:
+                leads_count, converted = agents.get(row['agent'], (0, 0))
+                agents[row['agent']] = (leads_count + row['leads'], converted + row['converted'])
+        for agent_id, (leads_count, converted) in agents.items():
+            record_agent_leads(agent_id, leads=-leads_count, converted_leads=-converted)
+
+        uploads = FollowUpUpload.objects.filter(followup__lead__in=ids)
+        followups = FollowUp.objects.filter(lead__in=ids)
+        part_paths = [upload.part_path for upload in uploads.only('pk')]
+        file_names = list(followups.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True))
+        picture_names = list(leads.exclude(profile_picture='').exclude(profile_picture__isnull=True).values_list(
+            'profile_picture', flat=True))
+        transaction.on_commit(lambda: _delete_files(part_paths, file_names, picture_names))
+
+        uploads._raw_delete(queryset.db)
+        followups._raw_delete(queryset.db)
+        deleted = leads._raw_delete(queryset.db)
+        for organization_id in organization_ids:
+            if not search.uses_search_vector():
+                search.invalidate_index(organization_id)
+            bump_organization_version(organization_id)
+        return deleted
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import search
+from .models import FollowUp, Lead
+
+# Fields a merged lead takes from its duplicates when it has no value of its own.
+MERGED_FIELDS = ('age', 'agent', 'category', 'description', 'phone_number', 'email', 'profile_picture',
+                 'converted_date')
+
+
+class UnionFind:
+    """
+    Disjoint sets of primary keys, the smallest key of a set is its root.
+    """
+    def __init__(self):
+        self.parents = {}
+
+    def find(self, item):
+        parents = self.parents
+        root = item
+        while parents.setdefault(root, root) != root:
+            root = parents[root]
+        while item != root:
+            parents[item], item = root, parents[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parents[max(a, b)] = min(a, b)
+
+    def groups(self):
+        groups = {}
+        for item in self.parents:
+            groups.setdefault(self.find(item), []).append(item)
+        return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+def find_duplicate(organization, email_key='', phone_key='', exclude=None):
+    leads = Lead.objects.filter(organization=organization).matching(email_key, phone_key)
+    if exclude is not None:
+        leads = leads.exclude(pk=exclude)
+    return leads.order_by('pk').first()
+
+
+def find_existing_keys(organization, email_keys, phone_keys):
+    """
+    Map the ``('email_key', key)`` and ``('phone_key', key)`` pairs already used in the organization to the lead
+    holding them, in a single indexed query.
+    """
+    existing = {}
+    leads = Lead.objects.filter(organization=organization).filter(
+        Q(email_key__in=[key for key in email_keys if key]) | Q(phone_key__in=[key for key in phone_keys if key])
+    )
+    for pk, email_key, phone_key in leads.order_by('-pk').values_list('pk', 'email_key', 'phone_key'):
+        existing[('email_key', email_key)] = pk
+        existing[('phone_key', phone_key)] = pk
+    return existing
+
+
+def find_duplicate_groups(organization):
+    """
+    Return the primary keys of the leads of the organization sharing an email or phone key, grouped by person.
+
+    The database only hands over the leads whose key is used more than once, the groups are then joined over shared
+    keys with a union-find so that a lead matching one lead by email and another by phone ends up with both.
+    """
+    leads = Lead.objects.filter(organization=organization).order_by()
+    groups = UnionFind()
+    for name in ('email_key', 'phone_key'):
+        repeated = leads.exclude(**{name: ''}).values(name).annotate(count=Count('pk')).filter(count__gt=1)
+        first_leads = {}
+        rows = leads.filter(**{f'{name}__in': repeated.values(name)}).order_by('pk').values_list('pk', name)
+        for pk, key in rows.iterator():
+            groups.union(first_leads.setdefault(key, pk), pk)
+    return groups.groups()
+
+
+def merge_leads(lead_ids):
+    """
+    Merge the leads into the oldest one: it takes over the follow-ups of the others and the values it is missing,
+    then the others are deleted. Their signals keep the metrics and the agent counters right.
+    """
+    with transaction.atomic():
+        leads = list(Lead.objects.select_for_update().filter(pk__in=lead_ids).order_by('pk'))
+        if len(leads) < 2:
+            return None
+        lead, duplicates = leads[0], leads[1:]
+        duplicate_ids = [duplicate.pk for duplicate in duplicates]
+        for duplicate in duplicates:
+            for name in MERGED_FIELDS:
+                attname = Lead._meta.get_field(name).attname
+                if not getattr(lead, attname) and getattr(duplicate, attname):
+                    setattr(lead, attname, getattr(duplicate, attname))
+        moved = FollowUp.objects.filter(lead_id__in=duplicate_ids).update(lead=lead)
+        lead.save()
+        Lead.objects.filter(pk__in=duplicate_ids).delete()
+        if moved:
+            Lead.objects.filter(pk=lead.pk).update_followup_summary()
+            search.index_lead(lead.pk, lead.organization_id)
+    return lead
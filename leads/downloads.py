@@ -0,0 +1,87 @@
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from .uploads import BLOCK_SIZE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Return the ``(start, end)`` byte positions, inclusive, requested by a single range ``Range`` header.
+
+    Returns ``None`` when the header is missing or not understood, in which case the whole file is sent, and
+    raises ``ValueError`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # A suffix range: the last ``end`` bytes.
+        length = int(end)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def iter_range(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        f.close()
+
+
+def serve_file(request, field_file, filename=None):
+    """
+    Send a stored file without loading it in memory, honouring single ``Range`` requests.
+
+    With ``SENDFILE_BACKEND`` set the response only carries a header telling the web server which file to send.
+    """
+    filename = filename or os.path.basename(field_file.name)
+    disposition = f"attachment; filename*=UTF-8''{quote(filename)}"
+    if settings.SENDFILE_BACKEND:
+        response = HttpResponse()
+        if settings.SENDFILE_BACKEND == 'nginx':
+            response['X-Accel-Redirect'] = quote(settings.SENDFILE_NGINX_PREFIX + field_file.name)
+        else:
+            response['X-Sendfile'] = field_file.path
+        # The web server fills in the body, its type and its length.
+        del response['Content-Type']
+        response['Content-Disposition'] = disposition
+        return response
+
+    size = field_file.size
+    try:
+        requested = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if requested is None:
+        response = FileResponse(field_file.open('rb'), as_attachment=True, filename=filename)
+    else:
+        start, end = requested
+        response = StreamingHttpResponse(iter_range(field_file.open('rb'), start, end - start + 1), status=206,
+                                         content_type='application/octet-stream')
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = disposition
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,108 @@
+import csv
+import zlib
+from datetime import date, datetime
+from io import StringIO
+
+# Column name and lookup of every exported value. The follow-up count is maintained on the lead, exporting it
+# costs no aggregation over the follow-up table.
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('age', 'age'),
+    ('email', 'email'),
+    ('phone_number', 'phone_number'),
+    ('description', 'description'),
+    ('date_added', 'date_added'),
+    ('converted_date', 'converted_date'),
+    ('category', 'category__name'),
+    ('agent', 'agent__user__username'),
+    ('agent_email', 'agent__user__email'),
+    ('followup_count', 'followup_count'),
+    ('last_followup_at', 'last_followup_at'),
+)
+EXPORT_FORMATS = ('csv', 'xlsx')
+# First characters of the text values prefixed with a quote, see escape_formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Rows are written out in pieces of about this many characters.
+CHUNK_CHARACTERS = 64 * 1024
+
+
+class ExportError(Exception):
+    pass
+
+
+def get_export_rows(queryset, chunk_size=2000):
+    """
+    Iterate over the export columns of the leads of ``queryset`` in primary key order.
+
+    On PostgreSQL ``iterator`` reads through a server-side cursor, ``chunk_size`` rows at a time, so the whole
+    result is never held in memory.
+    """
+    lookups = [lookup for name, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def escape_formula(value):
+    # Spreadsheets run text starting with these as a formula, lead fields are typed in by anyone.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return escape_formula(value)
+
+
+def iter_csv(rows):
+    """
+    Yield the CSV export of ``rows``: the header on its own, so that a response starts right away, then pieces of
+    about ``CHUNK_CHARACTERS``.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, lookup in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow([format_value(value) for value in row])
+        if buffer.tell() >= CHUNK_CHARACTERS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_gzip(chunks, encoding='utf-8'):
+    # A gzip member, flushed after every chunk so that the receiving end is never kept waiting.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode(encoding)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def write_xlsx(rows, file):
+    """
+    Write the export of ``rows`` as a workbook. Needs openpyxl, whose write-only mode keeps memory flat but only
+    produces the file once every row is written.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError('The xlsx format needs openpyxl, install the requirements first')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Leads')
+    sheet.append([name for name, lookup in EXPORT_COLUMNS])
+    for row in rows:
+        # Excel has no time zones.
+        sheet.append([
+            value.replace(tzinfo=None) if isinstance(value, datetime) else escape_formula(value) for value in row
+        ])
+    workbook.save(file)
+
@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UsernameField
 
+from .dedup import find_duplicate
 from .models import Lead, User, Category, FollowUp
+from .normalization import normalize_email, normalize_phone
 from agents.models import Agent
 
 
@@ -14,6 +16,24 @@ class LeadForm(forms.ModelForm):
             'converted_date'
         )
 
+    def __init__(self, *args, **kwargs):
+        self.organization = kwargs.pop('organization', None)
+        super(LeadForm, self).__init__(*args, **kwargs)
+
+    def clean(self):
+        cleaned_data = super(LeadForm, self).clean()
+        if self.organization is None:
+            return cleaned_data
+        email_key = normalize_email(cleaned_data.get('email'))
+        phone_key = normalize_phone(cleaned_data.get('phone_number'))
+        duplicate = find_duplicate(self.organization, email_key, phone_key, exclude=self.instance.pk)
+        if duplicate is not None:
+            if email_key and duplicate.email_key == email_key:
+                self.add_error('email', f'{duplicate} already has this email')
+            else:
+                self.add_error('phone_number', f'{duplicate} already has this phone number')
+        return cleaned_data
+
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
@@ -34,6 +54,99 @@ class AssignAgentForm(forms.Form):
         self.fields['agent'].queryset = agents
 
 
+class LeadFilterForm(forms.Form):
+    SORT_CHOICES = (
+        ('-date_added', 'Newest first'),
+        ('date_added', 'Oldest first'),
+        ('first_name', 'First name (A-Z)'),
+        ('-first_name', 'First name (Z-A)'),
+        ('last_name', 'Last name (A-Z)'),
+        ('-last_name', 'Last name (Z-A)'),
+        ('age', 'Youngest first'),
+        ('-age', 'Oldest age first'),
+        ('-followup_count', 'Most followed up'),
+        ('followup_count', 'Least followed up'),
+    )
+
+    category = forms.ModelChoiceField(queryset=Category.objects.none(), required=False)
+    agent = forms.ModelChoiceField(queryset=Agent.objects.none(), required=False)
+    age_min = forms.IntegerField(min_value=0, required=False)
+    age_max = forms.IntegerField(min_value=0, required=False)
+    added_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    added_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    not_contacted_days = forms.IntegerField(min_value=1, required=False, label='Not contacted for (days)')
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+    def __init__(self, *args, **kwargs):
+        request = kwargs.pop('request')
+        user = request.user
+        super(LeadFilterForm, self).__init__(*args, **kwargs)
+        organization = request.organization
+        self.fields['category'].queryset = Category.objects.filter(organization=organization)
+        if user.is_organizer:
+            self.fields['agent'].queryset = Agent.objects.filter(organization=organization).select_related('user')
+        else:
+            del self.fields['agent']
+
+    def filter_queryset(self, queryset):
+        data = self.cleaned_data if self.is_bound else {}
+        lookups = {
+            'category': 'category',
+            'agent': 'agent',
+            'age_min': 'age__gte',
+            'age_max': 'age__lte',
+            'added_from': 'date_added__gte',
+            'added_to': 'date_added__lte',
+        }
+        filters = {lookup: data[name] for name, lookup in lookups.items() if data.get(name) is not None}
+        if data.get('not_contacted_days'):
+            queryset = queryset.stale(data['not_contacted_days'])
+        return queryset.filter(**filters)
+
+    def get_ordering(self):
+        sort = self.cleaned_data.get('sort') if self.is_bound else None
+        sort = sort or self.SORT_CHOICES[0][0]
+        return (sort, '-id' if sort.startswith('-') else 'id')
+
+
+class LeadBulkActionForm(forms.Form):
+    ASSIGN = 'assign'
+    CATEGORIZE = 'categorize'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (ASSIGN, 'Assign to an agent'),
+        (CATEGORIZE, 'Move to a category'),
+        (DELETE, 'Delete'),
+    )
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    agent = forms.ModelChoiceField(queryset=Agent.objects.none(), required=False)
+    category = forms.ModelChoiceField(queryset=Category.objects.none(), required=False)
+    select_all = forms.BooleanField(required=False, label='Apply to every lead matching the filters')
+
+    def __init__(self, *args, **kwargs):
+        request = kwargs.pop('request')
+        super(LeadBulkActionForm, self).__init__(*args, **kwargs)
+        organization = request.user.userprofile
+        self.fields['agent'].queryset = Agent.objects.filter(organization=organization).select_related('user')
+        self.fields['category'].queryset = Category.objects.filter(organization=organization)
+
+    def clean(self):
+        cleaned_data = super(LeadBulkActionForm, self).clean()
+        try:
+            cleaned_data['leads'] = [int(pk) for pk in self.data.getlist('leads')]
+        except ValueError:
+            raise forms.ValidationError('The selection is invalid')
+        if not cleaned_data['leads'] and not cleaned_data.get('select_all'):
+            raise forms.ValidationError('Select at least one lead')
+        action = cleaned_data.get('action')
+        if action == self.ASSIGN and not cleaned_data.get('agent'):
+            self.add_error('agent', 'Choose the agent to assign')
+        if action == self.CATEGORIZE and not cleaned_data.get('category'):
+            self.add_error('category', 'Choose the category to move the leads to')
+        return cleaned_data
+
+
 class LeadCategoryUpdateForm(forms.ModelForm):
     class Meta:
         model = Lead
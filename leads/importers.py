@@ -0,0 +1,413 @@
+import csv
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, connections, transaction
+
+from django_crm.cache import bump_organization_version
+from .dedup import find_existing_keys
+from .metrics import record_leads
+from .models import Lead, LeadImportCheckpoint
+from .normalization import KEY_FIELDS, get_blocking_keys
+from .search import index_new_leads
+
+IMPORT_FIELDS = ('first_name', 'last_name', 'age', 'description', 'phone_number', 'email')
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email')
+# Columns written by COPY. Django leaves no default in the database, every NOT NULL column has to be listed.
+COPY_FIELDS = IMPORT_FIELDS + tuple(KEY_FIELDS) + ('organization', 'date_added', 'followup_count', 'has_thumbnails')
+
+
+class LeadImportError(Exception):
+    pass
+
+
+class ImportStats:
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed
+        return (self.created + self.rejected) / elapsed if elapsed else 0.0
+
+
+def clean_lead_row(row):
+    cleaned = {}
+    for name in IMPORT_FIELDS:
+        field = Lead._meta.get_field(name)
+        value = (row.get(name) or '').strip()
+        if not value:
+            if name in REQUIRED_FIELDS:
+                raise ValidationError({name: ['This field is required.']})
+            cleaned[name] = field.get_default()
+            continue
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as e:
+            raise ValidationError({name: e.messages})
+    cleaned.update(get_blocking_keys(cleaned['first_name'], cleaned['last_name'], cleaned['email'],
+                                     cleaned['phone_number']))
+    return cleaned
+
+
+def format_errors(error):
+    return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items())
+
+
+def clean_lead_chunk(rows):
+    """
+    Validate a chunk of ``(line_number, row)`` pairs into ``(line_number, lead)`` pairs and rejects.
+
+    Runs without touching the database so it can be shipped to worker processes.
+    """
+    leads, rejects = [], []
+    for line_number, row in rows:
+        try:
+            leads.append((line_number, clean_lead_row(row)))
+        except ValidationError as e:
+            rejects.append((line_number, row, format_errors(e)))
+    return leads, rejects
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def plan_shards(file_name, shard_size):
+    """
+    Split a CSV file into ``(start, end)`` byte ranges aligned on line boundaries, skipping the header.
+    """
+    shards = []
+    with open(file_name, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while start < size:
+            f.seek(min(start + shard_size, size))
+            f.readline()
+            end = f.tell()
+            shards.append((start, end))
+            start = end
+    return shards
+
+
+def parse_shard(file_name, fieldnames, shard, start, end, skip):
+    """
+    Validate the rows of one shard, ignoring the first ``skip`` rows that a previous run already handled.
+
+    Rows are identified by their index inside the shard so that checkpoints survive a restart.
+    """
+    with open(file_name, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start).decode('utf-8')
+    rows = csv.DictReader(StringIO(data, newline=''), fieldnames=fieldnames)
+    leads, rejects, total = [], [], 0
+    for index, row in enumerate(rows):
+        total += 1
+        if index < skip:
+            continue
+        try:
+            leads.append((index, clean_lead_row(row)))
+        except ValidationError as e:
+            rejects.append((index, row, format_errors(e)))
+    return shard, leads, rejects, total
+
+
+def imap_bounded(func, args_iterable, workers):
+    """
+    Yield ``func(*args)`` for every item of ``args_iterable`` in order, using a pool of ``workers`` processes.
+
+    Only a bounded window of tasks is in flight so memory does not grow with the input size.
+    """
+    if workers <= 1:
+        for args in args_iterable:
+            yield func(*args)
+        return
+
+    # Forked workers must not inherit open database sockets.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        pending = deque()
+        for args in args_iterable:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+class LeadImporter:
+    def __init__(self, organization, batch_size=1000, workers=1, dry_run=False, reject_file=None, use_copy=None,
+                 skip_duplicates=True, stdout=None):
+        self.organization = organization
+        self.skip_duplicates = skip_duplicates
+        self.batch_size = batch_size
+        self.workers = workers
+        self.dry_run = dry_run
+        self.reject_file = reject_file
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.stdout = stdout
+        self.stats = ImportStats()
+        self._reject_handle = None
+        self._reject_writer = None
+        self._reject_mode = 'w'
+
+    def run(self, file_name):
+        with open(file_name, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            self.check_header(reader.fieldnames)
+            self.fieldnames = reader.fieldnames
+            rows = ((reader.line_num, row) for row in reader)
+            try:
+                for leads, rejects in self.clean_chunks(iter_chunks(rows, self.batch_size)):
+                    self.reject(rejects)
+                    self.write(leads)
+                    self.report()
+            finally:
+                self.close()
+        self.stats.finished = time.monotonic()
+        return self.stats
+
+    def check_header(self, fieldnames):
+        if not fieldnames:
+            raise LeadImportError('The file is empty')
+        unknown = set(fieldnames) - set(IMPORT_FIELDS)
+        if unknown:
+            raise LeadImportError(f'Unknown columns: {", ".join(sorted(unknown))}')
+        missing = set(REQUIRED_FIELDS) - set(fieldnames)
+        if missing:
+            raise LeadImportError(f'Missing columns: {", ".join(sorted(missing))}')
+
+    def clean_chunks(self, chunks):
+        return imap_bounded(clean_lead_chunk, ((chunk,) for chunk in chunks), self.workers)
+
+    def write(self, leads):
+        with transaction.atomic():
+            leads, duplicates = self.filter_duplicates(leads)
+            if not self.dry_run and leads:
+                self.insert([lead for line_number, lead in leads])
+        self.reject(duplicates)
+        self.count(created=len(leads))
+
+    def filter_duplicates(self, leads):
+        """
+        Split ``(line_number, lead)`` pairs into new leads and rejects of the leads whose email or phone is already
+        in the organization or earlier in the chunk.
+
+        Earlier chunks are committed by then, so duplicates anywhere in the file are caught with one indexed query
+        per chunk. A dry run commits nothing and only sees duplicates within a chunk.
+        """
+        if not self.skip_duplicates:
+            return leads, []
+        existing = find_existing_keys(self.organization, [lead['email_key'] for line_number, lead in leads],
+                                      [lead['phone_key'] for line_number, lead in leads])
+        seen = {}
+        new_leads, duplicates = [], []
+        for line_number, lead in leads:
+            keys = [(name, lead[name]) for name in ('email_key', 'phone_key') if lead[name]]
+            duplicate = next((key for key in keys if key in existing or key in seen), None)
+            if duplicate is None:
+                seen.update((key, line_number) for key in keys)
+                new_leads.append((line_number, lead))
+            elif duplicate in existing:
+                duplicates.append((line_number, lead, f'Duplicate of lead {existing[duplicate]}'))
+            else:
+                duplicates.append((line_number, lead, f'Duplicate of line {seen[duplicate]}'))
+        return new_leads, duplicates
+
+    def insert(self, leads):
+        if self.use_copy:
+            self.copy(leads)
+        else:
+            Lead.objects.bulk_create(
+                [Lead(organization=self.organization, **lead) for lead in leads],
+                batch_size=self.batch_size
+            )
+        # Bulk inserts send no signal, so the metrics, the search index and the cached pages are updated here.
+        record_leads(self.organization.pk, date.today(), new_leads=len(leads))
+        index_new_leads(self.organization.pk)
+        bump_organization_version(self.organization.pk)
+
+    def count(self, created=0, rejected=0):
+        self.stats.created += created
+        self.stats.rejected += rejected
+
+    def copy(self, leads):
+        quote_name = connection.ops.quote_name
+        columns = ', '.join(quote_name(Lead._meta.get_field(name).column) for name in COPY_FIELDS)
+        constants = {'organization': self.organization.pk, 'date_added': date.today().isoformat(), 'followup_count': 0,
+                     'has_thumbnails': False}
+        buffer = StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for lead in leads:
+            row = {**lead, **constants}
+            writer.writerow([row[name] for name in COPY_FIELDS])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {quote_name(Lead._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+
+    def reject(self, rejects):
+        if not rejects:
+            return
+        self.count(rejected=len(rejects))
+        if not self.reject_file:
+            return
+        if self._reject_writer is None:
+            self._reject_handle = open(self.reject_file, self._reject_mode, newline='', encoding='utf-8')
+            self._reject_writer = csv.DictWriter(self._reject_handle, fieldnames=['line', *self.fieldnames, 'error'],
+                                                   extrasaction='ignore')
+            if not self._reject_handle.tell():
+                self._reject_writer.writeheader()
+        for line_number, row, error in rejects:
+            self._reject_writer.writerow({'line': line_number, **row, 'error': error})
+
+    def report(self):
+        if self.stdout is not None:
+            self.stdout.write(
+                f'{self.stats.created} created, {self.stats.rejected} rejected '
+                f'({self.stats.rows_per_second:.0f} rows/sec)'
+            )
+
+    def close(self):
+        if self._reject_handle is not None:
+            self._reject_handle.close()
+
+
+class ShardedLeadImporter(LeadImporter):
+    """
+    Import a large file by splitting it into byte-range shards.
+
+    Shards are parsed and validated by a pool of ``workers`` processes and written by ``writers`` threads, each
+    holding its own database connection. Every chunk is committed together with the checkpoint of its shard, so
+    running the same import again after a crash only picks up the rows that were not committed yet.
+    Fields containing line breaks are not supported in this mode. Duplicates written by two writers at the same
+    time are not caught, the merge_duplicate_leads command cleans them up.
+    """
+    def __init__(self, organization, writers=1, shard_size=16 * 1024 * 1024, **kwargs):
+        super(ShardedLeadImporter, self).__init__(organization, **kwargs)
+        self.writers = writers
+        self.shard_size = shard_size
+        self._lock = threading.RLock()
+
+    def run(self, file_name):
+        with open(file_name, 'r', newline='', encoding='utf-8') as f:
+            self.fieldnames = next(csv.reader(f), None)
+        self.check_header(self.fieldnames)
+
+        checkpoints = {checkpoint.shard: checkpoint for checkpoint in self.get_checkpoints(file_name)}
+        if any(checkpoint.rows_done or checkpoint.is_complete for checkpoint in checkpoints.values()):
+            # The rows rejected by the shards committed in an earlier run are in the reject file already.
+            self._reject_mode = 'a'
+        tasks = (
+            (file_name, self.fieldnames, checkpoint.shard, checkpoint.start, checkpoint.end, checkpoint.rows_done)
+            for checkpoint in checkpoints.values() if not checkpoint.is_complete
+        )
+        try:
+            results = imap_bounded(parse_shard, tasks, self.workers)
+            if self.writers <= 1:
+                for shard, leads, rejects, total in results:
+                    self.write_shard(checkpoints[shard], leads, rejects, total)
+            else:
+                self.write_in_threads(checkpoints, results)
+        finally:
+            self.close()
+        self.stats.finished = time.monotonic()
+        return self.stats
+
+    def get_checkpoints(self, file_name):
+        stat = os.stat(file_name)
+        file_key = hashlib.sha1(
+            f'{os.path.abspath(file_name)}:{stat.st_size}:{stat.st_mtime_ns}'.encode()
+        ).hexdigest()
+        queryset = LeadImportCheckpoint.objects.filter(organization=self.organization, file_key=file_key).order_by('shard')
+        checkpoints = list(queryset)
+        if checkpoints:
+            return checkpoints
+        checkpoints = [
+            LeadImportCheckpoint(organization=self.organization, file_key=file_key, shard=shard, start=start, end=end)
+            for shard, (start, end) in enumerate(plan_shards(file_name, self.shard_size))
+        ]
+        if self.dry_run:
+            return checkpoints
+        LeadImportCheckpoint.objects.bulk_create(checkpoints)
+        return list(queryset.all())
+
+    def write_in_threads(self, checkpoints, results):
+        with ThreadPoolExecutor(max_workers=self.writers) as executor:
+            pending = deque()
+            for shard, leads, rejects, total in results:
+                pending.append(executor.submit(self.write_shard, checkpoints[shard], leads, rejects, total, True))
+                if len(pending) >= self.writers * 2:
+                    pending.popleft().result()
+            while pending:
+                pending.popleft().result()
+
+    def write_shard(self, checkpoint, leads, rejects, total, close_connection=False):
+        # Rejects are written once the checkpoint has moved past them, so a resumed run, which skips the rows before
+        # rows_done, does not write them again.
+        rejects = deque(rejects)
+
+        def write_rejects(rows_done, duplicates=()):
+            committed = list(duplicates)
+            while rejects and rejects[0][0] < rows_done:
+                committed.append(rejects.popleft())
+            committed.sort(key=lambda reject: reject[0])
+            self.reject([(f'{checkpoint.shard}:{index}', row, error) for index, row, error in committed])
+
+        try:
+            for chunk in iter_chunks(leads, self.batch_size):
+                rows_done = chunk[-1][0] + 1
+                with transaction.atomic():
+                    new_leads, duplicates = self.filter_duplicates(chunk)
+                    if not self.dry_run:
+                        if new_leads:
+                            self.insert([lead for index, lead in new_leads])
+                        LeadImportCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=rows_done)
+                write_rejects(rows_done, duplicates)
+                self.count(created=len(new_leads))
+                self.report()
+            if not self.dry_run:
+                LeadImportCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=total, is_complete=True)
+            write_rejects(total)
+        finally:
+            if close_connection:
+                connection.close()
+
+    def count(self, created=0, rejected=0):
+        with self._lock:
+            super(ShardedLeadImporter, self).count(created=created, rejected=rejected)
+
+    def reject(self, rejects):
+        with self._lock:
+            super(ShardedLeadImporter, self).reject(rejects)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from leads.models import Lead
+
+
+class Command(BaseCommand):
+    help = 'Recompute the follow-up count and last follow-up date of every lead from the follow-up table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of leads updated per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Lead.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        count = 0
+        while True:
+            # Short statements over primary key ranges keep the locks of a large table brief.
+            batch = list(ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            count += Lead.objects.filter(pk__gte=batch[0], pk__lte=batch[-1]).update_followup_summary()
+            last_id = batch[-1]
+        return f'The follow-up summary of {count} leads has been updated'
@@ -0,0 +1,131 @@
+import http.client
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from leads.benchmarks import percentile
+from leads.middleware import get_agent, get_organization
+from leads.models import Lead, User
+
+PROFILES = {
+    'wsgi': ['django_crm.wsgi:application'],
+    'asgi': ['-c', os.path.join(settings.BASE_DIR, 'django_crm', 'gunicorn_asgi.py')],
+}
+
+
+class Command(BaseCommand):
+    help = ('Serve the project with gunicorn sync workers, then with uvicorn workers, and compare the requests per '
+            'second and latencies of the read-heavy pages under concurrent load.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='User the pages are requested as')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per page and profile')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once')
+        parser.add_argument('--workers', type=int, default=4, help='Server processes of each profile')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append', help='Only run these profiles')
+
+    def handle(self, *args, **options):
+        for module in ('gunicorn', 'uvicorn'):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f'{module} is required, install the requirements first')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'There is no user named {options["username"]}')
+
+        session = self.create_session(user)
+        try:
+            self.benchmark(user, f'{settings.SESSION_COOKIE_NAME}={session.session_key}', options)
+        finally:
+            session.delete()
+
+    def benchmark(self, user, cookie, options):
+        paths = [reverse('leads:lead-list'), reverse('leads:lead-json')]
+        leads = Lead.objects.filter(organization=get_organization(user))
+        if user.is_organizer:
+            # The dashboard is cached per organization, only its first request does any work.
+            paths.insert(0, reverse('dashboard'))
+        else:
+            leads = leads.filter(agent=get_agent(user))
+        lead = leads.first()
+        if lead is not None:
+            paths.append(reverse('leads:lead-detail', kwargs={'pk': lead.pk}))
+
+        self.stdout.write(f'{"profile":<8}{"path":<28}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for profile in options['profile'] or ('wsgi', 'asgi'):
+            with self.serve(profile, options['port'], options['workers']):
+                for path in paths:
+                    rate, latencies, errors = self.load(options['port'], path, cookie, options['requests'],
+                                                        options['concurrency'])
+                    self.stdout.write(
+                        f'{profile:<8}{path:<28}{rate:>10.1f}{percentile(latencies, 50) * 1000:>10.1f}'
+                        f'{percentile(latencies, 99) * 1000:>10.1f}{errors:>8}'
+                    )
+
+    @staticmethod
+    def create_session(user):
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    @contextmanager
+    def serve(self, profile, port, workers):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *PROFILES[profile], '--bind', f'127.0.0.1:{port}',
+             '--workers', str(workers), '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env={**os.environ, 'ASYNC_VIEWS': str(profile == 'asgi')}
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise CommandError(f'The {profile} server did not start')
+                    time.sleep(0.2)
+            yield
+        finally:
+            process.terminate()
+            process.wait()
+
+    @staticmethod
+    def request(port, path, cookie):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except OSError:
+            status = None
+        finally:
+            connection.close()
+        return time.perf_counter() - start, status
+
+    def load(self, port, path, cookie, requests, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Warm up the workers: imports, connections and caches.
+            list(executor.map(lambda i: self.request(port, path, cookie), range(concurrency)))
+            start = time.perf_counter()
+            results = list(executor.map(lambda i: self.request(port, path, cookie), range(requests)))
+            elapsed = time.perf_counter() - start
+        latencies = sorted(latency for latency, status in results)
+        errors = sum(status != 200 for latency, status in results)
+        return requests / elapsed, latencies, errors
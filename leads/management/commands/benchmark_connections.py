@@ -0,0 +1,83 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+from django_crm.postgresql.base import get_pool
+from leads.benchmarks import summarize
+
+# Connection settings compared, from opening a connection for every request to sharing them in a pool.
+PROFILES = {
+    'close': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': 0},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': 0},
+    'health-checked': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'POOL_SIZE': 0},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL_SIZE': None},
+}
+
+
+class Command(BaseCommand):
+    help = ('Time requests running one query against PostgreSQL with connections closed after each request, kept '
+            'open, kept open and health-checked, and shared in a pool, and report the latency each setting saves.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per thread and profile')
+        parser.add_argument('--threads', type=int, default=4, help='Threads serving requests, as in a gthread worker')
+        parser.add_argument('--query', type=str, default='SELECT 1', help='SQL run by every request')
+        parser.add_argument('--database', type=str, default='default')
+        parser.add_argument('--profile', choices=list(PROFILES), action='append', help='Only run these profiles')
+
+    def handle(self, *args, **options):
+        if min(options['requests'], options['threads']) < 1:
+            raise CommandError('--requests and --threads must be positive')
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError('The benchmark needs a PostgreSQL database')
+
+        self.stdout.write(f'{"profile":<16}{"req/s":>10}{"mean ms":>10}{"p50 ms":>10}{"p99 ms":>10}{"saved ms":>10}')
+        baseline = None
+        for profile in options['profile'] or list(PROFILES):
+            latencies, elapsed = self.run_profile(profile, options)
+            latency = summarize(latencies)
+            if baseline is None and profile == 'close':
+                baseline = latency['mean']
+            saved = f'{baseline - latency["mean"]:>10.2f}' if baseline is not None else f'{"-":>10}'
+            self.stdout.write(
+                f'{profile:<16}{len(latencies) / elapsed:>10.1f}{latency["mean"]:>10.2f}{latency["p50"]:>10.2f}'
+                f'{latency["p99"]:>10.2f}{saved}'
+            )
+
+    def run_profile(self, profile, options):
+        alias = f'benchmark-{profile}'
+        settings_dict = {
+            **connections[options['database']].settings_dict,
+            **PROFILES[profile],
+            'ENGINE': 'django_crm.postgresql',
+        }
+        if settings_dict['POOL_SIZE'] is None:
+            settings_dict['POOL_SIZE'] = options['threads']
+        backend = load_backend(settings_dict['ENGINE'])
+
+        def serve():
+            connection = backend.DatabaseWrapper(settings_dict, alias)
+            latencies = []
+            try:
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    # What the request_started and request_finished signals do around every request.
+                    connection.close_if_unusable_or_obsolete()
+                    with connection.cursor() as cursor:
+                        cursor.execute(options['query'])
+                        cursor.fetchall()
+                    connection.close_if_unusable_or_obsolete()
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = [executor.submit(serve) for _ in range(options['threads'])]
+            latencies = [latency for result in results for latency in result.result()]
+        elapsed = time.perf_counter() - start
+        get_pool(alias, settings_dict['POOL_SIZE']).close()
+        return latencies, elapsed
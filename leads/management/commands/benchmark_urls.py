@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from leads.benchmarks import compare_reports, run_benchmark
+from leads.models import User
+
+
+class Command(BaseCommand):
+    help = ('Measure the latency percentiles, query count and peak memory of every page of the leads and agents '
+            'applications and write a JSON report that can be compared between versions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Request the pages as this user, repeat for several users. Defaults to the '
+                                 'organizer with the most leads and its busiest agent')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per page')
+        parser.add_argument('--url', action='append', dest='urls', metavar='NAME',
+                            help='Only benchmark this URL, e.g. leads:lead-list')
+        parser.add_argument('--clear-cache', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--output', type=str, help='Write the report to this file instead of the output')
+        parser.add_argument('--compare', type=str, metavar='REPORT', help='Print the changes since this report')
+
+    def get_default_users(self):
+        organizer = User.objects.filter(is_organizer=True).annotate(
+            leads=Count('userprofile__lead')
+        ).order_by('-leads', 'pk').first()
+        if organizer is None:
+            raise CommandError('There is no organizer, seed the database first with the seed_crm command')
+        users = [organizer]
+        agent = User.objects.filter(agent__organization=organizer.userprofile).order_by(
+            '-agent__lead_count', 'pk'
+        ).first()
+        if agent is not None:
+            users.append(agent)
+        return users
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {user.username for user in users}
+            if missing:
+                raise CommandError(f'Unknown users: {", ".join(sorted(missing))}')
+        else:
+            users = self.get_default_users()
+
+        report = run_benchmark(users, iterations=options['iterations'], clear_cache=options['clear_cache'],
+                               names=options['urls'])
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(content)
+        else:
+            self.stdout.write(content)
+
+        if baseline is not None:
+            for url, role, metric, before, after in compare_reports(baseline, report):
+                change = (after - before) / before * 100 if before else 0
+                self.stdout.write(f'{url:<32}{role:<10}{metric:<10}{before:>10.1f}{after:>10.1f}{change:>+9.1f}%')
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from leads.models import FollowUpUpload
+from leads.uploads import abort_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete the chunked uploads that have not received any chunk for a while.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        stale = FollowUpUpload.objects.filter(updated__lt=timezone.now() - timedelta(hours=options['hours']))
+        count = 0
+        for upload in stale.iterator():
+            abort_upload(upload)
+            count += 1
+        return f'{count} stale uploads have been deleted'
@@ -1,21 +1,69 @@
-from django.core.management.base import BaseCommand
-from leads.models import Lead, UserProfile
-from csv import DictReader
+from django.core.management.base import BaseCommand, CommandError
+from leads.models import UserProfile
+from leads.importers import LeadImporter, LeadImportError, ShardedLeadImporter
 
 
 class Command(BaseCommand):
+    help = 'Import leads from a CSV file into the organization of the given organizer'
+
     def add_arguments(self, parser):
         parser.add_argument('file_name', type=str)
         parser.add_argument('organizer_email', type=str)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows validated and written per transaction')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes used to validate rows')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate the file without writing any lead')
+        parser.add_argument('--reject-file', type=str,
+                            help='Where to write rows that failed validation or duplicate a lead (defaults to <file_name>.rejects.csv)')
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk inserts even when PostgreSQL COPY is available')
+        parser.add_argument('--keep-duplicates', action='store_true',
+                            help='Import leads whose email or phone number is already used in the organization')
+        parser.add_argument('--parallel', action='store_true',
+                            help='Split the file into byte-range shards and record a resumable checkpoint per shard')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Number of database connections writing shards in --parallel mode')
+        parser.add_argument('--shard-size', type=int, default=16,
+                            help='Size of a shard in megabytes in --parallel mode')
 
     def handle(self, *args, **options):
         file_name = options.get('file_name')
         organizer_email = options.get('organizer_email')
-        organization = UserProfile.objects.get(user__email=organizer_email)
+        if min(options['batch_size'], options['workers'], options['writers'], options['shard_size']) < 1:
+            raise CommandError('--batch-size, --workers, --writers and --shard-size must be positive')
+        try:
+            organization = UserProfile.objects.get(user__email=organizer_email)
+        except UserProfile.DoesNotExist:
+            raise CommandError(f'There is no organizer with the {organizer_email} email')
 
-        with open(file_name, 'r') as f:
-            csv_data = DictReader(f)
-            for lead in csv_data:
-                Lead.objects.create(**lead, organization=organization)
+        importer_kwargs = {}
+        importer_class = LeadImporter
+        if options['parallel']:
+            importer_class = ShardedLeadImporter
+            importer_kwargs.update({
+                'writers': options['writers'],
+                'shard_size': options['shard_size'] * 1024 * 1024
+            })
+        importer = importer_class(
+            organization,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+            reject_file=options.get('reject_file') or f'{file_name}.rejects.csv',
+            use_copy=False if options['no_copy'] else None,
+            skip_duplicates=not options['keep_duplicates'],
+            stdout=self.stdout if options['verbosity'] > 1 else None,
+            **importer_kwargs
+        )
+        try:
+            stats = importer.run(file_name)
+        except (LeadImportError, OSError) as e:
+            raise CommandError(e)
 
-        return f'The leads from the {file_name} has been successfully created'
+        summary = (f'{stats.created} leads {"validated" if options["dry_run"] else "created"}, '
+                   f'{stats.rejected} rejected in {stats.elapsed:.2f}s ({stats.rows_per_second:.0f} rows/sec)')
+        if stats.rejected:
+            summary += f'. Rejected rows were written to {importer.reject_file}'
+        return f'The leads from the {file_name} has been successfully imported: {summary}'
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from leads.assignment import LeadDistributor, recount_agent_leads, STRATEGIES
+from leads.models import Lead, UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Assign the unassigned leads of every organization to its agents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', type=str, choices=sorted(STRATEGIES),
+                            default=settings.LEAD_ASSIGNMENT_STRATEGY or 'least_loaded')
+        parser.add_argument('--organizer-email', type=str, help='Only distribute the leads of this organizer')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--recount', action='store_true',
+                            help='Recount the leads of every agent first, when raw SQL or bulk imports made them drift')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive')
+        organizations = UserProfile.objects.filter(user__is_organizer=True)
+        if options.get('organizer_email'):
+            organizations = organizations.filter(user__email=options['organizer_email'])
+        count = 0
+        for organization in organizations.iterator():
+            if options['recount']:
+                recount_agent_leads(organization)
+            distributor = LeadDistributor(organization, options['strategy'])
+            count += distributor.distribute(Lead.objects.all(), batch_size=options['batch_size'])
+        return f'{count} leads have been assigned'
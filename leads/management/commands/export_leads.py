@@ -0,0 +1,46 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from leads.exports import EXPORT_FORMATS, ExportError, get_export_rows, iter_csv, iter_gzip, write_xlsx
+from leads.models import Lead, UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Export the leads of the organization of the given organizer, streamed through a server-side cursor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('organizer_email', type=str)
+        parser.add_argument('--output', type=str, help='File to write, the CSV goes to the standard output otherwise')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the CSV export')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at once')
+
+    def handle(self, *args, **options):
+        organizer_email = options['organizer_email']
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        if options['format'] == 'xlsx' and not options['output']:
+            raise CommandError('The xlsx format needs an --output file')
+        try:
+            organization = UserProfile.objects.get(user__email=organizer_email, user__is_organizer=True)
+        except UserProfile.DoesNotExist:
+            raise CommandError(f'There is no organizer with the {organizer_email} email')
+        rows = get_export_rows(Lead.objects.filter(organization=organization), options['chunk_size'])
+
+        if options['format'] == 'xlsx':
+            try:
+                write_xlsx(rows, options['output'])
+            except ExportError as e:
+                raise CommandError(e)
+            return
+        if options['gzip']:
+            with open(options['output'], 'wb') if options['output'] else nullcontext(sys.stdout.buffer) as f:
+                for chunk in iter_gzip(iter_csv(rows)):
+                    f.write(chunk)
+        elif options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(iter_csv(rows))
+        else:
+            for chunk in iter_csv(rows):
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from leads.models import Lead
+from leads.thumbnails import THUMBNAIL_SIZES, make_thumbnails, record_thumbnails, thumbnail_name
+
+
+class Command(BaseCommand):
+    help = 'Create the missing thumbnails of the lead profile pictures.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recreate the thumbnails that already exist')
+        parser.add_argument('--workers', type=int, default=4, help='Number of pictures resized in parallel')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('The number of workers must be positive')
+        storage = Lead._meta.get_field('profile_picture').storage
+        leads = Lead.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['force']:
+            leads = leads.filter(has_thumbnails=False)
+        pictures = leads.order_by().values_list('profile_picture', flat=True).distinct()
+
+        def is_missing(name):
+            if options['force'] or not all(storage.exists(thumbnail_name(name, size)) for size in THUMBNAIL_SIZES):
+                return True
+            # Generated before the leads recorded it.
+            record_thumbnails(name)
+            return False
+
+        names = (name for name in pictures.iterator() if is_missing(name))
+        count = 0
+        # Pillow releases the GIL while decoding and resizing, so threads are enough to use several cores.
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for name, made in executor.map(lambda name: (name, make_thumbnails(name, storage=storage)), names):
+                if made:
+                    record_thumbnails(name)
+                count += 1
+        return f'The thumbnails of {count} pictures have been generated'
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from leads.dedup import find_duplicate_groups, merge_leads
+from leads.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = ('Merge the leads sharing an email or a phone number into the oldest of them, follow-ups included. '
+            'Dashboard counts and agent counters are kept up to date.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizer-email', type=str, help='Only merge the leads of this organization')
+        parser.add_argument('--dry-run', action='store_true', help='List the duplicates without merging them')
+
+    def handle(self, *args, **options):
+        organizations = UserProfile.objects.order_by('pk')
+        if options['organizer_email']:
+            organizations = organizations.filter(user__email=options['organizer_email'])
+            if not organizations.exists():
+                raise CommandError(f'There is no organizer with the {options["organizer_email"]} email')
+
+        groups_count = merged = 0
+        for organization in organizations:
+            for lead_ids in find_duplicate_groups(organization):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{organization}: leads {", ".join(map(str, lead_ids[1:]))} into {lead_ids[0]}')
+                if not options['dry_run']:
+                    merge_leads(lead_ids)
+                groups_count += 1
+                merged += len(lead_ids) - 1
+        verb = 'would be merged' if options['dry_run'] else 'have been merged'
+        return f'{merged} duplicate leads {verb} into {groups_count} leads'
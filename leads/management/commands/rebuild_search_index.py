@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from leads.models import UserProfile
+from leads.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recompute the search vectors of the leads, for example after changing the indexed fields.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizer-email', type=str, help='Only index the leads of this organizer')
+        parser.add_argument('--missing', action='store_true', help='Only index the leads that have no search vector')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive')
+        organizations = UserProfile.objects.filter(user__is_organizer=True)
+        if options.get('organizer_email'):
+            organizations = organizations.filter(user__email=options['organizer_email'])
+        count = 0
+        for organization in organizations.iterator():
+            count += rebuild_search_index(organization, missing_only=options['missing'],
+                                          batch_size=options['batch_size'])
+        return f'{count} leads have been indexed'
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from leads.metrics import reconcile_organization_metrics
+from leads.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard metrics of every organization from the lead table. Meant to run periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizer-email', type=str, help='Only reconcile the organization of this organizer')
+
+    def handle(self, *args, **options):
+        organizations = UserProfile.objects.filter(user__is_organizer=True)
+        if options.get('organizer_email'):
+            organizations = organizations.filter(user__email=options['organizer_email'])
+        count = 0
+        for organization in organizations.iterator():
+            reconcile_organization_metrics(organization)
+            count += 1
+        return f'The metrics of {count} organizations have been reconciled'
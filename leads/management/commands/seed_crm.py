@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from leads.models import User
+from leads.seeding import CrmSeeder
+
+
+class Command(BaseCommand):
+    help = ('Seed organizations of fake agents, categories, leads and follow-ups with bulk inserts, '
+            'e.g. --organizations 10 --leads 100000 for a million leads')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizations', type=int, default=1)
+        parser.add_argument('--agents', type=int, default=10, help='Agents per organization')
+        parser.add_argument('--leads', type=int, default=10000, help='Leads per organization')
+        parser.add_argument('--followups', type=int, default=2, help='Average number of follow-ups per lead')
+        parser.add_argument('--days', type=int, default=365, help='Spread the leads over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Leads inserted per transaction')
+        parser.add_argument('--prefix', type=str, default='seed', help='Prefix of the seeded usernames')
+        parser.add_argument('--password', type=str, default='password', help='Password of every seeded user')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator')
+
+    def handle(self, *args, **options):
+        if min(options['organizations'], options['batch_size'], options['days']) < 1:
+            raise CommandError('--organizations, --batch-size and --days must be positive')
+        if min(options['agents'], options['leads'], options['followups']) < 0:
+            raise CommandError('--agents, --leads and --followups cannot be negative')
+        if User.objects.filter(username__startswith=f'{options["prefix"]}0-').exists():
+            raise CommandError(f'Users prefixed with {options["prefix"]} already exist, choose another --prefix')
+        seeder = CrmSeeder(
+            organizations=options['organizations'],
+            agents=options['agents'],
+            leads=options['leads'],
+            followups=options['followups'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            password=options['password'],
+            seed=options['seed'],
+            stdout=self.stdout if options['verbosity'] > 1 else None
+        )
+        created = seeder.run()
+        return ', '.join(f'{count} {name}' for name, count in created.items()) + ' created'
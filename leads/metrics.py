@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Category, DailyLeadMetrics, Lead, OrganizationMetrics
+
+CONVERTED_CATEGORY_NAME = 'Converted'
+
+
+def is_converted_category(category_id):
+    return category_id is not None and Category.objects.filter(
+        pk=category_id, name=CONVERTED_CATEGORY_NAME
+    ).exists()
+
+
+def _increment(model, lookup, create=True, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates) or not create:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_leads(organization_id, day, new_leads=0, converted_leads=0):
+    """
+    Apply a change in the number of leads added on ``day`` and of those currently converted.
+    """
+    if not new_leads and not converted_leads:
+        return
+    if not OrganizationMetrics.objects.filter(organization_id=organization_id).update(
+            total_leads=F('total_leads') + new_leads):
+        # The metrics of this organization are computed from scratch on the next read.
+        return
+    _increment(DailyLeadMetrics, {'organization_id': organization_id, 'day': day}, create=new_leads > 0,
+               new_leads=new_leads, converted_leads=converted_leads)
+
+
+def invalidate_organization_metrics(organization_id):
+    OrganizationMetrics.objects.filter(organization_id=organization_id).delete()
+
+
+def reconcile_organization_metrics(organization):
+    """
+    Recompute the metrics of an organization from the lead table.
+
+    Catches up with changes that bypass model signals, such as bulk inserts and queryset updates. Return the total
+    number of leads.
+    """
+    leads = Lead.objects.filter(organization=organization)
+    daily = leads.order_by().values('date_added').annotate(
+        new_leads=Count('id'),
+        converted_leads=Count('id', filter=Q(category__name=CONVERTED_CATEGORY_NAME))
+    )
+    with transaction.atomic():
+        DailyLeadMetrics.objects.filter(organization=organization).delete()
+        DailyLeadMetrics.objects.bulk_create([
+            DailyLeadMetrics(organization=organization, day=row['date_added'], new_leads=row['new_leads'],
+                             converted_leads=row['converted_leads'])
+            for row in daily
+        ])
+        total = DailyLeadMetrics.objects.filter(organization=organization).aggregate(total=Sum('new_leads'))['total']
+        OrganizationMetrics.objects.update_or_create(organization=organization, defaults={
+            'total_leads': total or 0,
+            'reconciled': timezone.now()
+        })
+    return total or 0
+
+
+def get_total_leads(organization):
+    """
+    Return the maintained number of leads of an organization, ``None`` when its metrics must be reconciled first.
+    """
+    return OrganizationMetrics.objects.filter(organization=organization).values_list('total_leads', flat=True).first()
+
+
+def get_recent_metrics(organization, days=30):
+    recent = DailyLeadMetrics.objects.filter(
+        organization=organization, day__gte=date.today() - timedelta(days=days)
+    ).aggregate(new_leads=Sum('new_leads'), converted_leads=Sum('converted_leads'))
+    return {
+        'total_new_leads': recent['new_leads'] or 0,
+        'total_converted_new_leads': recent['converted_leads'] or 0
+    }
+
+
+def get_dashboard_metrics(organization, days=30):
+    total_leads = get_total_leads(organization)
+    if total_leads is None:
+        # ReplicaRouter reads in a transaction from the primary, a replica may not have the reconciled rows yet.
+        with transaction.atomic():
+            total_leads = reconcile_organization_metrics(organization)
+            return {'total_lead_count': total_leads, **get_recent_metrics(organization, days)}
+    return {'total_lead_count': total_leads, **get_recent_metrics(organization, days)}
@@ -0,0 +1,34 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+
+def get_agent(user):
+    if not user.is_authenticated or not user.is_agent:
+        return None
+    try:
+        return user.agent
+    except ObjectDoesNotExist:
+        return None
+
+
+def get_organization(user):
+    if not user.is_authenticated:
+        return None
+    if user.is_organizer:
+        return user.userprofile
+    agent = get_agent(user)
+    return agent.organization if agent is not None else None
+
+
+class OrganizationMiddleware:
+    """
+    Expose the organization and the agent of the current user as ``request.organization`` and ``request.agent``.
+
+    With ``CachedModelBackend`` the user comes with its profile and agent, so this runs no query.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.agent = get_agent(request.user)
+        request.organization = get_organization(request.user)
+        return self.get_response(request)
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0002_lead_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_leads', models.IntegerField(default=0)),
+                ('reconciled', models.DateTimeField(blank=True, null=True)),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='leads.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyLeadMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('new_leads', models.IntegerField(default=0)),
+                ('converted_leads', models.IntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metrics', to='leads.userprofile')),
+            ],
+            options={
+                'unique_together': {('organization', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-18 02:42
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN and partial indexes only exist on PostgreSQL, other databases search with an in-process index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX leads_lead_search_vector_gin ON leads_lead USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX leads_lead_search_vector_missing ON leads_lead (organization_id) WHERE search_vector IS NULL'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS leads_lead_search_vector_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS leads_lead_search_vector_missing')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0003_lead_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
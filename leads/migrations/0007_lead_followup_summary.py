@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0006_followup_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='followup_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Follow-ups'),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='last_followup_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Last contacted'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'last_followup_at'], name='lead_organization_contact_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'followup_count', 'id'], name='lead_organization_followup_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+from leads.normalization import KEY_FIELDS, get_blocking_keys
+
+
+def set_blocking_keys(apps, schema_editor):
+    Lead = apps.get_model('leads', 'Lead')
+    leads = Lead.objects.order_by('pk').only('first_name', 'last_name', 'email', 'phone_number')
+    batch = []
+    for lead in leads.iterator(chunk_size=2000):
+        for name, value in get_blocking_keys(lead.first_name, lead.last_name, lead.email, lead.phone_number).items():
+            setattr(lead, name, value)
+        batch.append(lead)
+        if len(batch) == 2000:
+            Lead.objects.bulk_update(batch, list(KEY_FIELDS))
+            batch = []
+    Lead.objects.bulk_update(batch, list(KEY_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0007_lead_followup_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_key',
+            field=models.CharField(blank=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.RunPython(set_blocking_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'email_key'], name='lead_organization_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'phone_key'], name='lead_organization_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'name_key'], name='lead_organization_name_idx'),
+        ),
+    ]
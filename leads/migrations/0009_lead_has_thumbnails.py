@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0008_lead_blocking_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='has_thumbnails',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -1,8 +1,18 @@
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
+from .normalization import KEY_FIELDS, get_blocking_keys
+
 
 class User(AbstractUser):
     is_organizer = models.BooleanField(default=True)
@@ -16,13 +26,53 @@ class UserProfile(models.Model):
         return self.user.username
 
 
+# Fields of a lead only written by queryset updates, see Lead.save().
+UPDATED_FIELDS = ('followup_count', 'last_followup_at', 'has_thumbnails')
+
+
+class LeadQuerySet(models.QuerySet):
+    def stale(self, days=14):
+        """
+        Leads nobody followed up on for ``days``, including leads older than that which were never followed up.
+        """
+        cutoff = timezone.now() - timedelta(days=days)
+        return self.filter(
+            models.Q(last_followup_at__lt=cutoff) |
+            models.Q(last_followup_at__isnull=True, date_added__lte=cutoff.date())
+        )
+
+    def update_followup_summary(self):
+        """
+        Recompute ``followup_count`` and ``last_followup_at`` of the selected leads from the follow-up table.
+        """
+        followups = FollowUp.objects.filter(lead=models.OuterRef('pk')).order_by().values('lead')
+        return self.update(
+            followup_count=Coalesce(models.Subquery(followups.annotate(count=models.Count('pk')).values('count')), 0),
+            last_followup_at=models.Subquery(followups.annotate(last=models.Max('date_added')).values('last')),
+        )
+
+    def matching(self, email_key='', phone_key=''):
+        """
+        Leads with the given normalized email or phone, each lookup is served by an index.
+        """
+        condition = models.Q(pk__in=[])
+        if email_key:
+            condition |= models.Q(email_key=email_key)
+        if phone_key:
+            condition |= models.Q(phone_key=phone_key)
+        return self.filter(condition)
+
+
 class LeadManager(models.Manager):
     def get_queryset(self):
-        return super(LeadManager, self).get_queryset()
+        return LeadQuerySet(self.model, using=self._db)
 
     def get_blank_categories(self):
         return self.get_queryset().filter(category__isnull=True)
 
+    def get_stale(self, days=14):
+        return self.get_queryset().stale(days)
+
 
 class Lead(models.Model):
     first_name = models.CharField(_('First name'), max_length=50)
@@ -39,12 +89,58 @@ class Lead(models.Model):
     email = models.EmailField()
     profile_picture = models.ImageField(_('Profile picture'), upload_to='profile_pictures/', null=True, blank=True)
     converted_date = models.DateTimeField(null=True, blank=True)
+    # Set by leads.thumbnails once the variants of the profile picture are stored.
+    has_thumbnails = models.BooleanField(default=False, editable=False)
+    # Maintained by leads.search, its GIN index is created by a PostgreSQL only migration.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Maintained by the follow-up signals so that lists can show and sort by them without touching follow-ups.
+    followup_count = models.PositiveIntegerField(_('Follow-ups'), default=0, editable=False)
+    last_followup_at = models.DateTimeField(_('Last contacted'), null=True, blank=True, editable=False)
+    # Blocking keys used to find duplicates, see leads.dedup. Bulk inserts have to set them with set_blocking_keys.
+    email_key = models.CharField(max_length=254, blank=True, editable=False)
+    phone_key = models.CharField(max_length=16, blank=True, editable=False)
+    name_key = models.CharField(max_length=8, blank=True, editable=False)
 
     objects = LeadManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'agent'], name='lead_organization_agent_idx'),
+            models.Index(fields=['organization', 'category'], name='lead_organization_category_idx'),
+            models.Index(fields=['organization', '-date_added', '-id'], name='lead_organization_date_idx'),
+            models.Index(fields=['organization', '-date_added'], condition=models.Q(agent__isnull=True),
+                         name='lead_unassigned_idx'),
+            models.Index(fields=['organization', 'last_followup_at'], name='lead_organization_contact_idx'),
+            models.Index(fields=['organization', 'followup_count', 'id'], name='lead_organization_followup_idx'),
+            models.Index(fields=['organization', 'email_key'], name='lead_organization_email_idx'),
+            models.Index(fields=['organization', 'phone_key'], name='lead_organization_phone_idx'),
+            models.Index(fields=['organization', 'name_key'], name='lead_organization_name_idx'),
+        ]
+
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
 
+    def set_blocking_keys(self):
+        for name, value in get_blocking_keys(self.first_name, self.last_name, self.email, self.phone_number).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        self.set_blocking_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(
+                name for name, sources in KEY_FIELDS.items() if set(sources) & set(update_fields)
+            )}
+        # The follow-up summary is only written by update_followup_summary and the thumbnail flag by leads.thumbnails,
+        # saving a lead loaded before a follow-up was added must not put back their old values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in UPDATED_FIELDS and field.attname not in deferred
+            ]
+        super(Lead, self).save(*args, **kwargs)
+
 
 def post_user_created_signal(sender, instance, created, **kwargs):
     if created:
@@ -58,6 +154,11 @@ class Category(models.Model):
     name = models.CharField(max_length=30)
     organization = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'organization'], name='category_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -74,3 +175,61 @@ class FollowUp(models.Model):
 
     def __str__(self):
         return f'{self.lead.first_name} {self.lead.last_name}'
+
+
+class FollowUpUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    followup = models.ForeignKey(FollowUp, related_name='uploads', on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.pk}.part')
+
+
+class LeadImportCheckpoint(models.Model):
+    organization = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    file_key = models.CharField(max_length=40)
+    shard = models.PositiveIntegerField()
+    start = models.BigIntegerField()
+    end = models.BigIntegerField()
+    rows_done = models.PositiveIntegerField(default=0)
+    is_complete = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('organization', 'file_key', 'shard')
+
+    def __str__(self):
+        return f'{self.file_key} shard {self.shard}'
+
+
+class OrganizationMetrics(models.Model):
+    organization = models.OneToOneField(UserProfile, related_name='metrics', on_delete=models.CASCADE)
+    total_leads = models.IntegerField(default=0)
+    reconciled = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.organization} metrics'
+
+
+class DailyLeadMetrics(models.Model):
+    organization = models.ForeignKey(UserProfile, related_name='daily_metrics', on_delete=models.CASCADE)
+    day = models.DateField()
+    new_leads = models.IntegerField(default=0)
+    converted_leads = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('organization', 'day')
+
+    def __str__(self):
+        return f'{self.organization} metrics on {self.day}'
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+
+from django.conf import settings
+
+# Fields of a lead holding its blocking keys, with the fields each key is computed from.
+KEY_FIELDS = {
+    'email_key': ('email',),
+    'phone_key': ('phone_number',),
+    'name_key': ('first_name', 'last_name'),
+}
+
+SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters
+}
+PHONE_EXTENSION = re.compile(r'\s*(?:ext\.?|x|#)\s*\d+$', re.IGNORECASE)
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value, country_code=None):
+    """
+    Return ``value`` in E.164 form, or ``''`` when it cannot be a phone number.
+
+    Numbers without an international prefix (``+`` or ``00``) belong to ``PHONE_COUNTRY_CODE`` and lose their
+    trunk ``0``. No numbering plan is checked: the key only has to be the same for every spelling of a number.
+    """
+    value = PHONE_EXTENSION.sub('', (value or '').strip())
+    digits = ''.join(character for character in value if '0' <= character <= '9')
+    if value.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    else:
+        country_code = country_code or settings.PHONE_COUNTRY_CODE
+        if digits.startswith('0'):
+            digits = country_code + digits[1:]
+        elif not (digits.startswith(country_code) and len(digits) > 10):
+            digits = country_code + digits
+    if not 8 <= len(digits) <= 15:
+        return ''
+    return f'+{digits}'
+
+
+def soundex(value):
+    """
+    American Soundex code of ``value``, accents are dropped and other characters ignored.
+    """
+    letters = [
+        character for character in unicodedata.normalize('NFKD', value or '').lower() if character in SOUNDEX_CODES
+    ]
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES[letters[0]]
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES[letter]
+        if digit != '0' and digit != previous:
+            code += digit
+        # H and W do not separate two letters with the same code, vowels do.
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def normalize_name(first_name, last_name):
+    first, last = soundex(first_name), soundex(last_name)
+    return f'{first or "0000"}{last or "0000"}' if first or last else ''
+
+
+def get_blocking_keys(first_name, last_name, email, phone_number):
+    return {
+        'email_key': normalize_email(email),
+        'phone_key': normalize_phone(phone_number),
+        'name_key': normalize_name(first_name, last_name),
+    }
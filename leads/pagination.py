@@ -0,0 +1,98 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor('The cursor is malformed')
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor('The cursor does not match the ordering')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter selecting the rows that come after ``values`` in ``ordering``.
+
+    ``ordering`` is a sequence of field names, prefixed with ``-`` for descending order, whose last item must be
+    unique (usually ``id``) so that every row has a distinct position.
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_values(ordering, row):
+    if isinstance(row, dict):
+        return [row[field.lstrip('-')] for field in ordering]
+    return [getattr(row, field.lstrip('-')) for field in ordering]
+
+
+def reverse_ordering(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginate_keyset(queryset, ordering, page_size, after=None, before=None):
+    """
+    Return the page of ``queryset`` following the ``after`` cursor, or preceding the ``before`` one.
+
+    Every page costs one query fetching ``page_size + 1`` rows, whatever its depth, and no ``COUNT`` is run.
+    """
+    if before:
+        backwards = reverse_ordering(ordering)
+        queryset = queryset.order_by(*backwards).filter(
+            keyset_filter(backwards, decode_cursor(before, len(ordering)))
+        )
+        rows = list(queryset[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(keyset_values(ordering, rows[-1])) if rows else None,
+            previous_cursor=encode_cursor(keyset_values(ordering, rows[0])) if has_previous else None
+        )
+
+    queryset = queryset.order_by(*ordering)
+    if after:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(after, len(ordering))))
+    rows = list(queryset[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(keyset_values(ordering, rows[-1])) if has_next else None,
+        previous_cursor=encode_cursor(keyset_values(ordering, rows[0])) if after and rows else None
+    )
+
@@ -0,0 +1,194 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import FollowUp, Lead
+
+SEARCH_CONFIG = 'simple'
+
+# The fields of a lead with the weight they get in the search vector, and the score of a match on each weight.
+WEIGHTED_FIELDS = (
+    ('A', ('first_name', 'last_name')),
+    ('B', ('email', 'phone_number')),
+    ('C', ('description',)),
+)
+NOTES_WEIGHT = 'D'
+WEIGHT_SCORES = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    """
+    Expression computing the search vector of a lead from its fields and the notes of its follow-ups.
+    """
+    notes = FollowUp.objects.filter(lead=OuterRef('pk')).order_by().values('lead').annotate(
+        notes=StringAgg('notes', ' ')
+    ).values('notes')
+    vector = SearchVector(Coalesce(Subquery(notes), Value('')), weight=NOTES_WEIGHT, config=SEARCH_CONFIG)
+    for weight, fields in WEIGHTED_FIELDS:
+        vector = SearchVector(*fields, weight=weight, config=SEARCH_CONFIG) + vector
+    return vector
+
+
+class PrefixSearchQuery(SearchQuery):
+    """
+    A ``plainto_tsquery()`` whose last lexeme also matches as a prefix.
+    """
+    template = "regexp_replace(%(function)s(%(expressions)s)::text, '''$', ''':*')::tsquery"
+
+
+class InvertedIndex:
+    """
+    In-process index of the leads of one organization, used when the database has no full-text search.
+    """
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms = []
+
+    def add(self, lead_id, weight, text):
+        score = WEIGHT_SCORES[weight]
+        for term in tokenize(text):
+            postings = self.postings[term]
+            postings[lead_id] = postings.get(lead_id, 0) + score
+
+    def freeze(self):
+        self.terms = sorted(self.postings)
+
+    def lookup(self, term, prefix=False):
+        if not prefix:
+            return self.postings.get(term, {})
+        scores = {}
+        for i in range(bisect_left(self.terms, term), len(self.terms)):
+            if not self.terms[i].startswith(term):
+                break
+            for lead_id, score in self.postings[self.terms[i]].items():
+                scores[lead_id] = max(scores.get(lead_id, 0), score)
+        return scores
+
+    def search(self, terms, prefix=False):
+        """
+        Return the score of every lead matching all of ``terms``, the last one as a prefix when ``prefix`` is set.
+        """
+        scores = None
+        for i, term in enumerate(terms):
+            matches = self.lookup(term, prefix=prefix and i == len(terms) - 1)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {lead_id: score + matches[lead_id] for lead_id, score in scores.items() if lead_id in matches}
+            if not scores:
+                break
+        return scores or {}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def build_index(organization_id):
+    index = InvertedIndex()
+    fields = [field for weight, names in WEIGHTED_FIELDS for field in names]
+    for row in Lead.objects.filter(organization_id=organization_id).values('id', *fields).iterator():
+        for weight, names in WEIGHTED_FIELDS:
+            for name in names:
+                index.add(row['id'], weight, row[name])
+    notes = FollowUp.objects.filter(lead__organization_id=organization_id).values_list('lead_id', 'notes')
+    for lead_id, text in notes.iterator():
+        index.add(lead_id, NOTES_WEIGHT, text)
+    index.freeze()
+    return index
+
+
+def get_index(organization_id):
+    with _indexes_lock:
+        index = _indexes.get(organization_id)
+    if index is None:
+        index = build_index(organization_id)
+        with _indexes_lock:
+            _indexes[organization_id] = index
+    return index
+
+
+def invalidate_index(organization_id):
+    with _indexes_lock:
+        _indexes.pop(organization_id, None)
+
+
+def index_lead(lead_id, organization_id=None):
+    if uses_search_vector():
+        Lead.objects.filter(pk=lead_id).update(search_vector=search_vector())
+    elif organization_id is not None:
+        invalidate_index(organization_id)
+    else:
+        invalidate_index(Lead.objects.filter(pk=lead_id).values_list('organization_id', flat=True).first())
+
+
+def index_new_leads(organization_id):
+    """
+    Compute the search vector of the leads of an organization that were inserted without one.
+    """
+    if uses_search_vector():
+        Lead.objects.filter(organization_id=organization_id, search_vector__isnull=True).update(
+            search_vector=search_vector()
+        )
+    else:
+        invalidate_index(organization_id)
+
+
+def rebuild_search_index(organization, missing_only=False, batch_size=1000):
+    """
+    Recompute the search vectors of an organization in batches, returns the number of leads indexed.
+    """
+    if not uses_search_vector():
+        invalidate_index(organization.pk)
+        return Lead.objects.filter(organization=organization).count()
+    leads = Lead.objects.filter(organization=organization)
+    if missing_only:
+        leads = leads.filter(search_vector__isnull=True)
+    ids = list(leads.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        Lead.objects.filter(pk__in=ids[start:start + batch_size]).update(search_vector=search_vector())
+    return len(ids)
+
+
+def search_leads(queryset, organization, query, limit=20, prefix=False):
+    """
+    Return the leads of ``queryset`` matching every word of ``query``, best matches first.
+
+    Each lead gets a ``rank`` attribute. With ``prefix`` the last word may be incomplete, as typed in a search box.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    queryset = queryset.filter(organization=organization)
+    if uses_search_vector():
+        # Parsed like the search vector, which keeps emails, URLs and numbers whole where tokenize() splits them.
+        search_query = (PrefixSearchQuery if prefix else SearchQuery)(query, config=SEARCH_CONFIG)
+        return list(
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')[:limit]
+        )
+
+    scores = get_index(organization.pk).search(terms, prefix=prefix)
+    leads = list(queryset.filter(pk__in=list(scores)))
+    for lead in leads:
+        lead.rank = scores[lead.pk]
+    leads.sort(key=lambda lead: (-lead.rank, -lead.pk))
+    return leads[:limit]
@@ -0,0 +1,138 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from agents.models import Agent
+from django_crm.cache import bump_organization_version
+from .assignment import recount_agent_leads
+from .metrics import CONVERTED_CATEGORY_NAME, reconcile_organization_metrics
+from .models import Category, FollowUp, Lead, User, UserProfile
+from .search import index_new_leads
+
+FIRST_NAMES = ('James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+               'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin')
+CATEGORY_NAMES = ('Contacted', CONVERTED_CATEGORY_NAME, 'Unconverted', 'Qualified', 'Negotiation')
+NOTES = ('Called, no answer', 'Sent the brochure', 'Asked to call back next week', 'Meeting booked', 'Sent a quote')
+
+
+class CrmSeeder:
+    """
+    Fill the database with organizations of fake agents, categories, leads and follow-ups for benchmarks.
+
+    Rows are generated and bulk inserted ``batch_size`` leads at a time so that memory stays flat whatever the
+    scale. Bulk inserts send no signal, the maintained counters are computed once each organization is seeded.
+    """
+    def __init__(self, organizations=1, agents=10, leads=10000, followups=2, days=365, batch_size=5000,
+                 prefix='seed', password='password', seed=0, stdout=None):
+        self.organizations = organizations
+        self.agents = agents
+        self.leads = leads
+        self.followups = followups
+        self.days = days
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.password = make_password(password)
+        self.random = random.Random(seed)
+        self.stdout = stdout
+        self.created = {'organizations': 0, 'agents': 0, 'categories': 0, 'leads': 0, 'followups': 0}
+        self.started = time.monotonic()
+
+    def run(self):
+        for number in range(self.organizations):
+            self.seed_organization(number)
+        return self.created
+
+    def usernames(self, number):
+        return [f'{self.prefix}{number}-organizer'] + [f'{self.prefix}{number}-agent{i}' for i in range(self.agents)]
+
+    def seed_organization(self, number):
+        usernames = self.usernames(number)
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=username, email=f'{username}@example.com', password=self.password,
+                     is_organizer=i == 0, is_agent=i > 0)
+                for i, username in enumerate(usernames)
+            ])
+            # SQLite does not return the primary keys of bulk inserts.
+            users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+            UserProfile.objects.bulk_create([UserProfile(user=user) for user in users.values()])
+            organization = UserProfile.objects.get(user=users[usernames[0]])
+            Agent.objects.bulk_create([
+                Agent(user=users[username], organization=organization) for username in usernames[1:]
+            ])
+            Category.objects.bulk_create([Category(name=name, organization=organization) for name in CATEGORY_NAMES])
+        agent_ids = list(Agent.objects.filter(organization=organization).values_list('pk', flat=True))
+        category_ids = list(Category.objects.filter(organization=organization).values_list('pk', flat=True))
+        self.created['organizations'] += 1
+        self.created['agents'] += len(agent_ids)
+        self.created['categories'] += len(category_ids)
+
+        batches = max((self.leads + self.batch_size - 1) // self.batch_size, 1)
+        for batch in range(batches):
+            size = min(self.batch_size, self.leads - batch * self.batch_size)
+            # Older batches first, spread over the last ``days`` days.
+            day = date.today() - timedelta(days=self.days - (batch + 1) * self.days // batches)
+            with transaction.atomic():
+                self.insert_leads(organization, size, day, agent_ids, category_ids)
+            self.report()
+
+        reconcile_organization_metrics(organization)
+        recount_agent_leads(organization)
+        index_new_leads(organization.pk)
+        bump_organization_version(organization.pk)
+
+    def insert_leads(self, organization, size, day, agent_ids, category_ids):
+        rng = self.random
+        last_id = Lead.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        leads = []
+        for i in range(size):
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            lead = Lead(
+                first_name=first_name,
+                last_name=last_name,
+                age=rng.randint(18, 80),
+                organization=organization,
+                # About a tenth of the leads are waiting for an agent and a fifth has no category.
+                agent_id=rng.choice(agent_ids) if agent_ids and rng.random() > 0.1 else None,
+                category_id=rng.choice(category_ids) if rng.random() > 0.2 else None,
+                description=f'Lead from {rng.choice(("the website", "a referral", "a trade show", "a cold call"))}',
+                # Unique, the seeded leads are not duplicates of each other.
+                phone_number=f'+1555{(last_id + i) % 10000000:07d}',
+                email=f'{first_name}.{last_name}.{last_id + i}@example.com'.lower(),
+            )
+            lead.set_blocking_keys()
+            leads.append(lead)
+        Lead.objects.bulk_create(leads, batch_size=1000)
+        # date_added is set to today on insert.
+        new_leads = Lead.objects.filter(organization=organization, pk__gt=last_id)
+        new_leads.update(date_added=day)
+        lead_ids = list(new_leads.values_list('pk', flat=True))
+        self.created['leads'] += len(lead_ids)
+
+        if self.followups:
+            contacted = timezone.make_aware(datetime(day.year, day.month, day.day, 12))
+            followups = [
+                FollowUp(lead_id=lead_id, notes=rng.choice(NOTES))
+                for lead_id in lead_ids for _ in range(rng.randint(0, 2 * self.followups))
+            ]
+            FollowUp.objects.bulk_create(followups, batch_size=1000)
+            FollowUp.objects.filter(lead_id__gt=last_id, lead__organization=organization).update(
+                date_added=min(contacted + timedelta(days=rng.randint(0, 14)), timezone.now())
+            )
+            new_leads.update_followup_summary()
+            self.created['followups'] += len(followups)
+
+    def report(self):
+        if self.stdout is not None:
+            elapsed = time.monotonic() - self.started
+            self.stdout.write(
+                f'{self.created["organizations"]} organizations, {self.created["leads"]} leads, '
+                f'{self.created["followups"]} follow-ups ({self.created["leads"] / max(elapsed, 1e-9):.0f} leads/sec)'
+            )
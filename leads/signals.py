@@ -0,0 +1,151 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from agents.models import Agent
+from django_crm.cache import bump_organization_version
+from . import metrics, search, thumbnails
+from .assignment import record_agent_leads, recount_agent_leads
+from .backends import invalidate_cached_users
+from .models import Category, FollowUp, Lead, User, UserProfile
+
+
+@receiver(post_init, sender=Lead)
+def remember_lead_state(sender, instance, **kwargs):
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+    instance._loaded_agent_id = instance.__dict__.get('agent_id')
+    instance._loaded_profile_picture = getattr(instance.__dict__.get('profile_picture'), 'name',
+                                               instance.__dict__.get('profile_picture')) or ''
+
+
+@receiver(post_save, sender=Lead)
+def update_metrics_on_lead_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    category_changed = instance.category_id != instance._loaded_category_id
+    agent_changed = instance.agent_id != instance._loaded_agent_id
+    if created:
+        converted = int(metrics.is_converted_category(instance.category_id))
+        metrics.record_leads(instance.organization_id, instance.date_added, new_leads=1, converted_leads=converted)
+        record_agent_leads(instance.agent_id, leads=1, converted_leads=converted)
+    elif category_changed or agent_changed:
+        converted = int(metrics.is_converted_category(instance.category_id))
+        was_converted = converted if not category_changed else int(
+            metrics.is_converted_category(instance._loaded_category_id)
+        )
+        metrics.record_leads(instance.organization_id, instance.date_added,
+                             converted_leads=converted - was_converted)
+        if agent_changed:
+            record_agent_leads(instance._loaded_agent_id, leads=-1, converted_leads=-was_converted)
+            record_agent_leads(instance.agent_id, leads=1, converted_leads=converted)
+        else:
+            record_agent_leads(instance.agent_id, converted_leads=converted - was_converted)
+    instance._loaded_category_id = instance.category_id
+    instance._loaded_agent_id = instance.agent_id
+    search.index_lead(instance.pk, instance.organization_id)
+    update_thumbnails(instance)
+
+
+def update_thumbnails(instance):
+    name = instance.profile_picture.name or ''
+    if name != instance._loaded_profile_picture:
+        if instance._loaded_profile_picture:
+            thumbnails.delete_thumbnails(instance._loaded_profile_picture)
+        if instance.has_thumbnails:
+            Lead.objects.filter(pk=instance.pk).update(has_thumbnails=False)
+            instance.has_thumbnails = False
+        if name:
+            thumbnails.schedule_thumbnails(name)
+        instance._loaded_profile_picture = name
+
+
+@receiver(post_delete, sender=Lead)
+def update_metrics_on_lead_delete(sender, instance, **kwargs):
+    was_converted = int(metrics.is_converted_category(instance._loaded_category_id))
+    metrics.record_leads(instance.organization_id, instance.date_added, new_leads=-1, converted_leads=-was_converted)
+    record_agent_leads(instance._loaded_agent_id, leads=-1, converted_leads=-was_converted)
+    if not search.uses_search_vector():
+        search.invalidate_index(instance.organization_id)
+
+
+@receiver(post_init, sender=Category)
+def remember_category_state(sender, instance, **kwargs):
+    instance._loaded_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Category)
+def update_metrics_on_category_rename(sender, instance, created, raw=False, **kwargs):
+    converted = metrics.CONVERTED_CATEGORY_NAME
+    renamed = not created and (instance.name == converted) != (instance._loaded_name == converted)
+    if not raw and renamed:
+        metrics.invalidate_organization_metrics(instance.organization_id)
+        recount_agent_leads(instance.organization_id)
+    instance._loaded_name = instance.name
+
+
+@receiver(post_delete, sender=Category)
+def update_metrics_on_category_delete(sender, instance, **kwargs):
+    # Leads of a deleted category are detached with a queryset update, which sends no signal.
+    if instance.name == metrics.CONVERTED_CATEGORY_NAME:
+        metrics.invalidate_organization_metrics(instance.organization_id)
+        recount_agent_leads(instance.organization_id)
+
+
+@receiver(post_save, sender=FollowUp)
+@receiver(post_delete, sender=FollowUp)
+def update_search_on_followup_change(sender, instance, raw=False, **kwargs):
+    # Follow-up notes are part of the search vector of their lead.
+    if not raw:
+        search.index_lead(instance.lead_id)
+
+
+@receiver(post_save, sender=FollowUp)
+@receiver(post_delete, sender=FollowUp)
+def update_followup_summary(sender, instance, created=True, raw=False, **kwargs):
+    # Edits keep the lead and the date of a follow-up, only creations and deletions change the summary.
+    if created and not raw:
+        Lead.objects.filter(pk=instance.lead_id).update_followup_summary()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    invalidate_cached_users([instance.pk])
+    # Agent pages show the names of their users, logins only touch last_login.
+    if instance.is_agent and update_fields != frozenset(['last_login']):
+        organization_id = Agent.objects.filter(user_id=instance.pk).values_list('organization_id', flat=True).first()
+        bump_organization_version(organization_id)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_organization(sender, instance, created=False, **kwargs):
+    bump_organization_version(instance.pk)
+    # Agents carry the profile of their organization in the cache as well.
+    agent_user_ids = [] if created else Agent.objects.filter(organization_id=instance.pk).values_list('user_id', flat=True)
+    invalidate_cached_users([instance.user_id, *agent_user_ids])
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def invalidate_cached_agent(sender, instance, **kwargs):
+    invalidate_cached_users([instance.user_id])
+    bump_organization_version(instance.organization_id)
+
+
+@receiver(post_save, sender=Lead)
+@receiver(post_delete, sender=Lead)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_organization_version_on_change(sender, instance, **kwargs):
+    bump_organization_version(instance.organization_id)
+
+
+@receiver(post_save, sender=FollowUp)
+@receiver(post_delete, sender=FollowUp)
+def bump_organization_version_on_followup_change(sender, instance, **kwargs):
+    if sender._meta.get_field('lead').is_cached(instance):
+        bump_organization_version(instance.lead.organization_id)
+    else:
+        bump_organization_version(
+            Lead.objects.filter(pk=instance.lead_id).values_list('organization_id', flat=True).first()
+        )
@@ -0,0 +1,13 @@
+from django import template
+
+from leads.thumbnails import get_thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(image, size='small'):
+    """
+    Usage: ``<img src="{% thumbnail_url lead.profile_picture 'small' %}">``
+    """
+    return get_thumbnail_url(image, size)
@@ -0,0 +1,47 @@
+from django.shortcuts import reverse
+from django.test import TestCase
+
+from agents.models import Agent
+from leads.models import Lead, User
+
+
+class LeadJsonViewTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        other = User.objects.create_user('other', password='test')
+        for i in range(5):
+            Lead.objects.create(first_name='John', last_name=f'Doe{i}', email=f'john{i}@test.com',
+                                organization=self.organizer.userprofile)
+        Lead.objects.create(first_name='Jane', last_name='Roe', email='jane@test.com', organization=other.userprofile)
+        self.client.force_login(self.organizer)
+
+    def test_pages_through_the_organization_leads(self):
+        response = self.client.get(reverse('leads:lead-json'), {'limit': 2, 'fields': 'id,last_name'})
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertTrue(all(set(row) == {'id', 'last_name'} for row in data['results']))
+            seen += [row['last_name'] for row in data['results']]
+            if not data['next_cursor']:
+                break
+            response = self.client.get(reverse('leads:lead-json'), {'limit': 2, 'cursor': data['next_cursor'],
+                                                                    'fields': 'id,last_name'})
+        self.assertEqual(seen, [f'Doe{i}' for i in range(5)])
+
+    def test_agents_only_see_their_leads(self):
+        agent_user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        agent = Agent.objects.create(user=agent_user, organization=self.organizer.userprofile)
+        Lead.objects.filter(last_name='Doe0').update(agent=agent)
+        self.client.force_login(agent_user)
+        response = self.client.get(reverse('leads:lead-json'), {'fields': 'last_name'})
+        self.assertEqual(response.json()['results'], [{'last_name': 'Doe0'}])
+
+    def test_etag_returns_not_modified(self):
+        response = self.client.get(reverse('leads:lead-json'))
+        response = self.client.get(reverse('leads:lead-json'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_rejects_unknown_fields_and_bad_cursors(self):
+        self.assertEqual(self.client.get(reverse('leads:lead-json'), {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('leads:lead-json'), {'cursor': 'nope'}).status_code, 400)
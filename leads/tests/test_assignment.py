@@ -0,0 +1,157 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from agents.models import Agent
+from leads.assignment import LeadDistributor
+from leads.bulk import bulk_assign, bulk_categorize, bulk_delete
+from leads.metrics import get_dashboard_metrics, reconcile_organization_metrics
+from leads.models import Category, FollowUp, Lead, User
+
+
+class LeadDistributionTestCase(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', email='organizer@test.com', password='test')
+        self.organization = self.organizer.userprofile
+        self.agents = [
+            Agent.objects.create(user=User.objects.create_user(f'agent{i}', is_organizer=False, is_agent=True),
+                                 organization=self.organization)
+            for i in range(3)
+        ]
+        self.converted = Category.objects.create(name='Converted', organization=self.organization)
+
+    def create_leads(self, count, **kwargs):
+        return [Lead.objects.create(first_name='John', last_name=f'Doe{i}', organization=self.organization, **kwargs)
+                for i in range(count)]
+
+    def counters(self):
+        return {agent.pk: (agent.lead_count, agent.converted_lead_count) for agent in Agent.objects.all()}
+
+
+class AgentCountersTest(LeadDistributionTestCase):
+    def test_counters_follow_saves_and_deletes(self):
+        first, second = self.agents[:2]
+        lead = self.create_leads(1, agent=first)[0]
+        lead.category = self.converted
+        lead.save()
+        self.assertEqual(self.counters()[first.pk], (1, 1))
+
+        lead.agent = second
+        lead.save()
+        self.assertEqual(self.counters()[first.pk], (0, 0))
+        self.assertEqual(self.counters()[second.pk], (1, 1))
+
+        lead.delete()
+        self.assertEqual(self.counters()[second.pk], (0, 0))
+
+    def test_counters_follow_bulk_actions(self):
+        first, second = self.agents[:2]
+        self.create_leads(3, agent=first)
+        self.create_leads(2)
+        bulk_categorize(Lead.objects.filter(pk__in=Lead.objects.filter(agent=first).values('pk')[:1]),
+                        self.converted)
+        self.assertEqual(self.counters()[first.pk], (3, 1))
+
+        bulk_assign(Lead.objects.all(), second)
+        self.assertEqual(self.counters()[first.pk], (0, 0))
+        self.assertEqual(self.counters()[second.pk], (5, 1))
+        self.assertIsNotNone(Agent.objects.get(pk=second.pk).last_assigned)
+
+        bulk_delete(Lead.objects.filter(category=self.converted))
+        self.assertEqual(self.counters()[second.pk], (4, 0))
+
+    def test_bulk_delete_runs_the_same_queries_for_any_number_of_leads(self):
+        reconcile_organization_metrics(self.organization)
+        query_counts = []
+        for count in (2, 20):
+            leads = self.create_leads(count, agent=self.agents[0], category=self.converted)
+            for lead in leads:
+                FollowUp.objects.create(lead=lead, notes='Called')
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(bulk_delete(Lead.objects.all()), count)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertFalse(FollowUp.objects.exists())
+        self.assertEqual(self.counters()[self.agents[0].pk], (0, 0))
+        self.assertEqual(get_dashboard_metrics(self.organization)['total_lead_count'], 0)
+
+
+class LeadDistributorTest(LeadDistributionTestCase):
+    def test_round_robin_cycles_through_agents(self):
+        self.create_leads(7)
+        LeadDistributor(self.organization, 'round_robin').distribute(Lead.objects.all(), batch_size=2)
+        loads = sorted(count for count, converted in self.counters().values())
+        self.assertEqual(loads, [2, 2, 3])
+        self.assertFalse(Lead.objects.filter(agent__isnull=True).exists())
+
+    def test_least_loaded_fills_the_emptiest_agent(self):
+        first, second, third = self.agents
+        self.create_leads(4, agent=first)
+        self.create_leads(1, agent=second)
+        self.create_leads(5)
+        LeadDistributor(self.organization, 'least_loaded').distribute(Lead.objects.all())
+        counters = self.counters()
+        self.assertEqual((counters[first.pk][0], counters[second.pk][0], counters[third.pk][0]), (4, 3, 3))
+
+    def test_weighted_favours_converting_agents(self):
+        first, second, third = self.agents
+        self.create_leads(4, agent=first, category=self.converted)
+        self.create_leads(4, agent=second)
+        self.create_leads(4, agent=third)
+        self.create_leads(6)
+        LeadDistributor(self.organization, 'weighted').distribute(Lead.objects.all())
+        counters = self.counters()
+        self.assertGreater(counters[first.pk][0] - 4, counters[second.pk][0] - 4)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            LeadDistributor(self.organization, 'random')
+
+    def test_distribute_leads_command(self):
+        self.create_leads(6)
+        Agent.objects.update(lead_count=100)
+        call_command('distribute_leads', strategy='least_loaded', recount=True, stdout=StringIO())
+        self.assertEqual(sorted(count for count, converted in self.counters().values()), [2, 2, 2])
+
+    @override_settings(LEAD_ASSIGNMENT_STRATEGY='round_robin')
+    def test_new_leads_are_assigned_on_creation(self):
+        self.client.force_login(self.organizer)
+        for i in range(3):
+            self.client.post(reverse('leads:lead-create'), {
+                'first_name': 'John', 'last_name': f'Doe{i}', 'age': 30, 'email': f'john{i}@test.com',
+                'phone_number': '123', 'description': 'New lead'
+            })
+        self.assertEqual(Lead.objects.count(), 3)
+        self.assertEqual(sorted(count for count, converted in self.counters().values()), [1, 1, 1])
+
+    def test_single_leads_go_to_the_agent_the_batch_would_pick(self):
+        first, second, third = self.agents
+        self.create_leads(4, agent=first, category=self.converted)
+        self.create_leads(2, agent=second)
+        self.create_leads(3, agent=third)
+        Agent.objects.filter(pk=second.pk).update(last_assigned=timezone.now())
+        for strategy, expected in (('round_robin', first), ('least_loaded', first), ('weighted', first)):
+            with self.subTest(strategy=strategy):
+                distributor = LeadDistributor(self.organization, strategy)
+                self.assertEqual(distributor.strategy.choose(), expected)
+                lead = Lead(first_name='Jane', last_name='Roe', organization=self.organization)
+                # A savepoint, then one SELECT and one UPDATE of a single agent.
+                with self.assertNumQueries(4):
+                    self.assertEqual(distributor.assign(lead), expected)
+                self.assertEqual(lead.agent, expected)
+        Agent.objects.update(last_assigned=None)
+        lead = Lead(first_name='Jane', last_name='Roe', organization=self.organization)
+        Agent.objects.filter(pk=first.pk).update(last_assigned=timezone.now())
+        self.assertEqual(LeadDistributor(self.organization, 'round_robin').assign(lead), second)
+
+    def test_distribute_counts_the_leads_it_updated(self):
+        leads = self.create_leads(4)
+        distributor = LeadDistributor(self.organization, 'round_robin')
+        batch = [lead.pk for lead in leads]
+        Lead.objects.filter(pk=leads[0].pk).update(agent=self.agents[0])
+        self.assertEqual(distributor.distribute_batch(batch), 3)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+import time
+from importlib import import_module
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+
+from agents.models import Agent
+from django_crm.concurrency import gather_queries
+from leads import async_views, views
+from leads.middleware import get_agent, get_organization
+from leads.models import FollowUp, Lead, User
+
+
+@override_settings(ASYNC_PARALLEL_QUERIES=False)
+class AsyncViewsTest(TestCase):
+    """
+    Queries run on the test thread, the async views must give the same pages as the synchronous ones.
+    """
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=user, organization=self.organizer.userprofile)
+        self.leads = [
+            Lead.objects.create(first_name=f'John{i}', last_name='Doe', organization=self.organizer.userprofile,
+                                agent=self.agent if i % 2 else None)
+            for i in range(6)
+        ]
+        self.lead = self.leads[1]
+        FollowUp.objects.create(lead=self.lead, notes='Called')
+        FollowUp.objects.create(lead=self.lead, notes='Emailed')
+
+    def request(self, user, path='/', **params):
+        request = RequestFactory().get(path, params)
+        request.user = user
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        request.agent = get_agent(user)
+        request.organization = get_organization(user)
+        return request
+
+    def get(self, view_class, user, params=None, **kwargs):
+        view = view_class.as_view()
+        request = self.request(user, **params or {})
+        if asyncio.iscoroutinefunction(view):
+            response = async_to_sync(view)(request, **kwargs)
+        else:
+            response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_views_are_coroutines(self):
+        for name in ('DashboardView', 'LeadListView', 'LeadDetailView', 'LeadJsonView'):
+            with self.subTest(view=name):
+                view_class = getattr(async_views, name)
+                view = view_class.as_view()
+                self.assertTrue(asyncio.iscoroutinefunction(view))
+                self.assertIs(view.view_class, view_class)
+
+    def test_dashboard(self):
+        response = self.get(async_views.DashboardView, self.organizer)
+        self.assertEqual(response.context_data['total_lead_count'], 6)
+        self.assertEqual(response.context_data['total_new_leads'], 6)
+        # Served from the cache of the organization the second time.
+        self.assertEqual(self.get(async_views.DashboardView, self.organizer).content, response.content)
+        self.assertEqual(self.get(async_views.DashboardView, self.agent.user).status_code, 302)
+
+    def test_lead_list(self):
+        for user in (self.organizer, self.agent.user):
+            with self.subTest(user=user):
+                expected = self.get(views.LeadListView, user, {'sort': 'first_name'})
+                response = self.get(async_views.LeadListView, user, {'sort': 'first_name'})
+                self.assertEqual(response.context_data['leads'], expected.context_data['leads'])
+                self.assertEqual(response.context_data.get('unassigned_leads'),
+                                 expected.context_data.get('unassigned_leads'))
+                self.assertContains(response, 'John1')
+
+    def test_lead_detail(self):
+        response = self.get(async_views.LeadDetailView, self.agent.user, pk=self.lead.pk)
+        self.assertEqual(response.context_data['lead'], self.lead)
+        self.assertEqual([followup.notes for followup in response.context_data['followups']], ['Called', 'Emailed'])
+        self.assertContains(response, 'Emailed')
+        with self.assertRaises(Http404):
+            self.get(async_views.LeadDetailView, self.agent.user, pk=self.leads[0].pk)
+
+    def test_lead_json(self):
+        params = {'fields': 'id,first_name,agent', 'limit': 4}
+        expected = self.get(views.LeadJsonView, self.organizer, params)
+        response = self.get(async_views.LeadJsonView, self.organizer, params)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(len(json.loads(response.content)['results']), 4)
+
+
+class GatherQueriesTest(TestCase):
+    @staticmethod
+    def thread_ident():
+        time.sleep(0.05)
+        return threading.get_ident()
+
+    @override_settings(ASYNC_PARALLEL_QUERIES=True)
+    def test_runs_concurrently(self):
+        start = time.perf_counter()
+        idents = async_to_sync(gather_queries)(*[self.thread_ident] * 4)
+        self.assertLess(time.perf_counter() - start, 0.15)
+        self.assertEqual(len(set(idents)), 4)
+
+    @override_settings(ASYNC_PARALLEL_QUERIES=False)
+    def test_runs_sequentially_on_the_calling_thread(self):
+        self.assertEqual(async_to_sync(gather_queries)(self.thread_ident, lambda: 1),
+                         [threading.get_ident(), 1])
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from agents.models import Agent
+from leads.backends import CachedModelBackend
+from leads.middleware import OrganizationMiddleware
+from leads.models import User
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedModelBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=self.user, organization=self.organizer.userprofile)
+
+    def test_user_relations_are_loaded_once(self):
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.agent.organization, self.organizer.userprofile)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.agent.organization.pk, self.organizer.userprofile.pk)
+
+    def test_changes_invalidate_the_cached_user(self):
+        self.backend.get_user(self.user.pk)
+        other = User.objects.create_user('other').userprofile
+        self.agent.organization = other
+        self.agent.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).agent.organization, other)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_users_are_not_cached_in_a_cache_local_to_the_process(self):
+        self.backend.get_user(self.user.pk)
+        # Deactivated by another process, whose signals do not reach the cache of this one.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_middleware_exposes_the_organization(self):
+        middleware = OrganizationMiddleware(lambda request: request)
+        request = RequestFactory().get('/')
+        request.user = self.backend.get_user(self.user.pk)
+        request = middleware(request)
+        self.assertEqual(request.agent, self.agent)
+        self.assertEqual(request.organization, self.organizer.userprofile)
+
+        request.user = self.backend.get_user(self.organizer.pk)
+        request = middleware(request)
+        self.assertIsNone(request.agent)
+        self.assertEqual(request.organization, self.organizer.userprofile)
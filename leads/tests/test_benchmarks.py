@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from agents.models import Agent
+from leads.benchmarks import iter_urls, percentile
+from leads.models import Category, FollowUp, Lead, OrganizationMetrics, User
+
+
+class SeedCrmCommandTest(TestCase):
+    def test_seeds_every_organization_in_batches(self):
+        call_command('seed_crm', organizations=2, agents=3, leads=25, followups=1, batch_size=10, stdout=StringIO())
+        self.assertEqual(User.objects.filter(is_organizer=True, username__startswith='seed').count(), 2)
+        self.assertEqual(Agent.objects.count(), 6)
+        self.assertEqual(Lead.objects.count(), 50)
+        organizer = User.objects.get(username='seed1-organizer')
+        self.assertTrue(organizer.check_password('password'))
+        self.assertEqual(Category.objects.filter(organization=organizer.userprofile).count(), 5)
+
+        # The counters bulk inserts skip are computed once the organization is seeded.
+        metrics = OrganizationMetrics.objects.get(organization=organizer.userprofile)
+        self.assertEqual(metrics.total_leads, 25)
+        self.assertEqual(sum(Agent.objects.filter(organization=organizer.userprofile).values_list('lead_count',
+                                                                                                   flat=True)),
+                         Lead.objects.filter(organization=organizer.userprofile, agent__isnull=False).count())
+        lead = Lead.objects.filter(followups__isnull=False).first()
+        self.assertEqual(lead.followup_count, lead.followups.count())
+        self.assertEqual(sum(Lead.objects.values_list('followup_count', flat=True)), FollowUp.objects.count())
+        self.assertGreater(Lead.objects.values('date_added').distinct().count(), 1)
+
+    def test_refuses_an_existing_prefix(self):
+        call_command('seed_crm', leads=1, agents=1, stdout=StringIO())
+        with self.assertRaisesMessage(Exception, 'already exist'):
+            call_command('seed_crm', leads=1, agents=1, stdout=StringIO())
+
+
+class BenchmarkUrlsCommandTest(TestCase):
+    def test_reports_every_page(self):
+        call_command('seed_crm', agents=2, leads=20, followups=1, stdout=StringIO())
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        file_name = os.path.join(tmp_dir.name, 'report.json')
+        call_command('benchmark_urls', iterations=2, output=file_name, stdout=StringIO())
+        with open(file_name) as f:
+            report = json.load(f)
+
+        self.assertEqual(report['meta']['leads'], 20)
+        results = {(result['url'], result['role']): result for result in report['results']}
+        names = [name for name, pattern in iter_urls()]
+        self.assertEqual(set(results), {(name, role) for name in names for role in ('organizer', 'agent')})
+        lead_list = results['leads:lead-list', 'organizer']
+        self.assertEqual(lead_list['status'], 200)
+        self.assertEqual(set(lead_list['latency_ms']), {'min', 'p50', 'p90', 'p99', 'max', 'mean'})
+        self.assertGreater(lead_list['queries'], 0)
+        self.assertGreater(lead_list['memory_peak_kb'], 0)
+        self.assertEqual(results['agents:agent-detail', 'organizer']['status'], 200)
+        self.assertEqual(results['leads:followup-upload-create', 'organizer']['skipped'], 'no GET handler')
+        self.assertEqual(results['leads:followup-upload-chunk', 'organizer']['skipped'], 'no object to request')
+
+        out = StringIO()
+        call_command('benchmark_urls', iterations=1, url=['leads:lead-list'], compare=file_name, stdout=out)
+        self.assertIn('leads:lead-list', out.getvalue())
+        self.assertIn('queries', out.getvalue())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
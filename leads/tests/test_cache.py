@@ -0,0 +1,85 @@
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from agents.models import Agent
+from django_crm.cache import get_organization_version
+from leads.bulk import bulk_categorize
+from leads.models import Category, FollowUp, Lead, User
+
+
+@override_settings(SHARED_CACHE=True)
+class OrganizationCacheTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.organization = self.organizer.userprofile
+        self.category = Category.objects.create(name='Contacted', organization=self.organization)
+        self.lead = Lead.objects.create(first_name='John', last_name='Doe', organization=self.organization,
+                                        category=self.category)
+        self.client.force_login(self.organizer)
+
+    def assertCachedAfterFirstHit(self, url):
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_pages_are_served_from_the_cache(self):
+        for url in (
+            reverse('dashboard'),
+            reverse('leads:category-list'),
+            reverse('agents:agent-list'),
+        ):
+            with self.subTest(url=url):
+                self.assertCachedAfterFirstHit(url)
+
+    def test_writes_invalidate_the_cached_pages(self):
+        url = reverse('leads:category-list')
+        self.client.get(url)
+        Category.objects.create(name='Converted', organization=self.organization)
+        self.assertContains(self.client.get(url), 'Converted')
+
+        detail_url = reverse('leads:category-detail', kwargs={'pk': self.category.pk})
+        self.client.get(detail_url)
+        Lead.objects.create(first_name='Jane', last_name='Roe', organization=self.organization, category=self.category)
+        self.assertContains(self.client.get(detail_url), 'Jane')
+
+        self.client.get(reverse('dashboard'))
+        Lead.objects.create(first_name='Jim', last_name='Poe', organization=self.organization)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_lead_count'], 3)
+
+    def test_every_model_bumps_the_version(self):
+        user = User.objects.create_user('agent', is_organizer=False, is_agent=True)
+        changes = (
+            lambda: Agent.objects.create(user=user, organization=self.organization),
+            lambda: FollowUp.objects.create(lead=self.lead, notes='Called'),
+            lambda: FollowUp.objects.get(lead=self.lead).delete(),
+            lambda: bulk_categorize(Lead.objects.all(), Category.objects.create(name='Other')),
+        )
+        for change in changes:
+            version = get_organization_version(self.organization.pk)
+            change()
+            self.assertNotEqual(get_organization_version(self.organization.pk), version)
+
+    def test_organizations_do_not_share_entries(self):
+        url = reverse('leads:category-list')
+        self.client.get(url)
+        other = User.objects.create_user('other', password='test')
+        Category.objects.create(name='Theirs', organization=other.userprofile)
+        self.client.force_login(other)
+        response = self.client.get(url)
+        self.assertContains(response, 'Theirs')
+        self.assertNotContains(response, 'Contacted')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_nothing_is_cached_in_a_cache_local_to_the_process(self):
+        url = reverse('leads:category-list')
+        self.client.get(url)
+        self.client.get(reverse('dashboard'))
+        # An update sends no signal, like a write handled by another process bumps no version here.
+        Category.objects.filter(pk=self.category.pk).update(name='Renamed')
+        self.assertContains(self.client.get(url), 'Renamed')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard'))
+        self.assertTrue(queries)
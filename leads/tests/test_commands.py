@@ -0,0 +1,140 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase
+
+from leads.importers import COPY_FIELDS, LeadImporter, ShardedLeadImporter
+from leads.models import Lead, LeadImportCheckpoint, User
+
+
+class CreateLeadsCommandTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', email='organizer@test.com', password='test')
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_csv(self, rows, fieldnames=('first_name', 'last_name', 'age', 'email')):
+        file_name = os.path.join(self.tmp_dir.name, 'leads.csv')
+        with open(file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            writer.writerows(rows)
+        return file_name
+
+    def test_imports_leads_in_batches(self):
+        file_name = self.write_csv([(f'first{i}', f'last{i}', i, f'lead{i}@test.com') for i in range(25)])
+        call_command('create_leads', file_name, 'organizer@test.com', batch_size=10, stdout=StringIO())
+        self.assertEqual(Lead.objects.filter(organization=self.organizer.userprofile).count(), 25)
+
+    def test_invalid_rows_are_written_to_the_reject_file(self):
+        file_name = self.write_csv([
+            ('pepe', 'pepov', 18, 'pep@mail.ru'),
+            ('kek', 'kekov', 'old', 'kek@yandex.ru'),
+            ('kuai', 'liang', 45, 'not-an-email'),
+        ])
+        call_command('create_leads', file_name, 'organizer@test.com', stdout=StringIO())
+        self.assertEqual(list(Lead.objects.values_list('first_name', flat=True)), ['pepe'])
+        with open(f'{file_name}.rejects.csv', newline='') as f:
+            rejects = list(csv.DictReader(f))
+        self.assertEqual([row['line'] for row in rejects], ['3', '4'])
+        self.assertIn('age', rejects[0]['error'])
+        self.assertIn('email', rejects[1]['error'])
+
+    def test_dry_run_does_not_write(self):
+        file_name = self.write_csv([('pepe', 'pepov', 18, 'pep@mail.ru')])
+        call_command('create_leads', file_name, 'organizer@test.com', dry_run=True, stdout=StringIO())
+        self.assertFalse(Lead.objects.exists())
+
+    def test_copy_writes_every_not_null_column(self):
+        not_null = {field.name for field in Lead._meta.concrete_fields if not field.null and not field.primary_key}
+        self.assertEqual(not_null - set(COPY_FIELDS), set())
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs PostgreSQL')
+    def test_imports_leads_with_copy(self):
+        file_name = self.write_csv([(f'first{i}', f'last{i}', i, f'lead{i}@test.com') for i in range(5)])
+        stats = LeadImporter(self.organizer.userprofile, use_copy=True).run(file_name)
+        self.assertEqual(stats.created, 5)
+        lead = Lead.objects.get(email='lead3@test.com')
+        self.assertEqual((lead.age, lead.followup_count, lead.email_key), (3, 0, 'lead3@test.com'))
+
+    def test_unknown_columns_are_refused(self):
+        file_name = self.write_csv([('pepe', 'pepe@mail.ru')], fieldnames=('nickname', 'email'))
+        with self.assertRaises(CommandError):
+            call_command('create_leads', file_name, 'organizer@test.com', stdout=StringIO())
+
+
+class ShardedLeadImporterTest(TestCase):
+    def setUp(self):
+        self.organization = User.objects.create_user('organizer', email='organizer@test.com').userprofile
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.file_name = os.path.join(tmp_dir.name, 'leads.csv')
+        with open(self.file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('first_name', 'last_name', 'age', 'email'))
+            writer.writerows((f'first{i}', f'last{i}', i, f'lead{i}@test.com') for i in range(40))
+
+    def get_importer(self):
+        return ShardedLeadImporter(self.organization, batch_size=5, shard_size=256)
+
+    def test_imports_every_shard(self):
+        stats = self.get_importer().run(self.file_name)
+        self.assertEqual(stats.created, 40)
+        self.assertEqual(Lead.objects.count(), 40)
+        checkpoints = LeadImportCheckpoint.objects.filter(organization=self.organization)
+        self.assertGreater(checkpoints.count(), 1)
+        self.assertFalse(checkpoints.filter(is_complete=False).exists())
+
+    def test_resumes_without_duplicating_leads(self):
+        original_insert = ShardedLeadImporter.insert
+        calls = []
+
+        def failing_insert(importer, leads):
+            calls.append(leads)
+            if len(calls) == 4:
+                raise RuntimeError('crash')
+            original_insert(importer, leads)
+
+        with mock.patch.object(ShardedLeadImporter, 'insert', failing_insert):
+            with self.assertRaises(RuntimeError):
+                self.get_importer().run(self.file_name)
+        self.assertEqual(Lead.objects.count(), sum(len(leads) for leads in calls[:3]))
+
+        self.get_importer().run(self.file_name)
+        self.assertEqual(Lead.objects.count(), 40)
+        self.assertEqual(Lead.objects.values('email').distinct().count(), 40)
+
+        stats = self.get_importer().run(self.file_name)
+        self.assertEqual(stats.created, 0)
+
+    def test_resumed_runs_keep_the_rejects_of_earlier_runs(self):
+        with open(self.file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('first_name', 'last_name', 'age', 'email'))
+            writer.writerows((f'first{i}', f'last{i}', 'old' if i % 5 == 0 else i, f'lead{i}@test.com')
+                             for i in range(40))
+        reject_file = f'{self.file_name}.rejects.csv'
+        original_insert = ShardedLeadImporter.insert
+        calls = []
+
+        def failing_insert(importer, leads):
+            calls.append(leads)
+            if len(calls) == 4:
+                raise RuntimeError('crash')
+            original_insert(importer, leads)
+
+        with mock.patch.object(ShardedLeadImporter, 'insert', failing_insert):
+            with self.assertRaises(RuntimeError):
+                ShardedLeadImporter(self.organization, batch_size=5, shard_size=256, reject_file=reject_file).run(
+                    self.file_name)
+        ShardedLeadImporter(self.organization, batch_size=5, shard_size=256, reject_file=reject_file).run(
+            self.file_name)
+        with open(reject_file, newline='') as f:
+            rejects = list(csv.DictReader(f))
+        self.assertEqual([row['first_name'] for row in rejects], [f'first{i}' for i in range(0, 40, 5)])
+        self.assertEqual(Lead.objects.count(), 32)
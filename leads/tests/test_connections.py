@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from django_crm.postgresql.base import ConnectionPool, HealthCheckMixin, get_pool
+
+
+class FakeConnection:
+    def __init__(self, status=extensions.TRANSACTION_STATUS_IDLE):
+        self.closed = 0
+        self.status = status
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_idle_connections_are_reused_up_to_the_pool_size(self):
+        pool = ConnectionPool(2)
+        self.assertEqual(pool.take(), (None, None))
+        first, second, third = FakeConnection(), FakeConnection(), FakeConnection()
+        for connection in (first, second, third):
+            pool.give(connection, None)
+        self.assertTrue(third.closed)
+        self.assertEqual(pool.take(), (second, None))
+        self.assertEqual(pool.take(), (first, None))
+        self.assertEqual(pool.take(), (None, None))
+
+    def test_connections_in_a_transaction_or_closed_are_not_reused(self):
+        pool = ConnectionPool(2)
+        in_transaction = FakeConnection(extensions.TRANSACTION_STATUS_INTRANS)
+        pool.give(in_transaction, None)
+        self.assertTrue(in_transaction.closed)
+        dropped = FakeConnection()
+        pool.give(dropped, None)
+        dropped.closed = 2
+        self.assertEqual(pool.take(), (None, None))
+
+    def test_pools_belong_to_a_process(self):
+        pool = get_pool('test-pool', 2)
+        self.assertIs(get_pool('test-pool', 2), pool)
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(get_pool('test-pool', 2), pool)
+
+
+class HealthCheckedWrapper(HealthCheckMixin, sqlite_base.DatabaseWrapper):
+    pass
+
+
+class HealthCheckTest(SimpleTestCase):
+    def get_wrapper(self, health_checks):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(tmp_dir.name, 'db.sqlite3'),
+            'CONN_MAX_AGE': None,
+            'CONN_HEALTH_CHECKS': health_checks,
+        }
+        wrapper = HealthCheckedWrapper(settings_dict, 'health-check')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def request(self, wrapper):
+        wrapper.close_if_unusable_or_obsolete()
+        wrapper.cursor().execute('SELECT 1')
+        wrapper.cursor().execute('SELECT 1')
+        wrapper.close_if_unusable_or_obsolete()
+
+    def test_dropped_connections_are_replaced_before_the_first_query(self):
+        wrapper = self.get_wrapper(health_checks=True)
+        with mock.patch.object(wrapper, 'is_usable', return_value=True) as is_usable:
+            self.request(wrapper)
+            # A new connection is not checked.
+            self.assertEqual(is_usable.call_count, 0)
+            self.request(wrapper)
+            self.assertEqual(is_usable.call_count, 1)
+        connection = wrapper.connection
+        with mock.patch.object(wrapper, 'is_usable', return_value=False):
+            self.request(wrapper)
+        self.assertIsNotNone(wrapper.connection)
+        self.assertIsNot(wrapper.connection, connection)
+
+    def test_checks_can_be_disabled(self):
+        wrapper = self.get_wrapper(health_checks=False)
+        with mock.patch.object(wrapper, 'is_usable', return_value=False) as is_usable:
+            self.request(wrapper)
+            self.request(wrapper)
+        self.assertEqual(is_usable.call_count, 0)
@@ -0,0 +1,163 @@
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase
+
+from agents.models import Agent
+from leads.dedup import find_duplicate_groups
+from leads.metrics import get_dashboard_metrics, reconcile_organization_metrics
+from leads.models import Category, FollowUp, Lead, User
+from leads.normalization import normalize_email, normalize_name, normalize_phone, soundex
+
+
+class NormalizationTest(TestCase):
+    def test_phone_numbers_are_normalized_to_e164(self):
+        for value in ('+1 (555) 123-4567', '555.123.4567', '1-555-123-4567', '001 555 123 4567',
+                      '555 123 4567 ext. 12'):
+            self.assertEqual(normalize_phone(value, '1'), '+15551234567', value)
+        self.assertEqual(normalize_phone('020 7946 0958', '44'), '+442079460958')
+        self.assertEqual(normalize_phone('+44 20 7946 0958', '1'), '+442079460958')
+        self.assertEqual(normalize_phone('12', '1'), '')
+        self.assertEqual(normalize_phone('', '1'), '')
+
+    def test_names_sounding_alike_share_a_key(self):
+        self.assertEqual(soundex('Robert'), 'R163')
+        self.assertEqual(soundex('Rupert'), 'R163')
+        self.assertEqual(soundex('Ashcraft'), 'A261')
+        self.assertEqual(soundex('Tymczak'), 'T522')
+        self.assertEqual(soundex('Pfister'), 'P236')
+        self.assertEqual(normalize_name('Jon', 'Smyth'), normalize_name('John', 'Smith'))
+        self.assertEqual(normalize_name('José', ''), 'J2000000')
+        self.assertEqual(normalize_name('', ''), '')
+
+    def test_keys_are_stored_on_save(self):
+        organizer = User.objects.create_user('organizer')
+        lead = Lead.objects.create(first_name='John', last_name='Doe', email=' John.Doe@Example.com',
+                                   phone_number='555-123-4567', organization=organizer.userprofile)
+        self.assertEqual(normalize_email(lead.email), 'john.doe@example.com')
+        lead.refresh_from_db()
+        self.assertEqual((lead.email_key, lead.phone_key, lead.name_key),
+                         ('john.doe@example.com', '+15551234567', 'J500D000'))
+
+        lead.email = 'jd@example.com'
+        lead.save(update_fields=['email'])
+        lead.refresh_from_db()
+        self.assertEqual(lead.email_key, 'jd@example.com')
+
+
+class DuplicateCheckTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', email='organizer@test.com', password='test')
+        self.lead = Lead.objects.create(first_name='John', last_name='Doe', email='john@test.com',
+                                        phone_number='555-123-4567', organization=self.organizer.userprofile)
+        self.client.force_login(self.organizer)
+
+    def post_lead(self, url, follow=False, **data):
+        return self.client.post(url, {
+            'first_name': 'Jon', 'last_name': 'Doe', 'age': 30, 'description': 'New',
+            'phone_number': '555-000-0000', 'email': 'jon@test.com', **data
+        }, follow=follow)
+
+    def test_create_view_refuses_duplicates(self):
+        response = self.post_lead(reverse('leads:lead-create'), email='JOHN@test.com')
+        self.assertContains(response, 'John Doe already has this email')
+        response = self.post_lead(reverse('leads:lead-create'), phone_number='+1 555 123 4567')
+        self.assertContains(response, 'John Doe already has this phone number')
+        self.assertEqual(Lead.objects.count(), 1)
+
+        response = self.post_lead(reverse('leads:lead-create'), follow=True)
+        self.assertContains(response, 'they may be the same person')
+        self.assertEqual(Lead.objects.count(), 2)
+
+    def test_duplicates_of_other_organizations_are_allowed(self):
+        other = User.objects.create_user('other', password='test')
+        self.client.force_login(other)
+        self.post_lead(reverse('leads:lead-create'), email='john@test.com')
+        self.assertEqual(Lead.objects.filter(organization=other.userprofile).count(), 1)
+
+    def test_update_view_does_not_report_the_lead_itself(self):
+        response = self.post_lead(reverse('leads:lead-update', kwargs={'pk': self.lead.pk}),
+                                  email='john@test.com', phone_number='5551234567')
+        self.assertEqual(response.status_code, 302)
+
+    def test_import_rejects_duplicates(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        file_name = os.path.join(tmp_dir.name, 'leads.csv')
+        with open(file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('first_name', 'last_name', 'email', 'phone_number'))
+            writer.writerows([
+                ('John', 'Doe', 'John@Test.com', ''),
+                ('Jane', 'Roe', 'jane@test.com', '555 987 6543'),
+                ('Janet', 'Roe', 'janet@test.com', '(555) 987-6543'),
+                ('Jim', 'Poe', 'jim@test.com', ''),
+            ])
+        call_command('create_leads', file_name, 'organizer@test.com', batch_size=2, stdout=StringIO())
+        self.assertEqual(set(Lead.objects.values_list('first_name', flat=True)), {'John', 'Jane', 'Jim'})
+        with open(f'{file_name}.rejects.csv', newline='') as f:
+            rejects = list(csv.DictReader(f))
+        self.assertEqual([(row['line'], row['error']) for row in rejects], [
+            ('2', f'Duplicate of lead {self.lead.pk}'),
+            ('4', f'Duplicate of lead {Lead.objects.get(first_name="Jane").pk}'),
+        ])
+
+        call_command('create_leads', file_name, 'organizer@test.com', keep_duplicates=True, stdout=StringIO())
+        self.assertEqual(Lead.objects.count(), 7)
+
+
+class MergeDuplicatesTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', email='organizer@test.com')
+        self.organization = self.organizer.userprofile
+        user = User.objects.create_user('agent', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=user, organization=self.organization)
+        self.converted = Category.objects.create(name='Converted', organization=self.organization)
+        reconcile_organization_metrics(self.organization)
+
+    def create_lead(self, **kwargs):
+        lead = Lead(organization=self.organization, first_name='John', last_name='Doe', **kwargs)
+        # Imported with --keep-duplicates.
+        lead.set_blocking_keys()
+        Lead.objects.bulk_create([lead])
+        return Lead.objects.order_by('-pk').first()
+
+    def test_groups_join_email_and_phone_matches(self):
+        first = self.create_lead(email='john@test.com', phone_number='555-123-4567')
+        by_email = self.create_lead(email='JOHN@test.com', phone_number='555-999-0000')
+        by_phone = self.create_lead(email='johnny@test.com', phone_number='5559990000')
+        other = self.create_lead(email='other@test.com', phone_number='555-111-2222')
+        self.create_lead(email='other@test.com', phone_number='')
+        self.create_lead(email='', phone_number='')
+        self.create_lead(email='', phone_number='')
+        self.assertEqual(find_duplicate_groups(self.organization), [
+            [first.pk, by_email.pk, by_phone.pk],
+            [other.pk, other.pk + 1],
+        ])
+
+    def test_command_merges_leads_and_follow_ups(self):
+        lead = Lead.objects.create(organization=self.organization, first_name='John', last_name='Doe',
+                                   email='john@test.com', phone_number='555-123-4567')
+        FollowUp.objects.create(lead=lead, notes='Called')
+        duplicate = Lead.objects.create(organization=self.organization, first_name='Johnny', last_name='Doe',
+                                        email='john@test.com', agent=self.agent, category=self.converted,
+                                        description='Wants a quote')
+        FollowUp.objects.create(lead=duplicate, notes='Sent a quote')
+
+        call_command('merge_duplicate_leads', dry_run=True, stdout=StringIO())
+        self.assertEqual(Lead.objects.count(), 2)
+
+        result = call_command('merge_duplicate_leads', organizer_email='organizer@test.com', stdout=StringIO())
+        self.assertEqual(result, '1 duplicate leads have been merged into 1 leads')
+        self.assertEqual(Lead.objects.get().pk, lead.pk)
+        lead = Lead.objects.get()
+        self.assertEqual((lead.agent, lead.category, lead.followup_count), (self.agent, self.converted, 2))
+        self.assertEqual(set(lead.followups.values_list('notes', flat=True)), {'Called', 'Sent a quote'})
+        metrics = get_dashboard_metrics(self.organization)
+        self.assertEqual((metrics['total_lead_count'], metrics['total_converted_new_leads']), (1, 1))
+        self.agent.refresh_from_db()
+        self.assertEqual((self.agent.lead_count, self.agent.converted_lead_count), (1, 1))
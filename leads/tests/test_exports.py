@@ -0,0 +1,112 @@
+import csv
+import gzip
+import os
+import tempfile
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase
+
+from agents.models import Agent
+from leads import exports
+from leads.models import Category, FollowUp, Lead, User
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class LeadExportTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', email='organizer@test.com', password='test')
+        organization = self.organizer.userprofile
+        user = User.objects.create_user('agent', email='agent@test.com', password='test', is_organizer=False,
+                                        is_agent=True)
+        self.agent = Agent.objects.create(user=user, organization=organization)
+        self.category = Category.objects.create(name='Contacted', organization=organization)
+        self.leads = [
+            Lead.objects.create(first_name=f'John{i}', last_name='Doe', age=20 + i, email=f'john{i}@test.com',
+                                organization=organization, agent=self.agent if i % 2 else None,
+                                category=self.category if i == 1 else None, description='Interested, "maybe"')
+            for i in range(5)
+        ]
+        FollowUp.objects.create(lead=self.leads[1], notes='Called')
+        FollowUp.objects.create(lead=self.leads[1], notes='Emailed')
+        other = User.objects.create_user('other', password='test')
+        Lead.objects.create(first_name='Jane', last_name='Roe', organization=other.userprofile)
+        self.client.force_login(self.organizer)
+
+    def read_csv(self, content):
+        return list(csv.DictReader(StringIO(content)))
+
+    def test_streams_the_leads_of_the_organization(self):
+        response = self.client.get(reverse('leads:lead-export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        self.assertIn('.csv"', response['Content-Disposition'])
+        rows = self.read_csv(b''.join(response.streaming_content).decode())
+        self.assertEqual([row['first_name'] for row in rows], [f'John{i}' for i in range(5)])
+        self.assertEqual(rows[1]['category'], 'Contacted')
+        self.assertEqual(rows[1]['agent'], 'agent')
+        self.assertEqual(rows[1]['followup_count'], '2')
+        self.assertEqual(rows[0]['agent'], '')
+        self.assertEqual(rows[0]['description'], 'Interested, "maybe"')
+
+    def test_first_chunk_is_sent_before_the_query(self):
+        response = self.client.get(reverse('leads:lead-export'))
+        with self.assertNumQueries(0):
+            header = next(iter(response.streaming_content))
+        self.assertTrue(header.startswith(b'id,first_name'))
+
+    def test_filters_and_gzip(self):
+        response = self.client.get(reverse('leads:lead-export'), {'agent': self.agent.pk, 'gzip': 1})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = self.read_csv(gzip.decompress(b''.join(response.streaming_content)).decode())
+        self.assertEqual([row['first_name'] for row in rows], ['John1', 'John3'])
+
+    def test_rows_are_written_in_chunks(self):
+        chunks = list(exports.iter_csv((i, 'x' * 1000) + (None,) * 12 for i in range(200)))
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(len(chunk) < exports.CHUNK_CHARACTERS + 2000 for chunk in chunks))
+
+    def test_formulas_are_exported_as_text(self):
+        Lead.objects.filter(pk=self.leads[0].pk).update(first_name='=HYPERLINK("http://evil")', last_name='@SUM(A1)',
+                                                         description='-2+3', phone_number='+1 555 0100')
+        rows = self.read_csv(b''.join(self.client.get(reverse('leads:lead-export')).streaming_content).decode())
+        self.assertEqual((rows[0]['first_name'], rows[0]['last_name'], rows[0]['description'], rows[0]['phone_number']),
+                         ("'=HYPERLINK(\"http://evil\")", "'@SUM(A1)", "'-2+3", "'+1 555 0100"))
+        self.assertEqual(rows[1]['first_name'], 'John1')
+        self.assertEqual(exports.escape_formula(-2), -2)
+
+    def test_only_organizers_export(self):
+        self.client.force_login(self.agent.user)
+        self.assertEqual(self.client.get(reverse('leads:lead-export')).status_code, 302)
+        self.client.force_login(self.organizer)
+        self.assertEqual(self.client.get(reverse('leads:lead-export'), {'format': 'pdf'}).status_code, 400)
+
+    @skipUnless(openpyxl, 'openpyxl is not installed')
+    def test_xlsx(self):
+        response = self.client.get(reverse('leads:lead-export'), {'format': 'xlsx'})
+        with tempfile.TemporaryFile() as f:
+            f.write(b''.join(response.streaming_content))
+            sheet = openpyxl.load_workbook(f).active
+            self.assertEqual(sheet.max_row, 6)
+
+    @skipIf(openpyxl, 'openpyxl is installed')
+    def test_xlsx_needs_openpyxl(self):
+        self.assertEqual(self.client.get(reverse('leads:lead-export'), {'format': 'xlsx'}).status_code, 501)
+
+    def test_command(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        file_name = os.path.join(tmp_dir.name, 'leads.csv.gz')
+        call_command('export_leads', 'organizer@test.com', output=file_name, gzip=True, chunk_size=2)
+        with gzip.open(file_name, 'rt') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 5)
+        out = StringIO()
+        call_command('export_leads', 'organizer@test.com', stdout=out)
+        self.assertEqual(len(self.read_csv(out.getvalue())), 5)
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+
+from agents.models import Agent
+from leads.bulk import bulk_delete
+from leads.downloads import parse_range
+from leads.models import FollowUp, FollowUpUpload, Lead, User
+from leads.tests.test_thumbnails import make_picture
+from leads.thumbnails import THUMBNAIL_SIZES, thumbnail_name
+from leads.uploads import UploadError, start_upload, write_chunk
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class FollowUpFileTestCase(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        settings_override = override_settings(MEDIA_ROOT=os.path.join(tmp_dir, 'media'),
+                                              CHUNKED_UPLOAD_DIR=os.path.join(tmp_dir, 'uploads'),
+                                              CHUNKED_UPLOAD_MAX_CHUNK_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.lead = Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile)
+        self.followup = FollowUp.objects.create(lead=self.lead, notes='Called')
+        self.client.force_login(self.organizer)
+
+
+class ChunkedUploadTest(FollowUpFileTestCase):
+    data = os.urandom(2500)
+
+    def start(self, **kwargs):
+        response = self.client.post(
+            reverse('leads:followup-upload-create', kwargs={'pk': self.followup.pk}),
+            dict({'filename': 'recording.mp3', 'size': len(self.data), 'checksum': sha256(self.data)}, **kwargs),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def put(self, url, offset, chunk, checksum=None):
+        return self.client.put(url, chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+                               HTTP_UPLOAD_CHECKSUM=checksum or sha256(chunk))
+
+    def test_chunks_are_assembled_into_the_followup_file(self):
+        url = self.start()
+        for offset in range(0, len(self.data), 1000):
+            response = self.put(url, offset, self.data[offset:offset + 1000])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['offset'], len(self.data))
+        self.followup.refresh_from_db()
+        with self.followup.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertTrue(self.followup.file.name.endswith('recording.mp3'))
+        self.assertFalse(FollowUpUpload.objects.exists())
+
+    def test_upload_resumes_after_a_bad_chunk(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.data[:1000]).status_code, 200)
+        response = self.put(url, 1000, self.data[1000:2000], checksum=sha256(b'corrupted'))
+        self.assertEqual(response.status_code, 400)
+        response = self.put(url, 2000, self.data[2000:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(self.client.get(url).json()['offset'], 1000)
+        self.put(url, 1000, self.data[1000:2000])
+        self.put(url, 2000, self.data[2000:])
+        self.followup.refresh_from_db()
+        with self.followup.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_chunks_are_received_outside_of_any_transaction(self):
+        upload = start_upload(self.followup, self.organizer, 'recording.mp3', len(self.data))
+        savepoint_ids = len(connection.savepoint_ids)
+        test = self
+
+        class Stream(BytesIO):
+            def read(self, size=-1):
+                test.assertEqual(len(connection.savepoint_ids), savepoint_ids)
+                # Another request sends the same chunk meanwhile.
+                FollowUpUpload.objects.filter(pk=upload.pk).update(offset=1000)
+                return super(Stream, self).read(size)
+
+        with self.assertRaises(UploadError) as context:
+            write_chunk(upload.pk, Stream(self.data[:1000]), 0, 1000, sha256(self.data[:1000]))
+        self.assertEqual(context.exception.status, 409)
+        self.assertEqual(os.path.getsize(upload.part_path), 0)
+
+    def test_oversized_chunks_and_foreign_followups_are_refused(self):
+        url = self.start()
+        self.assertEqual(self.put(url, 0, self.data[:2000]).status_code, 413)
+        other = User.objects.create_user('other', password='test')
+        self.client.force_login(other)
+        self.assertEqual(self.put(url, 0, self.data[:1000]).status_code, 404)
+        response = self.client.post(reverse('leads:followup-upload-create', kwargs={'pk': self.followup.pk}),
+                                    {'filename': 'x', 'size': 1}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class FollowUpDownloadTest(FollowUpFileTestCase):
+    def setUp(self):
+        super(FollowUpDownloadTest, self).setUp()
+        self.data = bytes(range(256)) * 4
+        self.followup.file.save('contract.pdf', ContentFile(self.data))
+        self.url = reverse('leads:followup-file', kwargs={'pk': self.followup.pk})
+
+    def test_streams_the_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('contract.pdf', response['Content-Disposition'])
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-', 100), (50, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range(None, 100))
+
+    @override_settings(SENDFILE_BACKEND='nginx', SENDFILE_NGINX_PREFIX='/protected/')
+    def test_offloads_to_the_web_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.followup.file.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_only_the_assigned_agent_can_download(self):
+        user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        agent = Agent.objects.create(user=user, organization=self.organizer.userprofile)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.lead.agent = agent
+        self.lead.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+class BulkDeleteFilesTest(FollowUpFileTestCase):
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_files_of_deleted_leads_are_removed_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lead.profile_picture = make_picture()
+            self.lead.save()
+        self.followup.file.save('notes.txt', ContentFile(b'Called'))
+        upload = start_upload(self.followup, self.organizer, 'recording.mp3', 100)
+        paths = [upload.part_path, self.followup.file.path, self.lead.profile_picture.path] + [
+            default_storage.path(thumbnail_name(self.lead.profile_picture.name, size)) for size in THUMBNAIL_SIZES
+        ]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            bulk_delete(Lead.objects.filter(pk=self.lead.pk))
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
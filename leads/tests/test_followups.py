@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from agents.models import Agent
+from leads.models import FollowUp, Lead, User
+
+
+class FollowUpSummaryTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.lead = Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile)
+        self.client.force_login(self.organizer)
+
+    def test_views_keep_the_summary_up_to_date(self):
+        self.client.post(reverse('leads:lead-followup-create', kwargs={'pk': self.lead.pk}), {'notes': 'Called'})
+        self.client.post(reverse('leads:lead-followup-create', kwargs={'pk': self.lead.pk}), {'notes': 'Emailed'})
+        first, last = FollowUp.objects.order_by('date_added')
+        self.lead.refresh_from_db()
+        self.assertEqual(self.lead.followup_count, 2)
+        self.assertEqual(self.lead.last_followup_at, last.date_added)
+
+        self.client.post(reverse('leads:lead-followup-update', kwargs={'pk': first.pk}), {'notes': 'Called twice'})
+        self.client.post(reverse('leads:lead-followup-delete', kwargs={'pk': last.pk}))
+        self.lead.refresh_from_db()
+        self.assertEqual(self.lead.followup_count, 1)
+        self.assertEqual(self.lead.last_followup_at, first.date_added)
+
+        self.client.post(reverse('leads:lead-followup-delete', kwargs={'pk': first.pk}))
+        self.lead.refresh_from_db()
+        self.assertEqual(self.lead.followup_count, 0)
+        self.assertIsNone(self.lead.last_followup_at)
+
+    def test_followups_are_only_added_to_the_leads_of_the_user(self):
+        url = reverse('leads:lead-followup-create', kwargs={'pk': self.lead.pk})
+        user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        Agent.objects.create(user=user, organization=self.organizer.userprofile)
+        other = User.objects.create_user('other', password='test')
+        for intruder in (user, other):
+            self.client.force_login(intruder)
+            self.assertEqual(self.client.get(url).status_code, 404)
+            self.assertEqual(self.client.post(url, {'notes': 'Called'}).status_code, 404)
+        self.client.force_login(self.organizer)
+        self.assertEqual(self.client.get(reverse('leads:lead-followup-create', kwargs={'pk': 0})).status_code, 404)
+        self.assertFalse(FollowUp.objects.exists())
+
+    def test_saving_an_outdated_lead_keeps_the_summary(self):
+        FollowUp.objects.create(lead=Lead.objects.get(pk=self.lead.pk), notes='Called')
+        self.lead.description = 'Interested'
+        self.lead.save()
+        self.lead.refresh_from_db()
+        self.assertEqual(self.lead.followup_count, 1)
+        self.assertEqual(self.lead.description, 'Interested')
+
+    def test_stale_leads(self):
+        old = date.today() - timedelta(days=30)
+        contacted = Lead.objects.create(first_name='Jane', organization=self.organizer.userprofile)
+        forgotten = Lead.objects.create(first_name='Jim', organization=self.organizer.userprofile)
+        never_contacted = Lead.objects.create(first_name='Joe', organization=self.organizer.userprofile)
+        Lead.objects.update(date_added=old)
+        FollowUp.objects.create(lead=contacted, notes='Called')
+        FollowUp.objects.create(lead=forgotten, notes='Called')
+        FollowUp.objects.filter(lead=forgotten).update(date_added=timezone.now() - timedelta(days=20))
+        Lead.objects.filter(pk=forgotten.pk).update_followup_summary()
+        self.assertEqual(set(Lead.objects.get_stale(14)), {forgotten, never_contacted, self.lead})
+        self.assertEqual(set(Lead.objects.get_stale(25)), {never_contacted, self.lead})
+
+        user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        agent = Agent.objects.create(user=user, organization=self.organizer.userprofile)
+        Lead.objects.filter(pk__in=[contacted.pk, forgotten.pk]).update(agent=agent)
+        response = self.client.get(reverse('leads:lead-list'), {'not_contacted_days': 14, 'sort': '-followup_count'})
+        self.assertEqual(list(response.context['leads']), [forgotten])
+
+    def test_backfill_command(self):
+        FollowUp.objects.create(lead=self.lead, notes='Called')
+        FollowUp.objects.create(lead=self.lead, notes='Emailed')
+        other = Lead.objects.create(first_name='Jane', organization=self.organizer.userprofile)
+        Lead.objects.update(followup_count=7, last_followup_at=None)
+        call_command('backfill_followup_summary', batch_size=1, stdout=StringIO())
+        self.lead.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.lead.followup_count, 2)
+        self.assertEqual(self.lead.last_followup_at, self.lead.followups.latest('date_added').date_added)
+        self.assertEqual((other.followup_count, other.last_followup_at), (0, None))
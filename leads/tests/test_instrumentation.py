@@ -0,0 +1,75 @@
+import json
+import tempfile
+
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+
+from django_crm.instrumentation import (
+    MetricsRegistry, RequestMetrics, install_query_recorder, record_query, render_metrics
+)
+from leads.models import Lead, User
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile)
+        self.client.force_login(self.organizer)
+
+    def test_responses_carry_their_sql_and_template_time(self):
+        response = self.client.get(reverse('leads:lead-list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^sql;dur=[\d.]+;desc="[1-9]\d* queries", templates;dur=[\d.]+, total;dur=[\d.]+$')
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('leads:lead-list')))
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_QUERY_MS=0)
+    def test_slow_requests_and_queries_are_logged_with_their_view(self):
+        with self.assertLogs('django_crm.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('leads:lead-list'))
+        self.assertTrue(any(line.startswith('WARNING:django_crm.instrumentation:Slow query in LeadListView')
+                            for line in logs.output))
+        self.assertIn('Slow request GET /leads/ in LeadListView', logs.output[-1])
+
+    def test_metrics_are_served_to_internal_ips_or_with_the_token(self):
+        self.client.get(reverse('leads:lead-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(INTERNAL_IPS=['127.0.0.1']):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('crm_request_duration_seconds_bucket{view="LeadListView",le="+Inf"}', content)
+        self.assertIn('crm_responses_total{status="200",view="LeadListView"}', content)
+
+        with override_settings(METRICS_TOKEN='secret', INTERNAL_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_recorder_installed_inside_an_execute_wrapper_outlives_it(self):
+        def wrapper(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        connection.execute_wrappers.remove(record_query)
+        with connection.execute_wrapper(wrapper):
+            # As the connection_created receiver does for a connection opened in the block.
+            install_query_recorder(connection)
+        self.assertEqual(connection.execute_wrappers, [record_query])
+
+    def test_metrics_of_all_processes_are_added_up(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, override_settings(METRICS_DIR=metrics_dir):
+            metrics = RequestMetrics(None)
+            metrics.queries = 3
+            this_process, other_process = MetricsRegistry(), MetricsRegistry()
+            this_process.observe_request('DashboardView', 200, 0.2, metrics)
+            other_process.observe_request('DashboardView', 200, 0.05, metrics)
+            with open(f'{metrics_dir}/other-1.json', 'w') as f:
+                json.dump(other_process.snapshot(), f)
+            histograms, counters = this_process.collect()
+        self.assertEqual(histograms[('crm_request_sql_queries', 'DashboardView')][-1], 6)
+        content = render_metrics(histograms, counters)
+        self.assertIn('crm_request_duration_seconds_bucket{view="DashboardView",le="0.1"} 1', content)
+        self.assertIn('crm_request_duration_seconds_bucket{view="DashboardView",le="0.25"} 2', content)
+        self.assertIn('crm_request_duration_seconds_count{view="DashboardView"} 2', content)
+        self.assertIn('crm_responses_total{status="200",view="DashboardView"} 2', content)
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+
+from django.shortcuts import reverse
+from django.test import TestCase
+
+from leads.metrics import get_dashboard_metrics, reconcile_organization_metrics
+from leads.models import Category, Lead, OrganizationMetrics, User
+
+
+class DashboardMetricsTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.organization = self.organizer.userprofile
+        self.converted = Category.objects.create(name='Converted', organization=self.organization)
+        self.contacted = Category.objects.create(name='Contacted', organization=self.organization)
+        self.old_lead = self.create_lead(category=self.converted)
+        Lead.objects.filter(pk=self.old_lead.pk).update(date_added=date.today() - timedelta(days=60))
+
+    def create_lead(self, **kwargs):
+        return Lead.objects.create(first_name='John', last_name='Doe', organization=self.organization, **kwargs)
+
+    def assertMetricsMatchLeadTable(self):
+        maintained = get_dashboard_metrics(self.organization)
+        reconcile_organization_metrics(self.organization)
+        self.assertEqual(maintained, get_dashboard_metrics(self.organization))
+        return maintained
+
+    def test_metrics_are_maintained_incrementally(self):
+        self.assertEqual(get_dashboard_metrics(self.organization), {
+            'total_lead_count': 1, 'total_new_leads': 0, 'total_converted_new_leads': 0
+        })
+        lead = self.create_lead(category=self.contacted)
+        self.create_lead(category=self.converted)
+        lead.category = self.converted
+        lead.save()
+        self.assertEqual(self.assertMetricsMatchLeadTable(), {
+            'total_lead_count': 3, 'total_new_leads': 2, 'total_converted_new_leads': 2
+        })
+
+        lead.delete()
+        self.assertEqual(self.assertMetricsMatchLeadTable()['total_converted_new_leads'], 1)
+
+    def test_category_changes_invalidate_metrics(self):
+        self.create_lead(category=self.contacted)
+        get_dashboard_metrics(self.organization)
+        self.contacted.name = 'Converted'
+        self.contacted.save()
+        self.assertFalse(OrganizationMetrics.objects.filter(organization=self.organization).exists())
+        self.assertEqual(get_dashboard_metrics(self.organization)['total_converted_new_leads'], 1)
+
+    def test_dashboard_reads_the_metrics_store(self):
+        get_dashboard_metrics(self.organization)
+        self.client.force_login(self.organizer)
+        # The user with its profile and the two metrics tables, the session comes from the cache.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_lead_count'], 1)
+
+    def test_deleting_the_organization(self):
+        self.create_lead(category=self.converted)
+        get_dashboard_metrics(self.organization)
+        self.organizer.delete()
+        self.assertFalse(OrganizationMetrics.objects.exists())
@@ -0,0 +1,71 @@
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from agents.models import Agent
+from leads.models import Category, FollowUp, Lead, User
+
+
+@override_settings(SHARED_CACHE=True)
+class QueryBudgetTestCase(TestCase):
+    """
+    Render a page with a small and a larger dataset and check that both cost the same, fixed number of queries.
+    """
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.organization = self.organizer.userprofile
+        self.client.force_login(self.organizer)
+        # Load the user into the cache of the authentication backend, as it is after the first page view.
+        self.client.get(reverse('landing-page'))
+        self.rows = 0
+
+    def add_rows(self, count):
+        for i in range(self.rows, self.rows + count):
+            user = User.objects.create_user(f'agent{i}', email=f'agent{i}@test.com', is_organizer=False, is_agent=True)
+            agent = Agent.objects.create(user=user, organization=self.organization)
+            category = Category.objects.create(name=f'Category {i}', organization=self.organization)
+            for assigned_agent in (agent, None):
+                lead = Lead.objects.create(first_name='John', last_name=f'Doe{i}', email=f'john{i}@test.com',
+                                           organization=self.organization, agent=assigned_agent, category=category)
+                FollowUp.objects.create(lead=lead, notes=f'Called {i}')
+        self.rows += count
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertQueryBudget(self, get_url, budget):
+        self.add_rows(1)
+        small = self.count_queries(get_url())
+        self.add_rows(9)
+        large = self.count_queries(get_url())
+        self.assertEqual(small, large, 'The number of queries grows with the number of rows')
+        self.assertLessEqual(large, budget)
+
+
+class LeadQueryBudgetTest(QueryBudgetTestCase):
+    def test_lead_list(self):
+        self.assertQueryBudget(lambda: reverse('leads:lead-list'), 10)
+
+    def test_lead_detail(self):
+        self.add_rows(1)
+        lead = Lead.objects.first()
+        for i in range(10):
+            FollowUp.objects.create(lead=lead, notes=f'Note {i}')
+        with self.assertNumQueries(2):
+            self.client.get(reverse('leads:lead-detail', kwargs={'pk': lead.pk}))
+
+    def test_category_list(self):
+        self.assertQueryBudget(lambda: reverse('leads:category-list'), 2)
+
+    def test_category_detail(self):
+        self.add_rows(1)
+        category = Category.objects.first()
+        for i in range(10):
+            Lead.objects.create(first_name='Jane', last_name=f'Roe{i}', organization=self.organization,
+                                category=category)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('leads:category-detail', kwargs={'pk': category.pk}))
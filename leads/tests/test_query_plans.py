@@ -0,0 +1,99 @@
+import re
+from datetime import date, timedelta
+
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from agents.models import Agent
+from leads.models import Category, FollowUp, Lead, User
+
+TABLES = ('leads_lead', 'leads_category')
+
+
+class QueryPlanTest(TestCase):
+    """
+    Seed several organizations and check that the lead and category queries of every view use an index.
+    """
+    organizations = 5
+    leads_per_organization = 400
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        for i in range(cls.organizations):
+            organizer = User.objects.create_user(f'organizer{i}', password='test')
+            organization = organizer.userprofile
+            user = User.objects.create_user(f'agent{i}', password='test', is_organizer=False, is_agent=True)
+            agent = Agent.objects.create(user=user, organization=organization)
+            categories = [Category.objects.create(name=name, organization=organization)
+                          for name in ('Contacted', 'Converted', 'Unconverted')]
+            Lead.objects.bulk_create([
+                Lead(first_name='John', last_name=f'Doe{j}', email=f'john{j}@test.com', organization=organization,
+                     agent=agent if j % 3 else None, category=categories[j % 4] if j % 4 < 3 else None)
+                for j in range(cls.leads_per_organization)
+            ])
+            Lead.objects.filter(organization=organization).update(date_added=today - timedelta(days=i))
+        cls.organizer = User.objects.get(username='organizer0')
+        cls.agent = User.objects.get(username='agent0')
+        cls.lead = Lead.objects.filter(organization=cls.organizer.userprofile).first()
+        FollowUp.objects.create(lead=cls.lead, notes='Called')
+        cls.category = Category.objects.filter(organization=cls.organizer.userprofile).first()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def is_full_scan(self, line, table):
+        if connection.vendor == 'sqlite':
+            return re.match(rf'SCAN (TABLE )?{table}\b(?!.* USING)', line.strip()) is not None
+        return f'Seq Scan on {table}' in line
+
+    def assertIndexScans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(table in sql for table in TABLES):
+                continue
+            plan = self.explain(sql)
+            for table in TABLES:
+                self.assertFalse(
+                    any(self.is_full_scan(line, table) for line in plan),
+                    f'Full scan of {table} in {url}:\n{sql}\n' + '\n'.join(plan)
+                )
+
+    def test_organizer_views(self):
+        self.client.force_login(self.organizer)
+        for url in (
+            reverse('dashboard'),
+            reverse('leads:lead-list'),
+            reverse('leads:lead-list') + '?sort=last_name',
+            reverse('leads:lead-list') + '?sort=-followup_count',
+            reverse('leads:lead-list') + '?not_contacted_days=14',
+            reverse('leads:lead-detail', kwargs={'pk': self.lead.pk}),
+            reverse('leads:category-list'),
+            reverse('leads:category-detail', kwargs={'pk': self.category.pk}),
+            reverse('leads:lead-json'),
+            reverse('leads:lead-search') + '?q=doe1',
+        ):
+            with self.subTest(url=url):
+                self.assertIndexScans(url)
+
+    def test_agent_views(self):
+        self.client.force_login(self.agent)
+        for url in (
+            reverse('leads:lead-list'),
+            reverse('leads:category-list'),
+            reverse('leads:lead-json'),
+        ):
+            with self.subTest(url=url):
+                self.assertIndexScans(url)
@@ -0,0 +1,87 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.shortcuts import reverse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from django_crm.replicas import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter, read_from_replicas
+from leads.models import Lead, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+        @read_from_replicas
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Lead))
+        self.view = view
+
+    def test_read_only_views_read_from_replicas(self):
+        self.assertEqual(self.view(RequestFactory().get('/')).content, b'replica1')
+        self.assertEqual(self.router.db_for_read(Lead), 'default')
+
+    def test_writes_and_pinned_browsers_stay_on_the_primary(self):
+        self.assertEqual(self.view(RequestFactory().post('/')).content, b'default')
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.view(request).content, b'default')
+        self.assertEqual(self.router.db_for_write(Lead), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'leads'))
+
+    def test_writing_requests_pin_the_browser(self):
+        middleware = ReplicaPinMiddleware(lambda request: HttpResponse())
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertNotIn(PIN_COOKIE, middleware(RequestFactory().get('/')).cookies)
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertNotIn(PIN_COOKIE, middleware(RequestFactory().post('/')).cookies)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Set DATABASE_REPLICA_URLS to test against a replica')
+class ReplicaQueriesTest(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.lead = Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile)
+        self.client.force_login(self.organizer)
+        self.replica = connections[settings.DATABASE_REPLICAS[0]]
+
+    def test_pages_read_from_the_replica_until_the_browser_writes(self):
+        with override_settings(DATABASE_REPLICAS=[self.replica.alias]):
+            with CaptureQueriesContext(self.replica) as queries:
+                self.client.get(reverse('leads:lead-detail', kwargs={'pk': self.lead.pk}))
+            self.assertTrue(queries)
+
+            with CaptureQueriesContext(self.replica) as queries:
+                self.client.post(reverse('leads:lead-followup-create', kwargs={'pk': self.lead.pk}),
+                                 {'notes': 'Called'})
+                self.client.get(reverse('leads:lead-detail', kwargs={'pk': self.lead.pk}))
+            self.assertFalse(queries)
+
+
+# The primary plays a lagging replica, see lagging_replica().
+@override_settings(DATABASE_REPLICAS=[])
+class LaggingReplicaTest(TransactionTestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        for name in ('John', 'Jane'):
+            Lead.objects.create(first_name=name, last_name='Doe', organization=self.organizer.userprofile)
+        self.client.force_login(self.organizer)
+
+    def test_dashboard_reconciling_the_metrics_does_not_read_them_back_from_a_replica(self):
+        def lagging_replica(execute, sql, params, many, context):
+            # Like ReplicaRouter, reads outside a transaction go to a replica, which has no metrics yet.
+            if not connection.in_atomic_block and sql.startswith('SELECT') and 'metrics' in sql:
+                sql = sql.replace(' WHERE ', ' WHERE 1 = 0 AND ', 1)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(lagging_replica):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_lead_count'], 2)
+        self.assertEqual(response.context['total_new_leads'], 2)
@@ -0,0 +1,92 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.shortcuts import reverse
+from django.test import TestCase
+
+from agents.models import Agent
+from leads.models import FollowUp, Lead, User
+from leads.search import InvertedIndex, search_leads
+
+
+class InvertedIndexTest(TestCase):
+    def test_terms_must_all_match_and_prefix_applies_to_the_last_one(self):
+        index = InvertedIndex()
+        index.add(1, 'A', 'John Doe')
+        index.add(2, 'A', 'Johnny Doe')
+        index.add(2, 'D', 'called back')
+        index.freeze()
+        self.assertEqual(set(index.search(['john', 'doe'])), {1})
+        self.assertEqual(set(index.search(['doe', 'joh'], prefix=True)), {1, 2})
+        self.assertEqual(set(index.search(['called', 'd'], prefix=True)), {2})
+        self.assertEqual(index.search(['jane']), {})
+
+
+class LeadSearchTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.organization = self.organizer.userprofile
+        self.client.force_login(self.organizer)
+        self.smith = self.create_lead('Anna', 'Smith', description='Wants a quote for windows')
+        self.jones = self.create_lead('Bob', 'Jones', description='Asked about Smith and Sons')
+        other = User.objects.create_user('other').userprofile
+        Lead.objects.create(first_name='Carl', last_name='Smith', organization=other)
+
+    def create_lead(self, first_name, last_name, **kwargs):
+        return Lead.objects.create(first_name=first_name, last_name=last_name, organization=self.organization,
+                                   email=f'{first_name.lower()}@test.com', **kwargs)
+
+    def search(self, query, **kwargs):
+        return search_leads(Lead.objects.all(), self.organization, query, **kwargs)
+
+    def test_results_are_ranked_and_scoped_to_the_organization(self):
+        self.assertEqual(self.search('smith'), [self.smith, self.jones])
+        self.assertEqual(self.search('smith sons'), [self.jones])
+        self.assertEqual(self.search(''), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'The search vector needs PostgreSQL')
+    def test_emails_and_phone_numbers_match_on_postgresql(self):
+        lead = self.create_lead('Kek', 'Lol', phone_number='+7 999 123-45-67')
+        self.assertEqual(self.search('kek@test.com'), [lead])
+        self.assertEqual(self.search('+7 999 123-45-67'), [lead])
+        self.assertEqual(self.search('lol kek@test.com', prefix=True), [lead])
+        self.assertEqual(self.search('999 123-45', prefix=True), [lead])
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.search('invoice'), [])
+        FollowUp.objects.create(lead=self.jones, notes='Sent the invoice')
+        self.assertEqual(self.search('invoice'), [self.jones])
+
+        self.smith.last_name = 'Brown'
+        self.smith.save()
+        self.assertEqual(self.search('smith'), [self.jones])
+        self.jones.delete()
+        self.assertEqual(self.search('smith'), [])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('leads:lead-search'), {'q': 'windows'})
+        self.assertEqual(list(response.context['leads']), [self.smith])
+
+    def test_search_view_is_limited_to_the_leads_of_an_agent(self):
+        user = User.objects.create_user('agent', password='test', is_organizer=False, is_agent=True)
+        agent = Agent.objects.create(user=user, organization=self.organization)
+        self.jones.agent = agent
+        self.jones.save()
+        self.client.force_login(user)
+        response = self.client.get(reverse('leads:lead-search'), {'q': 'smith'})
+        self.assertEqual(list(response.context['leads']), [self.jones])
+
+    def test_typeahead(self):
+        response = self.client.get(reverse('leads:lead-typeahead'), {'q': 'ann'})
+        self.assertEqual(response.json()['results'], [{
+            'id': self.smith.pk,
+            'name': 'Anna Smith',
+            'email': 'anna@test.com',
+            'url': reverse('leads:lead-detail', kwargs={'pk': self.smith.pk}),
+        }])
+
+    def test_rebuild_search_index_command(self):
+        out = call_command('rebuild_search_index', stdout=StringIO())
+        self.assertIn('3 leads', out)
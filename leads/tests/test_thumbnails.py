@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from leads.models import Lead, User
+from leads.thumbnails import THUMBNAIL_SIZES, get_thumbnail_url, thumbnail_name
+
+
+def make_picture(name='photo.png', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ThumbnailTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.organizer = User.objects.create_user('organizer', password='test')
+
+    def create_lead(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile,
+                                       profile_picture=make_picture())
+
+    def test_variants_are_generated_on_upload(self):
+        lead = self.create_lead()
+        for size, pixels in THUMBNAIL_SIZES.items():
+            with default_storage.open(thumbnail_name(lead.profile_picture.name, size)) as f:
+                image = Image.open(f)
+                self.assertEqual(image.format, 'JPEG')
+                self.assertEqual(max(image.size), pixels)
+
+    def test_pages_use_the_small_variant(self):
+        lead = self.create_lead()
+        self.client.force_login(self.organizer)
+        response = self.client.get(reverse('leads:lead-detail', kwargs={'pk': lead.pk}))
+        self.assertContains(response, default_storage.url(thumbnail_name(lead.profile_picture.name, 'small')))
+
+    def test_urls_come_from_the_lead_without_looking_up_the_storage(self):
+        lead = self.create_lead()
+        lead.refresh_from_db()
+        self.assertTrue(lead.has_thumbnails)
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            self.assertEqual(get_thumbnail_url(lead.profile_picture, 'small'),
+                             default_storage.url(thumbnail_name(lead.profile_picture.name, 'small')))
+        exists.assert_not_called()
+
+        # Until the new variants are generated, the new picture is shown as it is.
+        lead.profile_picture = make_picture('other.png', (300, 300))
+        lead.save()
+        lead.refresh_from_db()
+        self.assertEqual(get_thumbnail_url(lead.profile_picture, 'small'), lead.profile_picture.url)
+
+    def test_replacing_the_picture_replaces_the_variants(self):
+        lead = self.create_lead()
+        old_name = lead.profile_picture.name
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.profile_picture = make_picture('other.png', (300, 300))
+            lead.save()
+        self.assertFalse(default_storage.exists(thumbnail_name(old_name, 'small')))
+        self.assertTrue(default_storage.exists(thumbnail_name(lead.profile_picture.name, 'small')))
+
+    def test_command_fills_in_missing_variants(self):
+        lead = Lead.objects.create(first_name='John', last_name='Doe', organization=self.organizer.userprofile,
+                                   profile_picture=make_picture())
+        self.assertFalse(default_storage.exists(thumbnail_name(lead.profile_picture.name, 'small')))
+        out = call_command('generate_thumbnails', stdout=StringIO())
+        self.assertIn('1 pictures', out)
+        self.assertTrue(default_storage.exists(thumbnail_name(lead.profile_picture.name, 'medium')))
+        self.assertTrue(Lead.objects.get(pk=lead.pk).has_thumbnails)
@@ -1,6 +1,11 @@
 from django.test import TestCase
 from django.shortcuts import reverse
 
+from agents.models import Agent
+from leads.metrics import get_dashboard_metrics, reconcile_organization_metrics
+from leads.models import Category, Lead, User
+from leads.views import LeadListView
+
 # Create your tests here.
 
 
@@ -9,3 +14,86 @@ class LandingPageTest(TestCase):
         response = self.client.get(reverse('landing-page'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'landing.html')
+
+
+class LeadListViewTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        organization = self.organizer.userprofile
+        agent_user = User.objects.create_user('agent', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=agent_user, organization=organization)
+        self.category = Category.objects.create(name='Contacted', organization=organization)
+        for i in range(7):
+            Lead.objects.create(first_name=f'John{i}', last_name='Doe', age=20 + i, organization=organization,
+                                agent=self.agent, category=self.category if i % 2 else None)
+        self.client.force_login(self.organizer)
+
+    def test_pages_are_linked_with_cursors(self):
+        page_size = LeadListView.page_size
+        LeadListView.page_size = 3
+        self.addCleanup(setattr, LeadListView, 'page_size', page_size)
+        names = []
+        url = reverse('leads:lead-list') + '?sort=age'
+        while url:
+            response = self.client.get(url)
+            names += [lead.first_name for lead in response.context['leads']]
+            url = response.context['next_page_link'] and reverse('leads:lead-list') + response.context['next_page_link']
+        self.assertEqual(names, [f'John{i}' for i in range(7)])
+
+        response = self.client.get(reverse('leads:lead-list') + response.context['previous_page_link'])
+        self.assertEqual([lead.first_name for lead in response.context['leads']], ['John3', 'John4', 'John5'])
+
+    def test_filters(self):
+        response = self.client.get(reverse('leads:lead-list'), {
+            'category': self.category.pk, 'age_min': 22, 'age_max': 25, 'sort': '-age'
+        })
+        self.assertEqual([lead.first_name for lead in response.context['leads']], ['John5', 'John3'])
+
+
+class LeadBulkActionViewTest(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('organizer', password='test')
+        self.organization = self.organizer.userprofile
+        agent_user = User.objects.create_user('agent', is_organizer=False, is_agent=True)
+        self.agent = Agent.objects.create(user=agent_user, organization=self.organization)
+        self.converted = Category.objects.create(name='Converted', organization=self.organization)
+        self.leads = [
+            Lead.objects.create(first_name=f'John{i}', last_name='Doe', age=20 + i, organization=self.organization)
+            for i in range(4)
+        ]
+        other = User.objects.create_user('other', password='test')
+        self.other_lead = Lead.objects.create(first_name='Jane', last_name='Roe', organization=other.userprofile)
+        self.client.force_login(self.organizer)
+
+    def post(self, leads=(), **data):
+        data = {f'bulk-{key}': value for key, value in data.items()}
+        data['leads'] = [lead.pk for lead in leads]
+        return self.client.post(reverse('leads:lead-bulk-action'), data)
+
+    def test_assigns_selected_leads_of_the_organization(self):
+        self.post(self.leads[:2] + [self.other_lead], action='assign', agent=self.agent.pk)
+        self.assertEqual(Lead.objects.filter(agent=self.agent).count(), 2)
+        self.assertIsNone(Lead.objects.get(pk=self.other_lead.pk).agent)
+
+    def test_categorizes_every_lead_matching_the_filters(self):
+        Lead.objects.filter(organization=self.organization).update(agent=self.agent)
+        Lead.objects.filter(pk=self.leads[3].pk).update(category=self.converted, converted_date='2020-01-01T00:00Z')
+        get_dashboard_metrics(self.organization)
+        data = {f'bulk-{key}': value for key, value in {
+            'action': 'categorize', 'category': self.converted.pk, 'select_all': 'on'
+        }.items()}
+        data['age_min'] = 22
+        self.client.post(reverse('leads:lead-bulk-action'), data)
+        converted = Lead.objects.filter(category=self.converted).order_by('age')
+        self.assertEqual([lead.age for lead in converted], [22, 23])
+        self.assertNotEqual(converted[0].converted_date.year, 2020)
+        self.assertEqual(converted[1].converted_date.year, 2020)
+
+        metrics = get_dashboard_metrics(self.organization)
+        reconcile_organization_metrics(self.organization)
+        self.assertEqual(metrics, get_dashboard_metrics(self.organization))
+
+    def test_deletes_selected_leads(self):
+        response = self.post(self.leads[:3], action='delete')
+        self.assertRedirects(response, reverse('leads:lead-list'))
+        self.assertEqual(Lead.objects.filter(organization=self.organization).count(), 1)
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from django_crm.cache import bump_organization_version
+from .models import Lead
+
+logger = logging.getLogger(__name__)
+
+# Longest side of each variant, in pixels. Avatars are displayed at 40px, twice that covers high density screens.
+THUMBNAIL_SIZES = {
+    'small': 80,
+    'medium': 240,
+}
+THUMBNAIL_QUALITY = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_name(name, size):
+    stem = os.path.splitext(name)[0]
+    return f'thumbnails/{size}/{stem}.jpg'
+
+
+def make_thumbnail(name, size, storage=default_storage):
+    """
+    Write the ``size`` variant of the image stored as ``name``: oriented, shrunk and recompressed as a JPEG.
+    """
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((THUMBNAIL_SIZES[size], THUMBNAIL_SIZES[size]), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    target = thumbnail_name(name, size)
+    if storage.exists(target):
+        storage.delete(target)
+    return storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def record_thumbnails(name):
+    """
+    Flag the leads whose profile picture is stored as ``name`` as having their thumbnails.
+    """
+    leads = Lead.objects.filter(profile_picture=name, has_thumbnails=False)
+    organization_ids = set(leads.values_list('organization', flat=True))
+    leads.update(has_thumbnails=True)
+    # Queryset updates send no signal, so the cached pages showing the original picture are invalidated here.
+    for organization_id in organization_ids:
+        bump_organization_version(organization_id)
+
+
+def make_thumbnails(name, storage=default_storage):
+    """
+    Write every variant of the image stored as ``name``, return whether they all could be.
+    """
+    made = True
+    for size in THUMBNAIL_SIZES:
+        try:
+            make_thumbnail(name, size, storage=storage)
+        except (OSError, ValueError):
+            logger.exception('Could not create the %s thumbnail of %s', size, name)
+            made = False
+    return made
+
+
+def generate_thumbnails(name, storage=default_storage):
+    if make_thumbnails(name, storage=storage):
+        record_thumbnails(name)
+
+
+def generate_thumbnails_in_worker(name):
+    try:
+        generate_thumbnails(name)
+    finally:
+        # The workers outlive requests, whose end closes the connections of the threads serving them.
+        connection.close()
+
+
+def delete_thumbnails(name, storage=default_storage):
+    for size in THUMBNAIL_SIZES:
+        target = thumbnail_name(name, size)
+        if storage.exists(target):
+            storage.delete(target)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS,
+                                           thread_name_prefix='thumbnails')
+        return _executor
+
+
+def schedule_thumbnails(name):
+    """
+    Generate the thumbnails of an uploaded image in the worker pool once the current transaction commits.
+
+    With ``THUMBNAIL_WORKERS = 0`` they are generated right away, which is what tests and scripts want.
+    """
+    if settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(generate_thumbnails_in_worker, name))
+    else:
+        transaction.on_commit(lambda: generate_thumbnails(name))
+
+
+def get_thumbnail_url(image, size):
+    """
+    Return the URL of the ``size`` variant of a lead profile picture, falling back to the original until the lead
+    has its thumbnails.
+
+    Lists call it for every row, so the storage is not asked whether the variant exists.
+    """
+    if not image:
+        return ''
+    if not getattr(image.instance, 'has_thumbnails', False):
+        return image.url
+    return image.storage.url(thumbnail_name(image.name, size))
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FollowUpUpload
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super(UploadError, self).__init__(message)
+        self.status = status
+
+
+class PartFile(File):
+    """
+    An assembled upload. ``FileSystemStorage`` moves files exposing ``temporary_file_path`` instead of copying them.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def hash_file(path, start=0, length=None):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            block = f.read(BLOCK_SIZE if remaining is None else min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def start_upload(followup, user, filename, size, checksum=''):
+    if size < 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise UploadError(f'The file must be at most {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes', status=413)
+    filename = os.path.basename(filename)
+    if not filename:
+        raise UploadError('The file name is missing')
+    upload = FollowUpUpload.objects.create(followup=followup, user=user, filename=filename, size=size,
+                                           checksum=checksum.lower())
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(upload.part_path, 'wb').close()
+    return upload
+
+
+def write_chunk(upload_id, stream, offset, length, checksum):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset`` of an upload, block by block.
+
+    The chunk is only accepted when ``offset`` is where the previous chunk ended and the SHA-256 of the bytes
+    received matches ``checksum``, otherwise the client resends it.
+
+    The chunk is received into a file of its own, outside any transaction: a slow client holds no lock nor database
+    connection. It is then appended to the part file in a short transaction claiming the offset with a conditional
+    ``UPDATE``, which only one of two requests sending the same range can win.
+    """
+    if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be at most {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes', status=413)
+    upload = FollowUpUpload.objects.get(pk=upload_id)
+    if offset != upload.offset:
+        raise UploadError(f'Expected the chunk at offset {upload.offset}', status=409)
+    if offset + length > upload.size:
+        raise UploadError('The chunk goes past the end of the file')
+
+    digest = hashlib.sha256()
+    received = 0
+    with tempfile.NamedTemporaryFile(dir=settings.CHUNKED_UPLOAD_DIR, prefix=f'{upload.pk}.', suffix='.chunk') as chunk:
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            chunk.write(block)
+            digest.update(block)
+            received += len(block)
+        if received != length or digest.hexdigest() != checksum.lower():
+            raise UploadError('The chunk is incomplete or does not match its checksum')
+
+        chunk.seek(0)
+        with transaction.atomic():
+            if not FollowUpUpload.objects.filter(pk=upload.pk, offset=offset).update(
+                    offset=offset + length, updated=timezone.now()):
+                raise UploadError('Another request has written this chunk', status=409)
+            # The row stays locked by the update until the chunk is appended.
+            with open(upload.part_path, 'r+b') as f:
+                f.seek(offset)
+                f.truncate()
+                shutil.copyfileobj(chunk, f, BLOCK_SIZE)
+    upload.offset = offset + length
+    return upload
+
+
+def complete_upload(upload):
+    """
+    Check the whole file and attach it to its follow-up.
+    """
+    if upload.offset != upload.size:
+        raise UploadError(f'Only {upload.offset} of {upload.size} bytes were received', status=409)
+    if upload.checksum and hash_file(upload.part_path) != upload.checksum:
+        abort_upload(upload)
+        raise UploadError('The file does not match its checksum')
+    followup = upload.followup
+    with open(upload.part_path, 'rb') as f:
+        followup.file.save(upload.filename, PartFile(f), save=True)
+    abort_upload(upload)
+    return followup
+
+
+def abort_upload(upload):
+    if os.path.exists(upload.part_path):
+        os.remove(upload.part_path)
+    upload.delete()
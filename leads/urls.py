@@ -1,18 +1,26 @@
+from django.conf import settings
 from django.urls import path
 
+from . import async_views, views
 from .views import (
-    LeadListView, LeadCreateView, LeadDetailView, LeadUpdateView, LeadDeleteView,
+    LeadCreateView, LeadUpdateView, LeadDeleteView,
     CategoryListView, CategoryDetailView, CategoryCreateView, CategoryUpdateView, CategoryDeleteView,
-    AssignAgentView, LeadCategoryUpdateView, LeadJsonView, FollowUpCreateView, FollowUpUpdateView,
-    FollowUpDeleteView
+    AssignAgentView, LeadCategoryUpdateView, FollowUpCreateView, FollowUpUpdateView,
+    FollowUpDeleteView, LeadBulkActionView, LeadSearchView, LeadTypeaheadView,
+    FollowUpFileView, FollowUpUploadCreateView, FollowUpUploadChunkView, LeadExportView
 )
 
 app_name = 'leads'
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', LeadListView.as_view(), name='lead-list'),
+    path('', read_views.LeadListView.as_view(), name='lead-list'),
     path('create/', LeadCreateView.as_view(), name='lead-create'),
-    path('<int:pk>', LeadDetailView.as_view(), name='lead-detail'),
+    path('bulk/', LeadBulkActionView.as_view(), name='lead-bulk-action'),
+    path('export/', LeadExportView.as_view(), name='lead-export'),
+    path('search/', LeadSearchView.as_view(), name='lead-search'),
+    path('search/typeahead/', LeadTypeaheadView.as_view(), name='lead-typeahead'),
+    path('<int:pk>', read_views.LeadDetailView.as_view(), name='lead-detail'),
     path('<int:pk>/update/', LeadUpdateView.as_view(), name='lead-update'),
     path('<int:pk>/delete/', LeadDeleteView.as_view(), name='lead-delete'),
     path('<int:pk>/assign-agent/', AssignAgentView.as_view(), name='assign-agent'),
@@ -25,5 +33,8 @@ urlpatterns = [
     path('<int:pk>/category/', LeadCategoryUpdateView.as_view(), name='lead-category-update'),
     path('followups/<int:pk>/update/', FollowUpUpdateView.as_view(), name='lead-followup-update'),
     path('followups/<int:pk>/delete/', FollowUpDeleteView.as_view(), name='lead-followup-delete'),
-    path('json/', LeadJsonView.as_view(), name='lead-json'),
+    path('followups/<int:pk>/file/', FollowUpFileView.as_view(), name='followup-file'),
+    path('followups/<int:pk>/uploads/', FollowUpUploadCreateView.as_view(), name='followup-upload-create'),
+    path('uploads/<uuid:pk>/', FollowUpUploadChunkView.as_view(), name='followup-upload-chunk'),
+    path('json/', read_views.LeadJsonView.as_view(), name='lead-json'),
 ]
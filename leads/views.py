@@ -1,23 +1,48 @@
-from datetime import datetime, timedelta
+import hashlib
+import json
+import tempfile
+from datetime import date, datetime
 
-from django.core.mail import send_mail
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views import generic
 from django.urls import reverse_lazy
-from django.shortcuts import reverse, redirect
-from django.http.response import JsonResponse
-
-from .models import Lead, Category, FollowUp
+from django.shortcuts import get_object_or_404, reverse, redirect
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.response import (
+    FileResponse, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+)
+from django.db import transaction
+from django.db.models import Count
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag, url_has_allowed_host_and_scheme
+
+from django_crm.cache import cache_per_organization
+from django_crm.replicas import read_from_replicas
+from .models import Lead, Category, FollowUp, FollowUpUpload
 from .forms import (
     LeadForm,
     CustomUserCreationForm,
     AssignAgentForm,
     LeadCategoryUpdateForm,
     CategoryForm,
-    FollowUpForm
+    FollowUpForm,
+    LeadFilterForm,
+    LeadBulkActionForm
 )
+from .assignment import LeadDistributor
+from .bulk import bulk_assign, bulk_categorize, bulk_delete
+from .downloads import serve_file
+from .exports import EXPORT_FORMATS, ExportError, get_export_rows, iter_csv, iter_gzip, write_xlsx
+from .metrics import get_dashboard_metrics
+from .pagination import paginate_keyset
+from .search import search_leads
+from .uploads import UploadError, abort_upload, complete_upload, start_upload, write_chunk
 from agents.mixins import OrganizerAndLoginRequiredMixin
+from notifications.outbox import enqueue_mail
 
 
 class SignUpView(generic.CreateView):
@@ -35,46 +60,176 @@ class LandingPage(generic.TemplateView):
         return super(LandingPage, self).dispatch(request, *args, **kwargs)
 
 
+@method_decorator([cache_per_organization(key_prefix='dashboard'), read_from_replicas], name='dispatch')
 class DashboardView(OrganizerAndLoginRequiredMixin, generic.TemplateView):
     template_name = 'dashboard.html'
 
     def get_context_data(self, **kwargs):
         user = self.request.user
         context = super(DashboardView, self).get_context_data(**kwargs)
-        queryset = Lead.objects.filter(organization=user.userprofile)
-        month_ago = datetime.today() - timedelta(days=30)
-        context.update({
-            'total_lead_count': queryset.count(),
-            'total_new_leads': queryset.filter(date_added__gte=month_ago).count(),
-            'total_converted_new_leads': queryset.filter(category__name='Converted', date_added__gte=month_ago).count()
-        })
+        context.update(get_dashboard_metrics(user.userprofile))
         return context
 
 
+@method_decorator(read_from_replicas, name='dispatch')
 class LeadListView(LoginRequiredMixin, generic.ListView):
     context_object_name = 'leads'
     template_name = 'leads/lead_list.html'
+    page_size = 50
+    unassigned_leads_limit = 20
+
+    def get_filter_form(self):
+        if not hasattr(self, 'filter_form'):
+            self.filter_form = LeadFilterForm(self.request.GET or None, request=self.request)
+            self.filter_form.is_valid()
+        return self.filter_form
 
     def get_queryset(self):
         user = self.request.user
         if user.is_organizer:
             queryset = Lead.objects.filter(organization=user.userprofile, agent__isnull=False)
         else:
-            queryset = Lead.objects.filter(organization=user.agent.organization).filter(agent__user=user,
-                                                                                        agent__isnull=False)
-            queryset = queryset.filter(agent__user=user)
-        return queryset
+            queryset = Lead.objects.filter(organization=user.agent.organization).filter(agent__user=user)
+        form = self.get_filter_form()
+        queryset = form.filter_queryset(queryset.select_related('category'))
+        try:
+            self.page = paginate_keyset(queryset, form.get_ordering(), self.page_size,
+                                        after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except (ValueError, ValidationError):
+            self.page = paginate_keyset(queryset, form.get_ordering(), self.page_size)
+        return self.page.object_list
+
+    def get_unassigned_leads(self):
+        return list(
+            Lead.objects.filter(organization=self.request.organization, agent__isnull=True)
+            .order_by('-date_added', '-id')[:self.unassigned_leads_limit + 1]
+        )
 
-    def get_context_data(self, **kwargs):
+    def get_context_data(self, unassigned_leads=None, **kwargs):
         user = self.request.user
         context = super(LeadListView, self).get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        for param in ('after', 'before', 'sort'):
+            params.pop(param, None)
+        sort = self.filter_form.get_ordering()[0]
+        context.update({
+            'filter_form': self.filter_form,
+            'sort': sort,
+            'sort_links': {
+                field: self.get_querystring(params, sort=f'-{field}' if sort == field else field)
+                for field in ('first_name', 'last_name', 'age', 'date_added', 'followup_count')
+            },
+            'next_page_link': self.get_querystring(params, sort=sort, after=self.page.next_cursor)
+            if self.page.next_cursor else None,
+            'previous_page_link': self.get_querystring(params, sort=sort, before=self.page.previous_cursor)
+            if self.page.previous_cursor else None,
+        })
         if user.is_organizer:
+            context['bulk_form'] = LeadBulkActionForm(request=self.request, prefix='bulk')
+            if unassigned_leads is None:
+                unassigned_leads = self.get_unassigned_leads()
             context.update({
-                'unassigned_leads': Lead.objects.filter(organization=user.userprofile, agent__isnull=True)
+                'unassigned_leads': unassigned_leads[:self.unassigned_leads_limit],
+                'more_unassigned_leads': len(unassigned_leads) > self.unassigned_leads_limit
             })
         return context
 
+    @staticmethod
+    def get_querystring(params, **extra):
+        params = params.copy()
+        for key, value in extra.items():
+            params[key] = value
+        return f'?{params.urlencode()}'
+
+
+class LeadBulkActionView(OrganizerAndLoginRequiredMixin, generic.FormView):
+    form_class = LeadBulkActionForm
+    prefix = 'bulk'
+    http_method_names = ['post']
 
+    def get_form_kwargs(self, **kwargs):
+        kwargs = super(LeadBulkActionView, self).get_form_kwargs(**kwargs)
+        kwargs.update({
+            'request': self.request
+        })
+        return kwargs
+
+    def get_success_url(self):
+        next_url = self.request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={self.request.get_host()}):
+            return next_url
+        return reverse('leads:lead-list')
+
+    def get_queryset(self, form):
+        queryset = Lead.objects.filter(organization=self.request.user.userprofile)
+        if form.cleaned_data['select_all']:
+            filter_form = LeadFilterForm(self.request.POST, request=self.request)
+            filter_form.is_valid()
+            return filter_form.filter_queryset(queryset.filter(agent__isnull=False))
+        return queryset.filter(pk__in=form.cleaned_data['leads'])
+
+    def form_valid(self, form):
+        action = form.cleaned_data['action']
+        queryset = self.get_queryset(form)
+        if action == LeadBulkActionForm.ASSIGN:
+            agent = form.cleaned_data['agent']
+            count = bulk_assign(queryset, agent)
+            messages.success(self.request, f'{count} leads have been assigned to {agent.user.username}')
+        elif action == LeadBulkActionForm.CATEGORIZE:
+            category = form.cleaned_data['category']
+            count = bulk_categorize(queryset, category)
+            messages.success(self.request, f'{count} leads have been moved to the {category.name} category')
+        else:
+            count = bulk_delete(queryset)
+            messages.success(self.request, f'{count} leads have been deleted')
+        return super(LeadBulkActionView, self).form_valid(form)
+
+    def form_invalid(self, form):
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, error)
+        return redirect(self.get_success_url())
+
+
+class LeadExportView(OrganizerAndLoginRequiredMixin, generic.View):
+    """
+    Download the leads of the organization, narrowed by the filters of the lead list, as CSV or as a workbook.
+    """
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return HttpResponse(f'The format must be one of {", ".join(EXPORT_FORMATS)}', status=400)
+        filter_form = LeadFilterForm(request.GET or None, request=request)
+        filter_form.is_valid()
+        queryset = filter_form.filter_queryset(Lead.objects.filter(organization=request.organization))
+        rows = get_export_rows(queryset, self.chunk_size)
+        filename = f'leads-{date.today().isoformat()}'
+
+        if export_format == 'xlsx':
+            file = tempfile.TemporaryFile()
+            try:
+                write_xlsx(rows, file)
+            except ExportError as e:
+                file.close()
+                return HttpResponse(str(e), status=501)
+            file.seek(0)
+            return FileResponse(file, as_attachment=True, filename=f'{filename}.xlsx')
+
+        if request.GET.get('gzip'):
+            response = StreamingHttpResponse(iter_gzip(iter_csv(rows)), content_type='application/gzip')
+            filename = f'{filename}.csv.gz'
+        else:
+            response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv; charset=utf-8')
+            filename = f'{filename}.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Tells nginx to pass the rows on as they come instead of buffering the whole export.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@method_decorator(read_from_replicas, name='dispatch')
 class LeadDetailView(LoginRequiredMixin, generic.DetailView):
     context_object_name = 'lead'
     template_name = 'leads/lead_detail.html'
@@ -85,7 +240,15 @@ class LeadDetailView(LoginRequiredMixin, generic.DetailView):
             queryset = Lead.objects.filter(organization=user.userprofile)
         else:
             queryset = Lead.objects.filter(organization=user.agent.organization).filter(agent__user=user)
-        return queryset
+        return queryset.select_related('category')
+
+    def get_followups(self, lead_id):
+        return list(FollowUp.objects.filter(lead_id=lead_id).order_by('date_added', 'id'))
+
+    def get_context_data(self, **kwargs):
+        if 'followups' not in kwargs:
+            kwargs['followups'] = self.get_followups(self.object.pk)
+        return super(LeadDetailView, self).get_context_data(**kwargs)
 
 
 class LeadCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
@@ -93,17 +256,28 @@ class LeadCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
     success_url = reverse_lazy('leads:lead-list')
     template_name = 'leads/lead_create.html'
 
+    def get_form_kwargs(self):
+        kwargs = super(LeadCreateView, self).get_form_kwargs()
+        kwargs['organization'] = self.request.user.userprofile
+        return kwargs
+
     def form_valid(self, form):
         lead = form.save(commit=False)
         lead.organization = self.request.user.userprofile
-        lead.save()
-        send_mail(
+        with transaction.atomic():
+            if lead.agent is None and settings.LEAD_ASSIGNMENT_STRATEGY:
+                LeadDistributor(lead.organization, settings.LEAD_ASSIGNMENT_STRATEGY).assign(lead)
+            lead.save()
+        enqueue_mail(
             'A lead has been created',
             'Go to the site to see the new lead',
             from_email='test@test.com',
             recipient_list=['test@test.com']
         )
         messages.success(self.request, 'The lead has been successfully created')
+        similar = Lead.objects.filter(organization=lead.organization, name_key=lead.name_key).exclude(pk=lead.pk)
+        if lead.name_key and similar.exists():
+            messages.info(self.request, f'Other leads have a name sounding like {lead}, they may be the same person')
         return super(LeadCreateView, self).form_valid(form)
 
 
@@ -115,6 +289,11 @@ class LeadUpdateView(OrganizerAndLoginRequiredMixin, generic.UpdateView):
         user = self.request.user
         return Lead.objects.filter(organization=user.userprofile)
 
+    def get_form_kwargs(self):
+        kwargs = super(LeadUpdateView, self).get_form_kwargs()
+        kwargs['organization'] = self.request.user.userprofile
+        return kwargs
+
     def get_success_url(self):
         messages.success(self.request, 'The lead has been successfully updated')
         return reverse('leads:lead-list')
@@ -153,46 +332,32 @@ class AssignAgentView(OrganizerAndLoginRequiredMixin, generic.FormView):
         return super(AssignAgentView, self).form_valid(form)
 
 
+@method_decorator(read_from_replicas, name='dispatch')
 class CategoryListView(LoginRequiredMixin, generic.ListView):
     template_name = 'leads/category_list.html'
     context_object_name = 'categories'
 
     def get_context_data(self, **kwargs):
         context = super(CategoryListView, self).get_context_data(**kwargs)
+        # Counted by the template, so that nothing is queried when the table comes from the cache.
         context.update({
-            'unassigned_leads_count': Lead.objects.filter(category__isnull=True).count()
+            'unassigned_leads_count': Lead.objects.filter(
+                organization=self.request.organization, category__isnull=True
+            ).count
         })
         return context
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_organizer:
-            queryset = Category.objects.filter(organization=user.userprofile)
-        else:
-            queryset = Category.objects.filter(organization=user.agent.organization)
-        return queryset
+        return Category.objects.filter(organization=self.request.organization).annotate(lead_count=Count('leads'))
 
 
+@method_decorator(read_from_replicas, name='dispatch')
 class CategoryDetailView(LoginRequiredMixin, generic.DetailView):
     template_name = 'leads/category_detail.html'
     context_object_name = 'category'
 
-    def get_context_data(self, **kwargs):
-        context = super(CategoryDetailView, self).get_context_data(**kwargs)
-        category = self.get_object()
-        context.update({
-            'category': category
-        })
-
-        return context
-
     def get_queryset(self):
-        user = self.request.user
-        if user.is_organizer:
-            queryset = Category.objects.filter(organization=user.userprofile)
-        else:
-            queryset = Category.objects.filter(organization=user.agent.organization)
-        return queryset
+        return Category.objects.filter(organization=self.request.organization)
 
 
 class CategoryCreateView(OrganizerAndLoginRequiredMixin, generic.CreateView):
@@ -253,38 +418,147 @@ class LeadCategoryUpdateView(LoginRequiredMixin, generic.UpdateView):
         return queryset
 
 
-class LeadJsonView(generic.View):
+@method_decorator(read_from_replicas, name='dispatch')
+class LeadJsonView(LoginRequiredMixin, generic.View):
+    fields = {
+        'id': 'id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'age': 'age',
+        'email': 'email',
+        'phone_number': 'phone_number',
+        'description': 'description',
+        'date_added': 'date_added',
+        'converted_date': 'converted_date',
+        'category': 'category__name',
+        'agent': 'agent__user__username',
+    }
+    default_fields = ('id', 'first_name', 'last_name', 'email', 'date_added')
+    ordering = ('date_added', 'id')
+    page_size = 100
+    max_page_size = 1000
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_organizer:
+            queryset = Lead.objects.filter(organization=user.userprofile)
+        else:
+            queryset = Lead.objects.filter(organization=user.agent.organization).filter(agent__user=user)
+        return queryset
+
     def get(self, request, *args, **kwargs):
-        data = {}
-        queryset = Lead.objects.all()
-        for i in queryset:
-            data[i.first_name] = i.last_name
-        return JsonResponse(data)
+        fields = request.GET.get('fields')
+        fields = fields.split(',') if fields else self.default_fields
+        unknown_fields = set(fields) - set(self.fields)
+        if unknown_fields:
+            return JsonResponse({'error': f'Unknown fields: {", ".join(sorted(unknown_fields))}'}, status=400)
+        try:
+            limit = min(max(int(request.GET.get('limit', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            return JsonResponse({'error': 'The limit must be an integer'}, status=400)
+
+        lookups = {self.fields[field] for field in fields} | set(self.ordering)
+        try:
+            page = paginate_keyset(self.get_queryset().values(*lookups), self.ordering, limit,
+                                   after=request.GET.get('cursor'))
+        except (ValueError, ValidationError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        data = {
+            'results': [{field: row[self.fields[field]] for field in fields} for row in page],
+            'next_cursor': page.next_cursor,
+        }
+        content = json.dumps(data, cls=DjangoJSONEncoder)
+        etag = quote_etag(hashlib.sha1(content.encode()).hexdigest())
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class LeadSearchView(LoginRequiredMixin, generic.ListView):
+    context_object_name = 'leads'
+    template_name = 'leads/lead_search.html'
+    limit = 50
+
+    def get_search_scope(self):
+        if self.request.user.is_organizer:
+            return self.request.organization, Lead.objects.all()
+        return self.request.organization, Lead.objects.filter(agent=self.request.agent)
+
+    def get_queryset(self):
+        organization, queryset = self.get_search_scope()
+        return search_leads(queryset.select_related('category'), organization, self.request.GET.get('q', ''),
+                            limit=self.limit)
 
+    def get_context_data(self, **kwargs):
+        context = super(LeadSearchView, self).get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
 
-class FollowUpCreateView(LoginRequiredMixin, generic.CreateView):
+
+class LeadTypeaheadView(LeadSearchView):
+    limit = 10
+
+    def get(self, request, *args, **kwargs):
+        organization, queryset = self.get_search_scope()
+        leads = search_leads(queryset.only('id', 'first_name', 'last_name', 'email'), organization,
+                             request.GET.get('q', ''), limit=self.limit, prefix=True)
+        return JsonResponse({'results': [
+            {
+                'id': lead.pk,
+                'name': str(lead),
+                'email': lead.email,
+                'url': reverse('leads:lead-detail', kwargs={'pk': lead.pk}),
+            } for lead in leads
+        ]})
+
+
+class FollowUpLeadMixin:
+    """
+    Look up the lead of the follow-up among the leads the user may see, once per request.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        leads = Lead.objects.filter(organization=request.organization)
+        if not request.user.is_organizer:
+            leads = leads.filter(agent=request.agent)
+        self.lead = get_object_or_404(leads, pk=kwargs.get('pk'))
+        return super(FollowUpLeadMixin, self).dispatch(request, *args, **kwargs)
+
+
+class FollowUpCreateView(LoginRequiredMixin, FollowUpLeadMixin, generic.CreateView):
     template_name = 'leads/followup_create.html'
     form_class = FollowUpForm
 
     def get_success_url(self):
-        return reverse('leads:lead-detail', kwargs={'pk': self.kwargs.get('pk')})
+        return reverse('leads:lead-detail', kwargs={'pk': self.lead.pk})
 
     def get_context_data(self, **kwargs):
         context = super(FollowUpCreateView, self).get_context_data(**kwargs)
         context.update({
-            'lead': Lead.objects.get(pk=self.kwargs.get('pk'))
+            'lead': self.lead
         })
         return context
 
     def form_valid(self, form):
-        lead = Lead.objects.get(pk=self.kwargs.get('pk'))
         followup = form.save(commit=False)
-        followup.lead = lead
+        followup.lead = self.lead
         followup.save()
         return super(FollowUpCreateView, self).form_valid(form)
 
 
-class FollowUpUpdateView(LoginRequiredMixin, generic.UpdateView):
+class FollowUpQuerysetMixin:
+    def get_queryset(self):
+        queryset = FollowUp.objects.filter(lead__organization=self.request.organization)
+        if not self.request.user.is_organizer:
+            queryset = queryset.filter(lead__agent=self.request.agent)
+        return queryset
+
+
+class FollowUpUpdateView(LoginRequiredMixin, FollowUpQuerysetMixin, generic.UpdateView):
     template_name = 'leads/followup_update.html'
     form_class = FollowUpForm
     queryset = FollowUp.objects.all()
@@ -292,17 +566,8 @@ class FollowUpUpdateView(LoginRequiredMixin, generic.UpdateView):
     def get_success_url(self):
         return reverse('leads:lead-detail', kwargs={'pk': self.get_object().lead.pk})
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_organizer:
-            queryset = FollowUp.objects.filter(lead__organization=user.userprofile)
-        else:
-            queryset = FollowUp.objects.filter(lead__organization=user.agent.userprofile)
-            queryset = queryset.filter(lead__agent__user=user)
-        return queryset
-
 
-class FollowUpDeleteView(LoginRequiredMixin, generic.DeleteView):
+class FollowUpDeleteView(LoginRequiredMixin, FollowUpQuerysetMixin, generic.DeleteView):
     template_name = 'leads/followup_delete.html'
     queryset = FollowUp.objects.all()
 
@@ -310,12 +575,80 @@ class FollowUpDeleteView(LoginRequiredMixin, generic.DeleteView):
         followup = FollowUp.objects.get(pk=self.kwargs.get('pk'))
         return reverse('leads:lead-detail', kwargs={'pk': followup.lead.pk})
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_organizer:
-            queryset = FollowUp.objects.filter(lead__organization=user.userprofile)
-        else:
-            queryset = FollowUp.objects.filter(lead__organization=user.agent.userprofile)
-            queryset = queryset.filter(lead__agent__user=user)
-        return queryset
 
+class FollowUpFileView(LoginRequiredMixin, FollowUpQuerysetMixin, generic.View):
+    def get(self, request, *args, **kwargs):
+        followup = get_object_or_404(self.get_queryset().exclude(file=''), pk=kwargs.get('pk'))
+        return serve_file(request, followup.file)
+
+
+class FollowUpUploadCreateView(LoginRequiredMixin, FollowUpQuerysetMixin, generic.View):
+    """
+    Start a chunked upload of the file of a follow-up.
+
+    The body is a JSON object with the ``filename``, the ``size`` in bytes and optionally the SHA-256 ``checksum``
+    of the whole file. The chunks are then sent to the returned ``url``.
+    """
+    def post(self, request, *args, **kwargs):
+        followup = get_object_or_404(self.get_queryset(), pk=kwargs.get('pk'))
+        try:
+            data = json.loads(request.body)
+            upload = start_upload(followup, request.user, str(data['filename']), int(data['size']),
+                                  str(data.get('checksum', '')))
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Expected a JSON object with a filename and a size'}, status=400)
+        except UploadError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+        return JsonResponse({
+            'id': str(upload.pk),
+            'offset': upload.offset,
+            'url': reverse('leads:followup-upload-chunk', kwargs={'pk': upload.pk}),
+        }, status=201)
+
+
+class FollowUpUploadChunkView(LoginRequiredMixin, generic.View):
+    """
+    ``GET`` returns the offset to resume from, ``PUT`` appends the chunk found in the request body at the
+    ``Upload-Offset`` header, checked against the SHA-256 given in the ``Upload-Checksum`` header.
+    The follow-up gets its file with the last chunk. ``DELETE`` abandons the upload.
+    """
+    def get_upload(self):
+        return get_object_or_404(FollowUpUpload, pk=self.kwargs.get('pk'), user=self.request.user)
+
+    def render_upload(self, upload):
+        return JsonResponse({'offset': upload.offset, 'size': upload.size})
+
+    def get(self, request, *args, **kwargs):
+        return self.render_upload(self.get_upload())
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+            checksum = request.headers['Upload-Checksum']
+        except (KeyError, ValueError):
+            return JsonResponse({
+                'error': 'The Upload-Offset, Content-Length and Upload-Checksum headers are required'
+            }, status=400)
+        try:
+            # Read from the request stream so that the chunk is never held in memory as a whole.
+            upload = write_chunk(upload.pk, request, offset, length, checksum)
+            if upload.offset == upload.size:
+                followup = complete_upload(upload)
+                return JsonResponse({
+                    'offset': upload.size,
+                    'size': upload.size,
+                    'file': reverse('leads:followup-file', kwargs={'pk': followup.pk}),
+                })
+        except UploadError as e:
+            response = JsonResponse({'error': str(e)}, status=e.status)
+            if e.status == 409:
+                response['Upload-Offset'] = FollowUpUpload.objects.filter(pk=upload.pk).values_list(
+                    'offset', flat=True).first()
+            return response
+        return self.render_upload(upload)
+
+    def delete(self, request, *args, **kwargs):
+        abort_upload(self.get_upload())
+        return HttpResponse(status=204)
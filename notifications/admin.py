@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboundEmail
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt', 'sent')
+    list_filter = ('status',)
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from notifications.outbox import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver the messages waiting in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of messages sent per connection')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on a message after this many failures')
+        parser.add_argument('--backoff', type=int, default=60, help='Seconds to wait before the first retry')
+        parser.add_argument('--lease', type=int, default=600,
+                            help='Seconds before the messages claimed by a worker that died are sent by another one')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued_mail(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                backoff=timedelta(seconds=options['backoff']),
+                lease=timedelta(seconds=options['lease'])
+            )
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'{sent} messages sent, {failed} failed')
+            if sent + failed >= options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        return f'{total_sent} messages sent, {total_failed} failed'
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """
+    Store a message in the outbox, to be delivered by the send_queued_mail command.
+
+    Takes the same arguments as ``django.core.mail.send_mail`` but does not talk to the mail server.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipients=','.join(recipient_list)
+    )
+
+
+def send_queued_mail(batch_size=100, max_attempts=5, backoff=timedelta(minutes=1), lease=timedelta(minutes=10)):
+    """
+    Deliver a batch of due messages over a single mail server connection.
+
+    The batch is claimed in a short transaction postponing its next attempt by ``lease``, which must outlast sending
+    it, so that several workers can drain the outbox concurrently. Each message is marked sent as soon as the mail
+    server accepted it. Delivery is at least once: a message sent by a worker that died before marking it is sent
+    again when the lease runs out, like the messages of the batch the worker did not get to.
+
+    A failed message is retried after ``backoff`` doubled at each attempt, and given up after ``max_attempts``.
+    Returns the number of sent and failed messages.
+    """
+    sent = failed = 0
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt__lte=now)
+            .order_by('next_attempt')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt=now + lease)
+    if not emails:
+        return sent, failed
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e, max_attempts, backoff)
+        return sent, len(emails)
+
+    try:
+        for email in emails:
+            try:
+                EmailMessage(email.subject, email.message, email.from_email, email.recipient_list,
+                             connection=connection).send()
+            except Exception as e:
+                _record_failure(email, e, max_attempts, backoff)
+                failed += 1
+            else:
+                email.status = OutboundEmail.SENT
+                email.attempts += 1
+                email.sent = timezone.now()
+                email.save(update_fields=['status', 'attempts', 'sent'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def _record_failure(email, error, max_attempts, backoff):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.FAILED
+    else:
+        email.next_attempt = timezone.now() + backoff * 2 ** (email.attempts - 1)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt'])
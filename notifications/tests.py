@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from leads.models import User
+from notifications.models import OutboundEmail
+from notifications.outbox import enqueue_mail, send_queued_mail
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('The mail server is down')
+
+
+class CountingEmailBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return super(CountingEmailBackend, self).open()
+
+
+class WorkerKilled(BaseException):
+    pass
+
+
+class DyingEmailBackend(EmailBackend):
+    def send_messages(self, email_messages):
+        if mail.outbox:
+            raise WorkerKilled()
+        return super(DyingEmailBackend, self).send_messages(email_messages)
+
+
+class OutboxTest(TestCase):
+    def test_views_enqueue_instead_of_sending(self):
+        organizer = User.objects.create_user('organizer', password='test')
+        self.client.force_login(organizer)
+        self.client.post(reverse('agents:agent-create'), {'username': 'agent', 'email': 'agent@test.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().recipient_list, ['agent@test.com'])
+
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertEqual(mail.outbox[0].to, ['agent@test.com'])
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.SENT)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.CountingEmailBackend')
+    def test_batch_reuses_one_connection(self):
+        for i in range(5):
+            enqueue_mail('Hello', 'Hi', 'test@test.com', [f'lead{i}@test.com'])
+        CountingEmailBackend.opened = 0
+        self.assertEqual(send_queued_mail(batch_size=3), (3, 0))
+        self.assertEqual(send_queued_mail(batch_size=3), (2, 0))
+        self.assertEqual(CountingEmailBackend.opened, 2)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingEmailBackend')
+    def test_failures_are_retried_with_backoff(self):
+        email = enqueue_mail('Hello', 'Hi', 'test@test.com', ['lead@test.com'])
+        self.assertEqual(send_queued_mail(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 1))
+        self.assertGreater(email.next_attempt, email.created)
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt=email.created)
+        send_queued_mail(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertIn('mail server is down', email.last_error)
+
+    def test_messages_sent_before_the_worker_died_are_not_sent_again(self):
+        for i in range(3):
+            enqueue_mail('Hello', 'Hi', 'test@test.com', [f'lead{i}@test.com'])
+        with override_settings(EMAIL_BACKEND='notifications.tests.DyingEmailBackend'):
+            with self.assertRaises(WorkerKilled):
+                send_queued_mail()
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.SENT).count(), 1)
+        # The other messages stay claimed until the lease runs out.
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        OutboundEmail.objects.filter(status=OutboundEmail.PENDING).update(next_attempt=timezone.now())
+        self.assertEqual(send_queued_mail(), (2, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f'lead{i}@test.com' for i in range(3)])
@@ -1 +1,93 @@
-console.log('!!!!!!!!!!!!!');
\ No newline at end of file
+console.log('!!!!!!!!!!!!!');
+
+document.querySelectorAll('[data-typeahead-url]').forEach(function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            if (input.value.trim().length < 2) {
+                return;
+            }
+            fetch(input.dataset.typeaheadUrl + '?q=' + encodeURIComponent(input.value))
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    list.innerHTML = '';
+                    data.results.forEach(function (lead) {
+                        var option = document.createElement('option');
+                        option.value = lead.name;
+                        option.label = lead.email;
+                        list.appendChild(option);
+                    });
+                });
+        }, 150);
+    });
+});
+
+function sha256Hex(buffer) {
+    return crypto.subtle.digest('SHA-256', buffer).then(function (digest) {
+        return Array.from(new Uint8Array(digest)).map(function (b) { return b.toString(16).padStart(2, '0'); }).join('');
+    });
+}
+
+document.querySelectorAll('[data-chunked-upload-url]').forEach(function (input) {
+    var chunkSize = 4 * 1024 * 1024;
+    var status = input.parentNode.querySelector('[data-chunked-upload-status]');
+    var csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+
+    function sendChunks(file, url, offset, storageKey) {
+        if (offset >= file.size) {
+            localStorage.removeItem(storageKey);
+            window.location = input.dataset.next;
+            return;
+        }
+        status.textContent = 'Uploaded ' + Math.round(100 * offset / file.size) + '%';
+        var chunk = file.slice(offset, offset + chunkSize);
+        chunk.arrayBuffer().then(function (buffer) {
+            return sha256Hex(buffer).then(function (checksum) {
+                return fetch(url, {
+                    method: 'PUT',
+                    headers: {'X-CSRFToken': csrfToken, 'Upload-Offset': offset, 'Upload-Checksum': checksum},
+                    body: buffer
+                });
+            });
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (response.ok) {
+                    sendChunks(file, url, data.offset, storageKey);
+                } else if (response.status === 409) {
+                    sendChunks(file, url, parseInt(response.headers.get('Upload-Offset'), 10), storageKey);
+                } else {
+                    status.textContent = data.error;
+                }
+            });
+        }).catch(function () {
+            status.textContent = 'The upload was interrupted, select the file again to resume it.';
+        });
+    }
+
+    input.addEventListener('change', function () {
+        var file = input.files[0];
+        if (!file) {
+            return;
+        }
+        // Resume an upload of the same file that was interrupted.
+        var storageKey = 'upload:' + input.dataset.chunkedUploadUrl + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+        var url = localStorage.getItem(storageKey);
+        var start = url ? fetch(url).then(function (response) {
+            return response.ok ? response.json() : Promise.reject();
+        }).then(function (data) { return {url: url, offset: data.offset}; }) : Promise.reject();
+        start.catch(function () {
+            return fetch(input.dataset.chunkedUploadUrl, {
+                method: 'POST',
+                headers: {'X-CSRFToken': csrfToken, 'Content-Type': 'application/json'},
+                body: JSON.stringify({filename: file.name, size: file.size})
+            }).then(function (response) { return response.json(); }).then(function (data) {
+                localStorage.setItem(storageKey, data.url);
+                return {url: data.url, offset: data.offset};
+            });
+        }).then(function (upload) {
+            sendChunks(file, upload.url, upload.offset, storageKey);
+        });
+    });
+});